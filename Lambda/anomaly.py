@@ -0,0 +1,99 @@
+# anomaly.py
+import os
+from decimal import Decimal
+import capacity
+import recurrence
+import result_cache
+import storage
+
+# Per-user category statistics written by the batch scorer (anomaly_scoring.py)
+ANOMALY_STATS_TABLE_NAME = os.environ.get('ANOMALY_STATS_TABLE_NAME')
+Z_THRESHOLD = float(os.environ.get('ANOMALY_Z_THRESHOLD', '3.5'))
+DUPLICATE_WINDOW_DAYS = 3
+RECENT_LIMIT = 50
+MIN_CATEGORY_COUNT = 8  # Too few samples for a category makes any z-score meaningless
+
+dynamodb = storage.resource()
+stats_table = capacity.Table(dynamodb, ANOMALY_STATS_TABLE_NAME) if ANOMALY_STATS_TABLE_NAME else None
+
+def normalize_name(name):
+    return ' '.join(str(name or '').lower().split())
+
+def category_key(category):
+    """Key of an expense's category in the stats, the same for the scorer and the write-path check"""
+    return str(category or 'Uncategorized')
+
+def readable_date(value):
+    """The date of a stored or submitted expense, or None when it does not parse"""
+    try:
+        return recurrence.to_date(value)
+    except (TypeError, ValueError):
+        return None
+
+def robust_z(amount, stats):
+    """Median/MAD z-score (0.6745 scales MAD to a standard deviation for normal data)"""
+    mad = stats.get('mad') or 0
+    if mad > 0:
+        return 0.6745 * (amount - stats['median']) / mad
+    std = stats.get('std') or 0
+    if std > 0:
+        return (amount - stats['mean']) / std
+    return 0.0
+
+def load_stats(user_id):
+    """Cached per-user stats: one get_item per user and container every RESULT_CACHE_TTL_SECONDS.
+
+    The batch scorer rewrites the stats nightly, so the expiry is what picks them up.
+    """
+    stats = result_cache.get('anomaly_stats', user_id)
+    if stats is None and stats_table is not None:
+        response = stats_table.get_item(Key={'userId': user_id})
+        item = response.get('Item') or {}
+        stats = {
+            'categories': {
+                category: {key: float(value) for key, value in values.items()}
+                for category, values in (item.get('categories') or {}).items()
+            },
+            'recent': [
+                {'id': row.get('id'), 'name': row['name'], 'amountMinor': int(row['amountMinor']), 'date': row['date']}
+                for row in item.get('recent') or []
+            ],
+        }
+        result_cache.put('anomaly_stats', user_id, stats)
+    return stats
+
+def check_expense(user_id, item):
+    """Flags for a new expense from cached stats: O(1) apart from a bounded duplicate scan"""
+    stats = load_stats(user_id)
+    if not stats:
+        return []
+
+    flags = []
+    amount = item.get('amountMinor')
+    category_stats = stats['categories'].get(category_key(item.get('category')))
+    if amount is not None and category_stats and category_stats.get('count', 0) >= MIN_CATEGORY_COUNT:
+        z = robust_z(amount, category_stats)
+        if abs(z) >= Z_THRESHOLD:
+            flags.append({'type': 'outlier', 'score': Decimal(str(round(z, 2)))})
+
+    name = normalize_name(item.get('name'))
+    # An unreadable date only skips the duplicate check, with or without stats configured
+    item_date = readable_date(item.get('date'))
+    for row in stats['recent']:
+        row_date = readable_date(row['date'])
+        if (row['amountMinor'] == amount and row['name'] == name and item_date and row_date
+                and abs((item_date - row_date).days) <= DUPLICATE_WINDOW_DAYS):
+            flags.append({'type': 'duplicate', 'of': row.get('id')})
+            break
+    return flags
+
+def remember_expense(user_id, item):
+    """Add a stored expense to the cached recent list so an immediate double charge is caught too.
+
+    Called only after the write succeeded: a failed write must not be scored against.
+    """
+    stats = result_cache.get('anomaly_stats', user_id)
+    if not stats:
+        return
+    row = {'id': item.get('id'), 'name': normalize_name(item.get('name')), 'amountMinor': item.get('amountMinor'), 'date': item.get('date')}
+    stats['recent'] = ([row] + stats['recent'])[:RECENT_LIMIT]
@@ -0,0 +1,189 @@
+# anomaly_scoring.py
+"""Batch rescoring of a user's expenses for outliers, duplicate charges and category spikes.
+
+Usage: python anomaly_scoring.py <userId> [<userId> ...]
+"""
+import os
+import sys
+import time
+import warnings
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from datetime import datetime
+from decimal import Decimal
+import anomaly
+import money
+import pagination
+import result_cache
+import storage
+
+dynamodb = storage.resource()
+expenses_table = dynamodb.Table(os.environ.get('EXPENSES_TABLE_NAME'))
+
+WINDOW = 30  # Trailing expenses per category used for the rolling median/MAD
+SPIKE_FACTOR = 2.0
+MIN_SPIKE_MONTHS = 3
+
+def rolling_robust_z(values, window=WINDOW):
+    """z-score of each value against the median/MAD of the previous `window` values"""
+    z = np.zeros(len(values))
+    if len(values) <= anomaly.MIN_CATEGORY_COUNT:
+        return z
+    padded = np.concatenate([np.full(window, np.nan), values[:-1]])
+    windows = sliding_window_view(padded, window)
+    # The first window has no earlier values at all; its NaN median is masked out below
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(windows, axis=1)
+        mad = np.nanmedian(np.abs(windows - median[:, np.newaxis]), axis=1)
+    seen = np.minimum(np.arange(len(values)), window)
+    valid = (seen >= anomaly.MIN_CATEGORY_COUNT) & (mad > 0)
+    z[valid] = 0.6745 * (values[valid] - median[valid]) / mad[valid]
+    return z
+
+def duplicate_mask(names, amounts, days):
+    """True for an expense with the same name and amount as another within the duplicate window"""
+    mask = np.zeros(len(amounts), dtype=bool)
+    if len(amounts) < 2:
+        return mask
+    order = np.lexsort((days, amounts, names))
+    same = (names[order][1:] == names[order][:-1]) & (amounts[order][1:] == amounts[order][:-1])
+    close = np.diff(days[order]) <= anomaly.DUPLICATE_WINDOW_DAYS
+    mask[order[1:][same & close]] = True
+    return mask
+
+def category_spikes(category_idx, months, amounts, n_categories):
+    """(category, month) pairs whose total exceeds SPIKE_FACTOR x the median of earlier months"""
+    month_idx = months - months.min()
+    n_months = int(month_idx.max()) + 1
+    totals = np.zeros((n_categories, n_months))
+    np.add.at(totals, (category_idx, month_idx), amounts)
+
+    # Median of all earlier months, ignoring months with no spending in that category
+    earlier = np.where(totals > 0, totals, np.nan)
+    spikes = np.zeros_like(totals, dtype=bool)
+    for m in range(MIN_SPIKE_MONTHS, n_months):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN rows: categories not seen yet
+            baseline = np.nanmedian(earlier[:, :m], axis=1)
+        spikes[:, m] = np.nan_to_num(baseline, nan=np.inf) * SPIKE_FACTOR < totals[:, m]
+    return spikes, months.min()
+
+def score(expenses):
+    """Flags per expense id plus the per-category stats used by the write-path check"""
+    rows = []
+    for item in expenses:
+        if money.minor_of(item) is None or not item.get('date'):
+            continue
+        # One unreadable stored date is left out rather than failing the user's whole rescoring
+        if anomaly.readable_date(item['date']) is None:
+            print(f"Skipping expense {item.get('id')} with unreadable date {item['date']!r}")
+            continue
+        rows.append(item)
+    if not rows:
+        return {}, {}, []
+    rows.sort(key=lambda item: str(item['date']))
+
+    amounts = np.array([money.minor_of(item) for item in rows], dtype=np.float64)
+    dates = np.array([anomaly.readable_date(item['date']).isoformat() for item in rows], dtype='datetime64[D]')
+    days = dates.astype(np.int64)
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    names = np.array([anomaly.normalize_name(item.get('name')) for item in rows])
+    categories, category_idx = np.unique(np.array([anomaly.category_key(item.get('category')) for item in rows]), return_inverse=True)
+
+    z = np.zeros(len(rows))
+    stats = {}
+    for c, category in enumerate(categories):
+        members = np.flatnonzero(category_idx == c)
+        values = amounts[members]
+        z[members] = rolling_robust_z(values)
+        recent = values[-WINDOW:]
+        median = float(np.median(recent))
+        stats[category] = {
+            'count': len(values),
+            'median': median,
+            'mad': float(np.median(np.abs(recent - median))),
+            'mean': float(recent.mean()),
+            'std': float(recent.std()),
+        }
+
+    duplicates = duplicate_mask(names, amounts, days)
+    spikes, first_month = category_spikes(category_idx, months, amounts, len(categories))
+    spiked = spikes[category_idx, months - first_month]
+
+    flags = {}
+    for i in np.flatnonzero((np.abs(z) >= anomaly.Z_THRESHOLD) | duplicates | spiked):
+        row_flags = []
+        if abs(z[i]) >= anomaly.Z_THRESHOLD:
+            row_flags.append({'type': 'outlier', 'score': round(float(z[i]), 2)})
+        if duplicates[i]:
+            row_flags.append({'type': 'duplicate'})
+        if spiked[i]:
+            row_flags.append({'type': 'categorySpike', 'month': str(dates[i].astype('datetime64[M]'))})
+        flags[rows[i]['id']] = row_flags
+
+    recent_rows = [
+        {'id': item['id'], 'name': anomaly.normalize_name(item.get('name')), 'amountMinor': money.minor_of(item), 'date': item['date']}
+        for item in reversed(rows[-anomaly.RECENT_LIMIT:])
+    ]
+    return flags, stats, recent_rows
+
+def rescore_user(user_id, expenses_table=expenses_table, stats_table=anomaly.stats_table):
+    """Rescore every expense of one user, write changed flags back and refresh the stored stats.
+
+    Batch jobs pass their own per-thread tables; the defaults are this module's.
+    """
+    expenses = pagination.query_all(
+        expenses_table,
+        KeyConditionExpression='userId = :uid',
+        ProjectionExpression='id, #n, category, amount, amountMinor, currency, #d, anomalyFlags',
+        ExpressionAttributeNames={'#n': 'name', '#d': 'date'},
+        ExpressionAttributeValues={':uid': user_id}
+    )
+    flags, stats, recent_rows = score(expenses)
+
+    changed = 0
+    for item in expenses:
+        new_flags = flags.get(item['id'], [])
+        if (item.get('anomalyFlags') or []) == _to_dynamo(new_flags):
+            continue
+        # Bumping updatedAt is what makes /sync send the new flags to clients
+        timestamp = datetime.now().isoformat()
+        if new_flags:
+            expenses_table.update_item(
+                Key={'userId': user_id, 'id': item['id']},
+                UpdateExpression='SET anomalyFlags = :f, updatedAt = :ua',
+                ExpressionAttributeValues={':f': _to_dynamo(new_flags), ':ua': timestamp}
+            )
+        else:
+            expenses_table.update_item(
+                Key={'userId': user_id, 'id': item['id']},
+                UpdateExpression='SET updatedAt = :ua REMOVE anomalyFlags',
+                ExpressionAttributeValues={':ua': timestamp}
+            )
+        changed += 1
+
+    if stats_table is not None:
+        stats_table.put_item(Item=_to_dynamo({
+            'userId': user_id,
+            'categories': stats,
+            'recent': recent_rows,
+            'computedAt': datetime.now().isoformat(),
+        }))
+    result_cache.invalidate(user_id, namespaces=('anomaly_stats',))
+    return {'userId': user_id, 'scored': len(expenses), 'flagged': len(flags), 'changed': changed}
+
+def _to_dynamo(value):
+    # DynamoDB rejects floats, so stats are written as Decimals
+    if isinstance(value, float):
+        return Decimal(str(round(value, 4)))
+    if isinstance(value, dict):
+        return {k: _to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_dynamo(v) for v in value]
+    return value
+
+if __name__ == '__main__':
+    for user_id in sys.argv[1:]:
+        started = time.time()
+        print(rescore_user(user_id), f"{(time.time() - started) * 1000:.0f} ms")
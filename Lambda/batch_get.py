@@ -0,0 +1,69 @@
+# batch_get.py
+import time
+import capacity
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_SIZE = 100
+MAX_IDS = 1000
+MAX_RETRIES = 5
+
+def parse_ids(event):
+    """Return the de-duplicated ids from ?ids=a,b,c in request order, or None when absent"""
+    params = event.get('queryStringParameters') or {}
+    raw = params.get('ids')
+    if raw is None:
+        return None
+    ids = []
+    seen = set()
+    for item_id in raw.split(','):
+        item_id = item_id.strip()
+        if item_id and item_id not in seen:
+            seen.add(item_id)
+            ids.append(item_id)
+    if not ids:
+        raise ValueError('ids must contain at least one id')
+    if len(ids) > MAX_IDS:
+        raise ValueError(f"At most {MAX_IDS} ids can be requested at once")
+    return ids
+
+def projection_args(event, always=('id',)):
+    """Build ProjectionExpression arguments from ?fields=a,b; empty when not requested"""
+    params = event.get('queryStringParameters') or {}
+    if not params.get('fields'):
+        return {}
+    fields = list(always)
+    for field in params['fields'].split(','):
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    names = {f'#f{i}': field for i, field in enumerate(fields)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names,
+    }
+
+def fetch(dynamodb, table_name, keys, **projection):
+    """Fetch keys through BatchGetItem in chunks, retrying UnprocessedKeys with backoff"""
+    items = []
+    for start in range(0, len(keys), BATCH_SIZE):
+        request = {table_name: dict(projection, Keys=keys[start:start + BATCH_SIZE])}
+        attempt = 0
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request, ReturnConsumedCapacity='INDEXES')
+            capacity.record(response.get('ConsumedCapacity'), 'read')
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request = response.get('UnprocessedKeys') or {}
+            if request:
+                attempt += 1
+                if attempt > MAX_RETRIES:
+                    raise RuntimeError(f"BatchGetItem left keys unprocessed after {MAX_RETRIES} retries")
+                time.sleep(min(0.05 * 2 ** attempt, 1.0))
+    return items
+
+def ordered_result(ids, items, present=lambda item: item):
+    """Items aligned with the requested ids; misses are null and listed in 'missing'"""
+    by_id = {item['id']: item for item in items}
+    return {
+        'items': [present(by_id[item_id]) if item_id in by_id else None for item_id in ids],
+        'missing': [item_id for item_id in ids if item_id not in by_id],
+    }
@@ -0,0 +1,347 @@
+# batch_jobs.py
+"""Nightly all-user batch jobs over parallel DynamoDB scan segments.
+
+Usage:
+  python batch_jobs.py statements --month 2024-05 [options]
+  python batch_jobs.py anomalies [options]
+  python batch_jobs.py quality [options]
+
+Options:
+  --segments N          parallel scan segments per table (default 8)
+  --workers N           threads running per-user tasks (default 16)
+  --checkpoint PATH     resume file for segment cursors
+  --read-capacity RCU   provisioned read capacity of the scanned tables
+  --share FRACTION      share of that capacity the job may use for its reads and writes (default 0.25)
+  --endpoint-url URL    DynamoDB endpoint, e.g. DynamoDB Local at http://localhost:8000
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import boto3
+import anomaly
+import anomaly_scoring
+import money
+import pagination
+import recurrence
+
+USERS_TABLE_NAME = os.environ.get('USERS_TABLE_NAME', 'Users')
+CHILD_TABLES = {
+    'expense': os.environ.get('EXPENSES_TABLE_NAME'),
+    'income': os.environ.get('INCOME_TABLE_NAME'),
+    'goal': os.environ.get('GOALS_TABLE_NAME'),
+    'event': os.environ.get('EVENT_TABLE_NAME', 'Events'),
+}
+STATEMENTS_TABLE_NAME = os.environ.get('STATEMENTS_TABLE_NAME')
+
+class RateLimiter:
+    """Token bucket over consumed capacity units, shared by every thread of a job"""
+
+    def __init__(self, units_per_second):
+        self.rate = units_per_second
+        self.tokens = units_per_second
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, units):
+        # Capacity is only known after a call returns, so the bucket may go into debt and the caller waits it off
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= units
+            wait_seconds = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait_seconds:
+            time.sleep(wait_seconds)
+
+class Checkpoint:
+    """Per-segment scan cursors in a JSON file, rewritten atomically after each processed page"""
+
+    def __init__(self, path, job, total_segments):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {'job': job, 'totalSegments': total_segments, 'segments': {}}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            # A checkpoint for a different job or segment count cannot be resumed
+            if saved.get('job') == job and saved.get('totalSegments') == total_segments:
+                self.state = saved
+
+    def _key(self, table_name, segment):
+        return f"{table_name}:{segment}"
+
+    def get(self, table_name, segment):
+        return self.state['segments'].get(self._key(table_name, segment), {'cursor': None, 'done': False, 'counts': {}})
+
+    def advance(self, table_name, segment, cursor, counts=None):
+        # Counts are saved with the cursor they belong to, so a resumed segment neither loses nor repeats them
+        with self.lock:
+            self.state['segments'][self._key(table_name, segment)] = {
+                'cursor': cursor,
+                'done': cursor is None,
+                'counts': dict(counts or {}),
+            }
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, default=str)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        # A finished job leaves nothing to resume, so tomorrow's run starts from the beginning
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+# Calls whose consumed capacity is charged to the job's rate limiter
+LIMITED_OPERATIONS = {'get_item', 'query', 'scan', 'put_item', 'update_item', 'delete_item'}
+
+class LimitedTable:
+    """Drop-in for a boto3 Table that charges the capacity of every read and write to a RateLimiter"""
+
+    def __init__(self, table, limiter):
+        self._table = table
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if name not in LIMITED_OPERATIONS:
+            return attr
+
+        def limited(**kwargs):
+            kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+            response = attr(**kwargs)
+            self._limiter.consume(response.get('ConsumedCapacity', {}).get('CapacityUnits', 1))
+            return response
+        return limited
+
+class JobContext:
+    """Shared settings plus one boto3 resource per thread (resources are not thread-safe)"""
+
+    def __init__(self, args):
+        self.args = args
+        self.limiter = RateLimiter(args.read_capacity * args.share if args.read_capacity else 0)
+        self.checkpoint = Checkpoint(args.checkpoint, args.job, args.segments)
+        self.local = threading.local()
+
+    def table(self, table_name):
+        """This thread's handle on a table; every call through it is rate limited"""
+        if not hasattr(self.local, 'dynamodb'):
+            self.local.dynamodb = boto3.session.Session().resource('dynamodb', endpoint_url=self.args.endpoint_url)
+        return LimitedTable(self.local.dynamodb.Table(table_name), self.limiter)
+
+    def query_all(self, table_name, **kwargs):
+        return pagination.query_all(self.table(table_name), **kwargs)
+
+def scan_segment(ctx, table_name, segment, counts=None, resume=True, **kwargs):
+    """Yield pages of one scan segment, resuming from and advancing the checkpoint.
+
+    The cursor is advanced only when the caller asks for the next page, so a
+    page is recorded as done after everything submitted for it has finished.
+    A counts dict is restored from the checkpoint and saved with each cursor.
+    With resume=False the segment is always scanned from the start.
+    """
+    saved = ctx.checkpoint.get(table_name, segment) if resume else {'cursor': None, 'done': False}
+    if counts is not None:
+        counts.update(saved.get('counts') or {})
+    if saved['done']:
+        return
+    table = ctx.table(table_name)
+    cursor = saved['cursor']
+    while True:
+        scan_args = dict(kwargs, Segment=segment, TotalSegments=ctx.args.segments)
+        if cursor:
+            scan_args['ExclusiveStartKey'] = cursor
+        response = table.scan(**scan_args)
+        yield response.get('Items', [])
+        cursor = response.get('LastEvaluatedKey')
+        if resume:
+            ctx.checkpoint.advance(table_name, segment, cursor, counts)
+        if cursor is None:
+            return
+
+def run_per_user(ctx, task):
+    """Scan Users in parallel segments and run task(ctx, user) for every user on a worker pool"""
+    totals = {'users': 0, 'failed': 0}
+    totals_lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=ctx.args.workers) as workers:
+        def run_task(user):
+            try:
+                task(ctx, user)
+                failed = 0
+            except Exception as e:
+                print(f"Error running {ctx.args.job} for {user.get('id')}: {e}")
+                failed = 1
+            with totals_lock:
+                totals['users'] += 1
+                totals['failed'] += failed
+
+        def run_segment(segment):
+            for users in scan_segment(ctx, USERS_TABLE_NAME, segment, ProjectionExpression='id'):
+                wait([workers.submit(run_task, user) for user in users])
+
+        with ThreadPoolExecutor(max_workers=ctx.args.segments) as segments:
+            for future in [segments.submit(run_segment, s) for s in range(ctx.args.segments)]:
+                future.result()
+    return totals
+
+def run_per_row(ctx, table_name, check, resume=True, **scan_kwargs):
+    """Scan one table in parallel segments, run check(ctx, item) on every row and total its labels.
+
+    check returns a list of labels to count for the row (or None). Counts
+    are checkpointed per segment, so a resumed run continues them.
+    """
+    totals = {}
+    totals_lock = threading.Lock()
+
+    def run_segment(segment):
+        counts = {}
+        for items in scan_segment(ctx, table_name, segment, counts=counts, resume=resume, **scan_kwargs):
+            for item in items:
+                for label in check(ctx, item) or ():
+                    counts[label] = counts.get(label, 0) + 1
+        with totals_lock:
+            for label, count in counts.items():
+                totals[label] = totals.get(label, 0) + count
+
+    with ThreadPoolExecutor(max_workers=ctx.args.segments) as segments:
+        for future in [segments.submit(run_segment, s) for s in range(ctx.args.segments)]:
+            future.result()
+    return totals
+
+# Monthly statements
+
+def month_bounds(month):
+    """First and last day of a YYYY-MM month; raises ValueError on anything else"""
+    month_start = datetime.strptime(month, '%Y-%m').date()
+    month_end = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return month_start, month_end
+
+def totals_by_currency(items, key=None):
+    """Minor-unit totals per currency, optionally grouped by key(item) within each currency"""
+    by_currency = {}
+    for item in items:
+        by_currency.setdefault(money.currency_of(item), []).append(item)
+    if key is None:
+        return {currency: money.sum_minor(group) for currency, group in by_currency.items()}
+    return {currency: money.totals_by(group, key) for currency, group in by_currency.items()}
+
+def statement_task(ctx, user):
+    month_start, month_end = ctx.args.month_bounds
+    query = {
+        'KeyConditionExpression': 'userId = :uid',
+        'ExpressionAttributeValues': {':uid': user['id']},
+    }
+    expenses = ctx.query_all(CHILD_TABLES['expense'], **query)
+    income = ctx.query_all(CHILD_TABLES['income'], IndexName='UserIdIndex', **query)
+    expenses = recurrence.expand_items(expenses, month_start, month_end)
+    income = recurrence.expand_items(income, month_start, month_end)
+
+    statement = {
+        'userId': user['id'],
+        'month': ctx.args.month,
+        'incomeMinor': totals_by_currency(income),
+        'expenseMinor': totals_by_currency(expenses),
+        'expenseByCategoryMinor': totals_by_currency(expenses, lambda item: item.get('category') or 'Uncategorized'),
+        'incomeCount': len(income),
+        'expenseCount': len(expenses),
+        'generatedAt': datetime.now().isoformat(),
+    }
+    if STATEMENTS_TABLE_NAME:
+        # Through the job's table handle, so statement writes share the rate limit with the reads
+        ctx.table(STATEMENTS_TABLE_NAME).put_item(Item=statement)
+    else:
+        print(json.dumps(statement, default=str))
+
+# Anomaly stats rebuild
+
+def anomaly_task(ctx, user):
+    anomaly_scoring.rescore_user(
+        user['id'],
+        expenses_table=ctx.table(CHILD_TABLES['expense']),
+        stats_table=ctx.table(anomaly.ANOMALY_STATS_TABLE_NAME) if anomaly.ANOMALY_STATS_TABLE_NAME else None,
+    )
+
+# Data-quality checks
+
+def run_quality(ctx):
+    # Users are always scanned in full, also on resume: the orphan check needs every id
+    user_ids = set()
+    user_ids_lock = threading.Lock()
+
+    def collect_user(ctx, user):
+        with user_ids_lock:
+            user_ids.add(user['id'])
+
+    run_per_row(ctx, USERS_TABLE_NAME, collect_user, resume=False, ProjectionExpression='id')
+
+    def check_row(kind):
+        def check(ctx, item):
+            labels = ['rows']
+            if item.get('userId') not in user_ids:
+                labels.append('orphan')
+            amount_field = 'targetAmountMinor' if kind == 'goal' else 'amountMinor'
+            if amount_field not in item and (kind != 'event' or item.get('amount') is not None):
+                labels.append('unmigratedAmount')
+            elif (money.minor_of(item, amount_field) or 0) < 0:
+                labels.append('negativeAmount')
+            date_field = 'targetDate' if kind == 'goal' else 'date'
+            try:
+                datetime.strptime(str(item.get(date_field))[:10], '%Y-%m-%d')
+            except ValueError:
+                labels.append('badDate')
+            return labels
+        return check
+
+    report = {}
+    for kind, table_name in CHILD_TABLES.items():
+        if table_name:
+            report[kind] = dict({'rows': 0}, **run_per_row(ctx, table_name, check_row(kind)))
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run an all-user batch job')
+    parser.add_argument('job', choices=['statements', 'anomalies', 'quality'])
+    parser.add_argument('--month', help='Statement month as YYYY-MM (defaults to last month)')
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--checkpoint')
+    parser.add_argument('--read-capacity', type=float, default=0, help='0 disables rate limiting')
+    parser.add_argument('--share', type=float, default=0.25)
+    parser.add_argument('--endpoint-url')
+    args = parser.parse_args(argv)
+
+    if args.job == 'statements' and not args.month:
+        args.month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    if args.job == 'statements':
+        # Checked once here rather than failing in every user's task
+        try:
+            args.month_bounds = month_bounds(args.month)
+        except ValueError:
+            parser.error(f"--month must be YYYY-MM, got {args.month!r}")
+
+    ctx = JobContext(args)
+    started = time.time()
+    if args.job == 'statements':
+        result = run_per_user(ctx, statement_task)
+    elif args.job == 'anomalies':
+        result = run_per_user(ctx, anomaly_task)
+    else:
+        result = run_quality(ctx)
+    ctx.checkpoint.clear()
+    print(json.dumps({'job': args.job, 'result': result, 'seconds': round(time.time() - started, 1)}, default=str))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
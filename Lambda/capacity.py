@@ -0,0 +1,118 @@
+# capacity.py
+import hashlib
+import hmac
+import json
+import os
+import threading
+
+# DynamoDB capacity consumed per invocation, reported by route, table, index and hashed user
+METRICS_NAMESPACE = os.environ.get('CAPACITY_METRICS_NAMESPACE', 'FinanceTracker/DynamoDB')
+DEBUG_HEADER = os.environ.get('CAPACITY_DEBUG_HEADER', '').lower() == 'true'
+# Secret HMAC key for the per-user dimension; metrics carry no user hash without one,
+# since an unkeyed hash of a user id can be reversed by hashing guesses
+USER_HASH_SALT = os.environ.get('CAPACITY_USER_HASH_SALT', '')
+
+WRITE_OPERATIONS = {'put_item', 'update_item', 'delete_item'}
+METERED_OPERATIONS = WRITE_OPERATIONS | {'get_item', 'query', 'scan'}
+
+# One accounting per thread, so in-process concurrent callers don't mix their totals
+_local = threading.local()
+
+class Table:
+    """Drop-in for dynamodb.Table(name) that asks for and records consumed capacity"""
+
+    def __init__(self, dynamodb, table_name):
+        self._table = dynamodb.Table(table_name)
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if name not in METERED_OPERATIONS:
+            return attr
+
+        def metered(**kwargs):
+            kwargs.setdefault('ReturnConsumedCapacity', 'INDEXES')
+            response = attr(**kwargs)
+            record(response.get('ConsumedCapacity'), 'write' if name in WRITE_OPERATIONS else 'read')
+            return response
+        return metered
+
+def hash_user(user_id):
+    if not user_id or not USER_HASH_SALT:
+        return None
+    return hmac.new(USER_HASH_SALT.encode('utf-8'), str(user_id).encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+def route_of(http_method, path):
+    """Path with ids replaced, e.g. 'PUT /expenses/{userId}/{id}'"""
+    parts = (path or '').strip('/').split('/')
+    template = '/' + parts[0]
+    if len(parts) > 1:
+        template += '/{userId}'
+    if len(parts) > 2:
+        template += '/{id}'
+    return f"{http_method} {template}"
+
+def start():
+    _local.usage = {}
+
+def record(consumed, kind):
+    """Add a ConsumedCapacity entry (or list of them) to the current invocation"""
+    usage = getattr(_local, 'usage', None)
+    if usage is None or not consumed:
+        return
+    for entry in consumed if isinstance(consumed, list) else [consumed]:
+        table_name = entry.get('TableName')
+        # With INDEXES the table and each index are broken out; with TOTAL only the sum is known
+        parts = [('', entry.get('Table') or entry)]
+        for index_type in ('GlobalSecondaryIndexes', 'LocalSecondaryIndexes'):
+            parts.extend((entry.get(index_type) or {}).items())
+        for index_name, units in parts:
+            read = units.get('ReadCapacityUnits')
+            write = units.get('WriteCapacityUnits')
+            if read is None and write is None:
+                read, write = (0, units.get('CapacityUnits', 0)) if kind == 'write' else (units.get('CapacityUnits', 0), 0)
+            totals = usage.setdefault((table_name, index_name), {'read': 0.0, 'write': 0.0, 'calls': 0})
+            totals['read'] += float(read or 0)
+            totals['write'] += float(write or 0)
+            totals['calls'] += 1
+
+def finish(event, response):
+    """Emit the invocation's usage as CloudWatch embedded metrics and optionally a debug header"""
+    usage = getattr(_local, 'usage', None)
+    _local.usage = None
+    if not usage:
+        return response
+
+    route = route_of(event.get('httpMethod'), event.get('path'))
+    claims = ((event.get('requestContext') or {}).get('authorizer') or {}).get('claims') or {}
+    path_parts = (event.get('path') or '').split('/')
+    user_hash = hash_user(claims.get('sub') or (path_parts[2] if len(path_parts) > 2 else None))
+
+    for (table_name, index_name), totals in usage.items():
+        # Embedded metric format: CloudWatch turns this log line into metrics, no API call needed
+        print(json.dumps({
+            '_aws': {
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Route', 'Table', 'Index'], ['Table']],
+                    'Metrics': [
+                        {'Name': 'ReadCapacityUnits', 'Unit': 'Count'},
+                        {'Name': 'WriteCapacityUnits', 'Unit': 'Count'},
+                    ],
+                }],
+            },
+            'Route': route,
+            'Table': table_name,
+            'Index': index_name or '-',
+            'ReadCapacityUnits': totals['read'],
+            'WriteCapacityUnits': totals['write'],
+            'Calls': totals['calls'],
+            'UserHash': user_hash,
+        }))
+
+    if DEBUG_HEADER and isinstance(response, dict):
+        summary = {
+            f"{table_name}{'/' + index_name if index_name else ''}": {'read': totals['read'], 'write': totals['write']}
+            for (table_name, index_name), totals in usage.items()
+        }
+        response.setdefault('headers', {})['X-Consumed-Capacity'] = json.dumps(summary, separators=(',', ':'))
+    return response
@@ -0,0 +1,65 @@
+# capacity_report.py
+"""Rank the heaviest DynamoDB access patterns from recorded Lambda output.
+
+Reads the embedded-metric lines written by capacity.finish() from log files
+(e.g. `aws logs tail` output or a local run's stdout) or stdin.
+
+Usage: python capacity_report.py [--top N] [--by route|table|user] [log files...]
+"""
+import argparse
+import json
+import sys
+
+def read_records(lines):
+    for line in lines:
+        # Log exports prefix each line with timestamps or stream names; the record starts at the first brace
+        start = line.find('{')
+        if start < 0 or '"_aws"' not in line:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except json.JSONDecodeError:
+            continue
+        if 'Route' in record and 'Table' in record:
+            yield record
+
+def aggregate(records, by):
+    groups = {}
+    for record in records:
+        if by == 'route':
+            key = (record['Route'], record['Table'], record['Index'])
+        elif by == 'table':
+            key = (record['Table'], record['Index'])
+        else:
+            key = (record.get('UserHash') or '-',)
+        totals = groups.setdefault(key, {'read': 0.0, 'write': 0.0, 'calls': 0})
+        totals['read'] += record.get('ReadCapacityUnits', 0)
+        totals['write'] += record.get('WriteCapacityUnits', 0)
+        totals['calls'] += record.get('Calls', 0)
+    return groups
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report consumed DynamoDB capacity from recorded output')
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--by', choices=['route', 'table', 'user'], default='route')
+    args = parser.parse_args(argv)
+
+    groups = {}
+    for path in args.files or ['-']:
+        lines = sys.stdin if path == '-' else open(path)
+        for key, totals in aggregate(read_records(lines), args.by).items():
+            merged = groups.setdefault(key, {'read': 0.0, 'write': 0.0, 'calls': 0})
+            for field, value in totals.items():
+                merged[field] += value
+
+    ranked = sorted(groups.items(), key=lambda entry: entry[1]['read'] + entry[1]['write'], reverse=True)
+    total_units = sum(totals['read'] + totals['write'] for totals in groups.values()) or 1
+    print(f"{'RCU':>10} {'WCU':>10} {'share':>6} {'calls':>7}  {args.by}")
+    for key, totals in ranked[:args.top]:
+        units = totals['read'] + totals['write']
+        print(f"{totals['read']:10.1f} {totals['write']:10.1f} {units / total_units:6.1%} {totals['calls']:7d}  {' '.join(key)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
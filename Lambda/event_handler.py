@@ -1,13 +1,19 @@
 import json
 import os
 import uuid
-import boto3
-from datetime import datetime
-from decimal import Decimal
+from datetime import datetime, timedelta
+import batch_get
+import capacity
+import money
+import pagination
+import recurrence
+import search_index
+import storage
+import tombstones
 
-dynamodb = boto3.resource('dynamodb')
+dynamodb = storage.resource()
 table_name = os.environ.get('EVENT_TABLE_NAME', 'Events')  # Default to 'Events' if not set
-table = dynamodb.Table(table_name)
+table = capacity.Table(dynamodb, table_name)
 
 def respond(status_code, body=None):
     """Helper function for responses with CORS headers"""
@@ -30,10 +36,9 @@ def create_event(event, context):
         event_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
 
-        # amount should be stored as Decimal
-        amount = body.get('amount')
-        if amount is not None:
-            amount = Decimal(str(amount))
+        # amount is optional for events and stored in integer minor units
+        currency = money.parse_currency(body.get('currency'))
+        amount_minor = money.parse_amount(body.get('amount'), currency)
 
         item = {
             'id': event_id,
@@ -41,16 +46,26 @@ def create_event(event, context):
             'title': body.get('title'),
             'date': body.get('date'),
             'type': body.get('type'),
-            'amount': amount,
+            'amountMinor': amount_minor,
+            'currency': currency,
             'notes': body.get('notes'),
             'createdAt': timestamp,
             'updatedAt': timestamp,
             'category': body.get('category'),
         }
 
+        # A recurring event is stored once as a series and expanded on read
+        if body.get('recurrence'):
+            item['recurrence'] = recurrence.parse_rule(body['recurrence'])
+            item['overrides'] = {}
+            item['seriesUserId'] = user_id  # Sparse key for SeriesUserIdIndex
+
         table.put_item(Item=item)
+        search_index.upsert(user_id, 'event', item)
 
-        return respond(201, item)
+        return respond(201, money.present(item))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error creating event: {e}")
         return respond(500, {'error': 'Could not create event'})
@@ -60,12 +75,22 @@ def get_event(event, context):
         user_id = event['pathParameters']['userid']
         event_id = event['pathParameters'].get('eventid')
 
+        # ?ids=a,b,c fetches a known set of events in one BatchGetItem round
+        ids = batch_get.parse_ids(event)
+        if ids is not None:
+            items = batch_get.fetch(
+                dynamodb, table_name,
+                [{'id': item_id, 'userId': user_id} for item_id in ids],
+                **batch_get.projection_args(event, ('id', 'amount', 'amountMinor', 'currency'))
+            )
+            return respond(200, batch_get.ordered_result(ids, items, money.present))
+
         if event_id:
             response = table.get_item(
                 Key={'id': event_id, 'userId': user_id}
             )
             if 'Item' in response:
-                return respond(200, response['Item'])
+                return respond(200, money.present(response['Item']))
             else:
                 return respond(404, {'error': 'Event item not found'})
         else:
@@ -75,7 +100,15 @@ def get_event(event, context):
                 KeyConditionExpression='userId = :userId',
                 ExpressionAttributeValues={':userId': user_id}
             )
-            return respond(200, response['Items'])
+            items = response['Items']
+
+            # Expand recurring series only for the requested window
+            window_start, window_end, keep_one_offs = recurrence.parse_list_window(event)
+            if window_start:
+                items = recurrence.expand_items(items, window_start, window_end, keep_one_offs=keep_one_offs)
+            return respond(200, money.present_all(items))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error getting event: {e}")
         return respond(500, {'error': 'Could not retrieve event'})
@@ -87,17 +120,39 @@ def update_event(event, context):
         body = json.loads(event['body'])
         timestamp = datetime.now().isoformat()
 
-        # amount should be stored as Decimal
-        amount = body.get('amount')
-        if amount is not None:
-            amount = Decimal(str(amount))
+        # Editing a single occurrence stores an override on the series
+        occurrence_date, scope = recurrence.parse_scope(event)
+        if scope == 'following':
+            raise ValueError('Only one occurrence or the whole series can be edited')
+        if occurrence_date:
+            recurrence.check_occurrence_date(body, occurrence_date)
+        if scope == 'occurrence':
+            fields = {k: body[k] for k in ('title', 'type', 'notes', 'category') if k in body}
+            if body.get('amount') not in (None, ''):
+                # The override amount is in the series' currency, whatever the request's default would be
+                series = recurrence.get_series(table, {'id': event_id, 'userId': user_id})
+                fields['amountMinor'] = money.parse_item_amount(body['amount'], series, body.get('currency'))
+            attributes = recurrence.override_occurrence(table, {'id': event_id, 'userId': user_id}, occurrence_date, fields)
+            search_index.upsert(user_id, 'event', attributes)
+            return respond(200, money.present(attributes))
 
-        update_expression = "SET title = :title, #date = :date, #type = :type, amount = :amount, notes = :notes, updatedAt = :updatedAt, category = :category"
+        # A whole-series edit made from one of its occurrences keeps the series start date and currency
+        if occurrence_date:
+            series = recurrence.get_series(table, {'id': event_id, 'userId': user_id})
+            body['date'] = series['date']
+            body['currency'] = body.get('currency') or money.currency_of(series)
+
+        # amount is optional for events and stored in integer minor units
+        currency = money.parse_currency(body.get('currency'))
+        amount_minor = money.parse_amount(body.get('amount'), currency)
+
+        update_expression = "SET title = :title, #date = :date, #type = :type, amountMinor = :amount, currency = :currency, notes = :notes, updatedAt = :updatedAt, category = :category"
         expression_attribute_values = {
             ':title': body.get('title'),
             ':date': body.get('date'),
             ':type': body.get('type'),
-            ':amount': amount,
+            ':amount': amount_minor,
+            ':currency': currency,
             ':notes': body.get('notes'),
             ':updatedAt': timestamp,
             ':category': body.get('category')
@@ -106,6 +161,17 @@ def update_event(event, context):
             '#date': 'date',  # Use a placeholder for reserved keyword
             '#type': 'type'
         }
+        remove_attributes = ['amount']  # Legacy Decimal amount, superseded by amountMinor
+
+        if 'recurrence' in body:
+            if body['recurrence']:
+                update_expression += ", recurrence = :r, overrides = :o, seriesUserId = :uid"
+                expression_attribute_values[':r'] = recurrence.parse_rule(body['recurrence'])
+                expression_attribute_values[':o'] = {}
+                expression_attribute_values[':uid'] = user_id
+            else:
+                remove_attributes += ['recurrence', 'overrides', 'seriesUserId']
+        update_expression += " REMOVE " + ", ".join(remove_attributes)
 
         response = table.update_item(
             Key={'id': event_id, 'userId': user_id},
@@ -116,9 +182,12 @@ def update_event(event, context):
         )
 
         if 'Attributes' in response:
-            return respond(200, response['Attributes'])
+            search_index.upsert(user_id, 'event', response['Attributes'])
+            return respond(200, money.present(response['Attributes']))
         else:
             return respond(404, {'error': 'Event not found'})
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error updating event: {e}")
         return respond(500, {'error': 'Could not update event'})
@@ -128,14 +197,123 @@ def delete_event(event, context):
         event_id = event['pathParameters']['eventid']
         user_id = event['pathParameters']['userid']
 
+        # Deleting a single occurrence records it as an exception on the series
+        occurrence_date, scope = recurrence.parse_scope(event)
+        if scope == 'following':
+            attributes = recurrence.end_series(table, {'id': event_id, 'userId': user_id}, occurrence_date)
+            search_index.upsert(user_id, 'event', attributes)
+            return respond(204, None)
+        if scope == 'occurrence':
+            recurrence.skip_occurrence(table, {'id': event_id, 'userId': user_id}, occurrence_date)
+            return respond(204, None)
+
         response = table.delete_item(
             Key={'id': event_id, 'userId': user_id}
         )
 
         if response['ResponseMetadata']['HTTPStatusCode'] == 200:
+            search_index.remove(user_id, 'event', event_id)
+            tombstones.record(user_id, 'event', event_id)
             return respond(204, None)
         else:
             return respond(404, {'error': 'Event not found'})
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error deleting event: {e}")
-        return respond(500, {'error': 'Could not delete event'})
\ No newline at end of file
+        return respond(500, {'error': 'Could not delete event'})
+
+# Attributes needed to build day buckets when the event items themselves are not returned
+BUCKET_ATTRIBUTES = ['id', '#d', '#t', 'amount', 'amountMinor', 'currency', 'recurrence', 'overrides']
+
+def calendar_window(params):
+    """Resolve ?month=YYYY-MM, ?week=YYYY-MM-DD or ?from=&to= into an inclusive date range"""
+    if params.get('month'):
+        start = datetime.strptime(params['month'][:7], '%Y-%m').date()
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    if params.get('week'):
+        day = recurrence.to_date(params['week'])
+        start = day - timedelta(days=day.weekday())  # Weeks start on Monday
+        return start, start + timedelta(days=6)
+    start = recurrence.to_date(params.get('from'))
+    end = recurrence.to_date(params.get('to'))
+    if not start or not end:
+        raise ValueError("Provide 'month', 'week' or both 'from' and 'to'")
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    if (end - start).days > 62:
+        raise ValueError('Calendar window cannot exceed 62 days')
+    return start, end
+
+def get_calendar(event, context):
+    try:
+        user_id = event['pathParameters']['userid']
+        params = event.get('queryStringParameters') or {}
+        start, end = calendar_window(params)
+        buckets_only = str(params.get('bucketsOnly', '')).lower() in ('1', 'true', 'yes')
+
+        # Buckets only need a handful of attributes, so trim the read payload
+        projection = {}
+        if buckets_only:
+            projection = {
+                'ProjectionExpression': ', '.join(BUCKET_ATTRIBUTES),
+                'ExpressionAttributeNames': {'#d': 'date', '#t': 'type'},
+            }
+
+        # One-off events in the window come from a date-range key condition;
+        # '~' sorts after any time suffix so full ISO timestamps on the last day still match
+        items = pagination.query_all(
+            table,
+            IndexName='UserIdDateIndex',
+            KeyConditionExpression='userId = :uid AND #d BETWEEN :start AND :end',
+            FilterExpression='attribute_not_exists(recurrence)',
+            ExpressionAttributeValues={
+                ':uid': user_id,
+                ':start': start.isoformat(),
+                ':end': end.isoformat() + '~',
+            },
+            ProjectionExpression=projection.get('ProjectionExpression'),
+            ExpressionAttributeNames=projection.get('ExpressionAttributeNames', {'#d': 'date'})
+        )
+        # Recurring series live in a sparse index and are expanded for the window only
+        series = pagination.query_all(
+            table,
+            IndexName='SeriesUserIdIndex',
+            KeyConditionExpression='seriesUserId = :uid',
+            ExpressionAttributeValues={':uid': user_id},
+            **projection
+        )
+        items.extend(recurrence.expand_items(series, start, end))
+
+        # Day totals are summed per currency in integer minor units and converted once per bucket
+        counts = {}
+        for item in items:
+            day = str(item.get('date'))[:10]
+            counts[day] = counts.get(day, 0) + 1
+        totals = money.totals_by(
+            [item for item in items if item.get('type') in ('income', 'expense')],
+            lambda item: (str(item.get('date'))[:10], money.currency_of(item), item['type'])
+        )
+        day_totals = {}
+        for (day, currency, kind), amount in totals.items():
+            by_kind = day_totals.setdefault(day, {}).setdefault(currency, {'income': 0, 'expense': 0})
+            by_kind[kind] = money.to_major(amount, currency)
+        days = {
+            day: {'count': count, 'totals': day_totals.get(day, {})}
+            for day, count in counts.items()
+        }
+
+        result = {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': days,
+        }
+        if not buckets_only:
+            result['events'] = money.present_all(sorted(items, key=lambda item: str(item.get('date'))))
+        return respond(200, result)
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
+    except Exception as e:
+        print(f"Error getting calendar: {e}")
+        return respond(500, {'error': 'Could not retrieve calendar'})
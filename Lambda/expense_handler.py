@@ -1,13 +1,20 @@
 import json
 import os
 import uuid
-import boto3
 from datetime import datetime
-from decimal import Decimal
+import anomaly
+import batch_get
+import capacity
+import money
+import recurrence
+import result_cache
+import search_index
+import storage
+import tombstones
 
-dynamodb = boto3.resource('dynamodb')
+dynamodb = storage.resource()
 table_name = os.environ.get('EXPENSES_TABLE_NAME')  # Default to 'Expenses' if not set
-table = dynamodb.Table(table_name)
+table = capacity.Table(dynamodb, table_name)
 
 def respond(status_code, body=None):
     """Helper function for responses with CORS headers"""
@@ -29,21 +36,38 @@ def create_expense(event, context):
 
         expense_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
+        currency = money.parse_currency(body.get('currency'))
 
         item = {
             'userId': user_id,
             'id': expense_id,
             'name': body.get('name'),
-            'amount': Decimal(str(body.get('amount'))),
+            'amountMinor': money.parse_amount(body.get('amount'), currency, required=True),
+            'currency': currency,
             'category': body.get('category'),
             'date': body.get('date'),
             'createdAt': timestamp,
             'updatedAt': timestamp
         }
 
+        # A recurring expense is stored once as a series and expanded on read
+        if body.get('recurrence'):
+            item['recurrence'] = recurrence.parse_rule(body['recurrence'])
+            item['overrides'] = {}
+
+        # Cheap check against cached per-category stats; the batch scorer does the full pass
+        anomaly_flags = anomaly.check_expense(user_id, item)
+        if anomaly_flags:
+            item['anomalyFlags'] = anomaly_flags
+
         table.put_item(Item=item)
+        anomaly.remember_expense(user_id, item)
+        search_index.upsert(user_id, 'expense', item)
+        result_cache.invalidate(user_id, namespaces=('forecast',))
 
-        return respond(201, item)
+        return respond(201, money.present(item))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error creating expense: {e}")
         return respond(500, {'error': 'Could not create expense'})
@@ -51,11 +75,30 @@ def create_expense(event, context):
 def get_expenses(event, context):
     try:
         user_id = event['pathParameters']['userid']
+
+        # ?ids=a,b,c fetches a known set of expenses in one BatchGetItem round
+        ids = batch_get.parse_ids(event)
+        if ids is not None:
+            items = batch_get.fetch(
+                dynamodb, table_name,
+                [{'userId': user_id, 'id': expense_id} for expense_id in ids],
+                **batch_get.projection_args(event, ('id', 'amount', 'amountMinor', 'currency'))
+            )
+            return respond(200, batch_get.ordered_result(ids, items, money.present))
+
         response = table.query(
             KeyConditionExpression='userId = :uid',
             ExpressionAttributeValues={':uid': user_id}
         )
-        return respond(200, response['Items'])
+        items = response['Items']
+
+        # Expand recurring series only for the requested window
+        window_start, window_end, keep_one_offs = recurrence.parse_list_window(event)
+        if window_start:
+            items = recurrence.expand_items(items, window_start, window_end, keep_one_offs=keep_one_offs)
+        return respond(200, money.present_all(items))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error getting expenses: {e}")
         return respond(500, {'error': 'Could not retrieve expenses'})
@@ -67,18 +110,53 @@ def update_expense(event, context):
         body = json.loads(event['body'])
         timestamp = datetime.now().isoformat()
 
-        update_expression = "SET #n = :n, amount = :a, category = :c, #d = :d, updatedAt = :ua"
+        # Editing a single occurrence stores an override on the series
+        occurrence_date, scope = recurrence.parse_scope(event)
+        if scope == 'following':
+            raise ValueError('Only one occurrence or the whole series can be edited')
+        if occurrence_date:
+            recurrence.check_occurrence_date(body, occurrence_date)
+        if scope == 'occurrence':
+            fields = {k: body[k] for k in ('name', 'category') if k in body}
+            if 'amount' in body:
+                # The override amount is in the series' currency, whatever the request's default would be
+                series = recurrence.get_series(table, {'userId': user_id, 'id': expense_id})
+                fields['amountMinor'] = money.parse_item_amount(body['amount'], series, body.get('currency'), required=True)
+            attributes = recurrence.override_occurrence(table, {'userId': user_id, 'id': expense_id}, occurrence_date, fields)
+            search_index.upsert(user_id, 'expense', attributes)
+            result_cache.invalidate(user_id, namespaces=('forecast',))
+            return respond(200, money.present(attributes))
+
+        # A whole-series edit made from one of its occurrences keeps the series start date and currency
+        if occurrence_date:
+            series = recurrence.get_series(table, {'userId': user_id, 'id': expense_id})
+            body['date'] = series['date']
+            body['currency'] = body.get('currency') or money.currency_of(series)
+
+        currency = money.parse_currency(body.get('currency'))
+        update_expression = "SET #n = :n, amountMinor = :a, currency = :cur, category = :c, #d = :d, updatedAt = :ua"
         expression_attribute_names = {
             '#n': 'name',
             '#d': 'date'
         }
         expression_attribute_values = {
             ':n': body.get('name'),
-            ':a': Decimal(str(body.get('amount'))),
+            ':a': money.parse_amount(body.get('amount'), currency, required=True),
+            ':cur': currency,
             ':c': body.get('category'),
             ':d': body.get('date'),
             ':ua': timestamp
         }
+        remove_attributes = ['amount']  # Legacy Decimal amount, superseded by amountMinor
+
+        if 'recurrence' in body:
+            if body['recurrence']:
+                update_expression += ", recurrence = :r, overrides = :o"
+                expression_attribute_values[':r'] = recurrence.parse_rule(body['recurrence'])
+                expression_attribute_values[':o'] = {}
+            else:
+                remove_attributes += ['recurrence', 'overrides']
+        update_expression += " REMOVE " + ", ".join(remove_attributes)
 
         response = table.update_item(
             Key={'userId': user_id, 'id': expense_id},
@@ -88,7 +166,11 @@ def update_expense(event, context):
             ReturnValues="ALL_NEW"
         )
 
-        return respond(200, response['Attributes'])
+        search_index.upsert(user_id, 'expense', response['Attributes'])
+        result_cache.invalidate(user_id, namespaces=('forecast',))
+        return respond(200, money.present(response['Attributes']))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error updating expense: {e}")
         return respond(500, {'error': 'Could not update expense'})
@@ -98,11 +180,28 @@ def delete_expense(event, context):
         user_id = event['pathParameters']['userid']
         expense_id = event['pathParameters']['expenseid']
 
+        # Deleting a single occurrence records it as an exception on the series
+        occurrence_date, scope = recurrence.parse_scope(event)
+        if scope == 'following':
+            attributes = recurrence.end_series(table, {'userId': user_id, 'id': expense_id}, occurrence_date)
+            search_index.upsert(user_id, 'expense', attributes)
+            result_cache.invalidate(user_id, namespaces=('forecast',))
+            return respond(204, None)
+        if scope == 'occurrence':
+            recurrence.skip_occurrence(table, {'userId': user_id, 'id': expense_id}, occurrence_date)
+            result_cache.invalidate(user_id, namespaces=('forecast',))
+            return respond(204, None)
+
         table.delete_item(
             Key={'userId': user_id, 'id': expense_id}
         )
 
+        search_index.remove(user_id, 'expense', expense_id)
+        tombstones.record(user_id, 'expense', expense_id)
+        result_cache.invalidate(user_id, namespaces=('forecast',))
         return respond(204, None)
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error deleting expense: {e}")
         return respond(500, {'error': 'Could not delete expense'})
\ No newline at end of file
@@ -0,0 +1,310 @@
+# expressions.py
+"""Evaluate DynamoDB expression strings against plain item dicts.
+
+Covers the condition, filter, key-condition, projection and update syntax the
+handlers use, so a non-DynamoDB backend can serve the same Table calls.
+"""
+import copy
+import re
+from decimal import Decimal
+
+class ValidationError(Exception):
+    """Raised where DynamoDB would reject the request with a ValidationException"""
+
+# Sentinel for an attribute path that does not resolve on an item
+MISSING = object()
+
+_TOKEN = re.compile(r'\s*(#\w+|:\w+|<>|<=|>=|[=<>(),.\[\]+-]|\d+|[A-Za-z_]\w*)')
+_KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN'}
+_UPDATE_CLAUSES = {'SET', 'REMOVE', 'ADD', 'DELETE'}
+
+def tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise ValidationError(f"Invalid expression near: {expression[position:]!r}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    def __init__(self, expression, names, values):
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected is not None and token.upper() != expected):
+            raise ValidationError(f"Expected {expected or 'a token'}, got {token!r}")
+        self.position += 1
+        return token
+
+    def at_keyword(self, *keywords):
+        token = self.peek()
+        return token is not None and token.upper() in keywords
+
+    def done(self):
+        return self.position >= len(self.tokens)
+
+    # Operands
+
+    def name(self, token):
+        if token.startswith('#'):
+            if token not in self.names:
+                raise ValidationError(f"Undefined attribute name placeholder {token}")
+            return self.names[token]
+        return token
+
+    def path(self):
+        parts = [self.name(self.take())]
+        while self.peek() in ('.', '['):
+            if self.take() == '.':
+                parts.append(self.name(self.take()))
+            else:
+                parts.append(int(self.take()))
+                self.take(']')
+        return ('path', parts)
+
+    def operand(self):
+        token = self.peek()
+        if token is None:
+            raise ValidationError('Expression ended unexpectedly')
+        if token.startswith(':'):
+            self.take()
+            if token not in self.values:
+                raise ValidationError(f"Undefined attribute value placeholder {token}")
+            return ('value', self.values[token])
+        if self.position + 1 < len(self.tokens) and self.tokens[self.position + 1] == '(' and not token.startswith('#'):
+            return self.function()
+        return self.path()
+
+    def function(self):
+        name = self.take().lower()
+        self.take('(')
+        args = [self.operand()]
+        while self.peek() == ',':
+            self.take()
+            args.append(self.operand())
+        self.take(')')
+        return ('fn', name, args)
+
+    # Conditions
+
+    def condition(self):
+        node = self.conjunction()
+        while self.at_keyword('OR'):
+            self.take()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.at_keyword('AND'):
+            self.take()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.at_keyword('NOT'):
+            self.take()
+            return ('not', self.negation())
+        if self.peek() == '(':
+            self.take()
+            node = self.condition()
+            self.take(')')
+            return node
+        left = self.operand()
+        if left[0] == 'fn' and left[1] in ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains'):
+            return left
+        if self.at_keyword('BETWEEN'):
+            self.take()
+            low = self.operand()
+            self.take('AND')
+            return ('between', left, low, self.operand())
+        if self.at_keyword('IN'):
+            self.take()
+            self.take('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.take()
+                options.append(self.operand())
+            self.take(')')
+            return ('in', left, options)
+        comparator = self.take()
+        if comparator not in ('=', '<>', '<', '<=', '>', '>='):
+            raise ValidationError(f"Invalid comparator {comparator!r}")
+        return ('cmp', comparator, left, self.operand())
+
+def parse_condition(expression, names=None, values=None):
+    parser = _Parser(expression, names, values)
+    node = parser.condition()
+    if not parser.done():
+        raise ValidationError(f"Unexpected token {parser.peek()!r} in condition")
+    return node
+
+def conjuncts(node):
+    """Flatten a tree of ANDs (used to push key conditions down to an index)"""
+    if node[0] == 'and':
+        return conjuncts(node[1]) + conjuncts(node[2])
+    return [node]
+
+# Evaluation
+
+def resolve(item, parts):
+    current = item
+    for part in parts:
+        if isinstance(part, int):
+            if not isinstance(current, list) or part >= len(current):
+                return MISSING
+        elif not isinstance(current, dict) or part not in current:
+            return MISSING
+        current = current[part]
+    return current
+
+def _operand_value(item, node):
+    kind = node[0]
+    if kind == 'value':
+        return node[1]
+    if kind == 'path':
+        return resolve(item, node[1])
+    name, args = node[1], node[2]
+    if name == 'if_not_exists':
+        value = _operand_value(item, args[0])
+        return _operand_value(item, args[1]) if value is MISSING else value
+    if name == 'list_append':
+        return list(_operand_value(item, args[0])) + list(_operand_value(item, args[1]))
+    if name == 'size':
+        value = _operand_value(item, args[0])
+        return MISSING if value is MISSING else Decimal(len(value))
+    raise ValidationError(f"Unsupported function {name}")
+
+def _comparable(left, right):
+    if left is MISSING or right is MISSING:
+        return False
+    numeric = (int, float, Decimal)
+    if isinstance(left, numeric) and isinstance(right, numeric) and not isinstance(left, bool) and not isinstance(right, bool):
+        return True
+    return type(left) is type(right)
+
+def evaluate(node, item):
+    kind = node[0]
+    if kind == 'and':
+        return evaluate(node[1], item) and evaluate(node[2], item)
+    if kind == 'or':
+        return evaluate(node[1], item) or evaluate(node[2], item)
+    if kind == 'not':
+        return not evaluate(node[1], item)
+    if kind == 'fn':
+        name, args = node[1], node[2]
+        if name == 'attribute_exists':
+            return _operand_value(item, args[0]) is not MISSING
+        if name == 'attribute_not_exists':
+            return _operand_value(item, args[0]) is MISSING
+        value, operand = _operand_value(item, args[0]), _operand_value(item, args[1])
+        if name == 'begins_with':
+            return isinstance(value, str) and isinstance(operand, str) and value.startswith(operand)
+        if name == 'contains':
+            return value is not MISSING and isinstance(value, (str, list, set)) and operand in value
+        raise ValidationError(f"Unsupported function {name}")
+    if kind == 'between':
+        value, low, high = (_operand_value(item, n) for n in node[1:])
+        return _comparable(value, low) and _comparable(value, high) and low <= value <= high
+    if kind == 'in':
+        value = _operand_value(item, node[1])
+        return value is not MISSING and any(value == _operand_value(item, option) for option in node[2])
+    comparator, left, right = node[1], _operand_value(item, node[2]), _operand_value(item, node[3])
+    if comparator == '=':
+        return _comparable(left, right) and left == right
+    if comparator == '<>':
+        return not (_comparable(left, right) and left == right)
+    if not _comparable(left, right):
+        return False
+    return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[comparator]
+
+def matches(expression, item, names=None, values=None):
+    return evaluate(parse_condition(expression, names, values), item)
+
+# Projections
+
+def project(item, expression, names=None):
+    parser = _Parser(expression, names, None)
+    projected = {}
+    while not parser.done():
+        parts = parser.path()[1]
+        value = resolve(item, parts)
+        if value is not MISSING:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = copy.deepcopy(value)
+        if not parser.done():
+            parser.take(',')
+    return projected
+
+# Updates
+
+def apply_update(item, expression, names=None, values=None):
+    """Apply an UpdateExpression in place; returns the top-level attributes it changed"""
+    parser = _Parser(expression, names, values)
+    changed = set()
+    clause = None
+    while not parser.done():
+        if parser.at_keyword(*_UPDATE_CLAUSES):
+            clause = parser.take().upper()
+            continue
+        if parser.peek() == ',':
+            parser.take()
+            continue
+        if clause is None:
+            raise ValidationError('Update expression must start with SET, REMOVE, ADD or DELETE')
+
+        parts = parser.path()[1]
+        changed.add(parts[0])
+        if clause == 'SET':
+            parser.take('=')
+            value = _operand_value(item, parser.operand())
+            if parser.peek() in ('+', '-'):
+                sign = parser.take()
+                other = _operand_value(item, parser.operand())
+                value = value + other if sign == '+' else value - other
+            if value is MISSING:
+                raise ValidationError('The provided expression refers to an attribute that does not exist in the item')
+            _set_path(item, parts, copy.deepcopy(value))
+        elif clause == 'REMOVE':
+            parent = resolve(item, parts[:-1])
+            if isinstance(parent, dict):
+                parent.pop(parts[-1], None)
+            elif isinstance(parent, list) and parts[-1] < len(parent):
+                parent.pop(parts[-1])
+        else:
+            operand = _operand_value(item, parser.operand())
+            current = resolve(item, parts)
+            if clause == 'ADD':
+                if isinstance(operand, (set, frozenset)):
+                    value = set(current if current is not MISSING else ()) | operand
+                else:
+                    value = (current if current is not MISSING else 0) + operand
+                _set_path(item, parts, value)
+            elif current is not MISSING:
+                _set_path(item, parts, set(current) - set(operand))
+    return changed
+
+def _set_path(item, parts, value):
+    parent = resolve(item, parts[:-1])
+    if parent is MISSING or not isinstance(parent, (dict, list)):
+        raise ValidationError('The document path provided in the update expression is invalid for update')
+    if isinstance(parent, list):
+        if parts[-1] < len(parent):
+            parent[parts[-1]] = value
+        else:
+            parent.append(value)
+    else:
+        parent[parts[-1]] = value
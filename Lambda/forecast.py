@@ -0,0 +1,52 @@
+# forecast.py
+import numpy as np
+
+# Below this much history a day-of-month profile would just memorise noise
+MIN_DAYS_FOR_MONTHLY_SEASONALITY = 90
+
+def daily_net_series(dates, amounts, start, end):
+    """Sum signed amounts into one value per day from start to end (datetime64[D])"""
+    offsets = (dates - start).astype(np.int64)
+    length = int((end - start).astype(np.int64)) + 1
+    keep = (offsets >= 0) & (offsets < length)
+    return np.bincount(offsets[keep], weights=amounts[keep], minlength=length)
+
+def design_matrix(start, offsets, history_days, monthly):
+    """Intercept, linear trend, day-of-week and (optionally) day-of-month indicators"""
+    days = start + offsets
+    # 1970-01-01 was a Thursday, so shift to make Monday == 0
+    weekday = (days.astype(np.int64) + 3) % 7
+    columns = [np.ones(len(offsets)), offsets / max(history_days - 1, 1)]
+    columns.extend((weekday == d).astype(np.float64) for d in range(1, 7))
+    if monthly:
+        day_of_month = (days - days.astype('datetime64[M]')).astype(np.int64)
+        columns.extend((day_of_month == d).astype(np.float64) for d in range(1, 31))
+    return np.column_stack(columns)
+
+def fit(series, start):
+    """Least-squares fit of trend plus seasonality; returns (coefficients, residuals, monthly)"""
+    monthly = len(series) >= MIN_DAYS_FOR_MONTHLY_SEASONALITY
+    X = design_matrix(start, np.arange(len(series)), len(series), monthly)
+    coefficients, _, _, _ = np.linalg.lstsq(X, series, rcond=None)
+    residuals = series - X @ coefficients
+    return coefficients, residuals, monthly
+
+def project(coefficients, start, history_days, horizon, monthly):
+    """Expected net cash flow for each of the next `horizon` days after the history"""
+    offsets = np.arange(history_days, history_days + horizon)
+    return design_matrix(start, offsets, history_days, monthly) @ coefficients
+
+def simulate_savings(baseline, residuals, paths, rng):
+    """Cumulative savings paths (paths x horizon) from bootstrapped residuals"""
+    if len(residuals) == 0 or len(baseline) == 0:
+        return np.tile(np.cumsum(baseline), (paths, 1))
+    noise = rng.choice(residuals.astype(np.float32), size=(paths, len(baseline)))
+    noise += baseline.astype(np.float32)
+    return np.cumsum(noise, axis=1)
+
+def goal_probabilities(savings, offsets, required):
+    """Share of paths whose savings reach the required amount by each goal's day offset"""
+    if savings.shape[1] == 0 or len(offsets) == 0:
+        return np.zeros(len(offsets))
+    columns = np.clip(offsets, 0, savings.shape[1] - 1)
+    return (savings[:, columns] >= required[np.newaxis, :]).mean(axis=0)
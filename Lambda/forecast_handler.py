@@ -0,0 +1,237 @@
+# forecast_handler.py
+import json
+import os
+import zlib
+import numpy as np
+from datetime import date
+import capacity
+import forecast
+import money
+import pagination
+import recurrence
+import result_cache
+import storage
+import tombstones
+
+dynamodb = storage.resource()
+expenses_table = capacity.Table(dynamodb, os.environ.get('EXPENSES_TABLE_NAME'))
+income_table = capacity.Table(dynamodb, os.environ.get('INCOME_TABLE_NAME'))
+goals_table = capacity.Table(dynamodb, os.environ.get('GOALS_TABLE_NAME'))
+
+DEFAULT_PATHS = int(os.environ.get('FORECAST_PATHS', '1000'))
+MAX_PATHS = 5000
+MAX_HORIZON_DAYS = 10 * 366
+
+def respond(status_code, body=None):
+    """Helper function for responses with CORS headers"""
+    return {
+        'statusCode': status_code,
+        'body': json.dumps(body, default=str) if body else None,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',  # Allow all origins
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,Chrome',
+        },
+    }
+
+def _readable(items, kind):
+    """Stored rows whose date parses; the rest are logged and left out rather than failing the request"""
+    readable = []
+    for item in items:
+        try:
+            recurrence.to_date(item.get('date'))
+        except (TypeError, ValueError):
+            print(f"Skipping {kind} {item.get('id')} with unreadable date {item.get('date')!r}")
+            continue
+        readable.append(item)
+    return readable
+
+def _target_date(goal):
+    try:
+        return recurrence.to_date(goal.get('targetDate'))
+    except (TypeError, ValueError):
+        print(f"Ignoring unreadable targetDate on goal {goal.get('id')}")
+        return None
+
+def load_cash_flows(user_id, today):
+    """Signed (date, minor amount) arrays of all income and expenses up to today, per currency"""
+    projection = {
+        'ProjectionExpression': 'id, #d, amount, amountMinor, currency, recurrence, overrides',
+        'ExpressionAttributeNames': {'#d': 'date'},
+        'ExpressionAttributeValues': {':uid': user_id},
+        'KeyConditionExpression': 'userId = :uid',
+    }
+    income = _readable(pagination.query_all(income_table, IndexName='UserIdIndex', **projection), 'income')
+    expenses = _readable(pagination.query_all(expenses_table, **projection), 'expense')
+
+    # Recurring series contribute every occurrence up to today
+    income = recurrence.expand_items(income, None, today)
+    expenses = recurrence.expand_items(expenses, None, today)
+
+    rows = [(item, 1) for item in income] + [(item, -1) for item in expenses]
+    by_currency = {}
+    for item, sign in rows:
+        if item.get('date') and money.minor_of(item) is not None:
+            by_currency.setdefault(money.currency_of(item), []).append((str(item['date'])[:10], sign * money.minor_of(item)))
+    return {
+        currency: (
+            np.array([day for day, _ in flows], dtype='datetime64[D]'),
+            np.array([amount for _, amount in flows], dtype=np.float64),
+        )
+        for currency, flows in by_currency.items()
+    }
+
+def _forecast_currency(user_id, currency, dates, amounts, goals, paths, today):
+    """Projection and goal probabilities for the cash flows and goals in one currency"""
+    today_np = np.datetime64(today.isoformat(), 'D')
+    start = dates.min() if len(dates) else today_np
+    series = forecast.daily_net_series(dates, amounts, start, today_np)
+    current_balance = int(round(series.sum()))
+
+    goal_dates = [_target_date(goal) for goal in goals]
+    future = [d for d in goal_dates if d and d > today]
+    horizon = min(max(((max(future) - today).days if future else 0), 365), MAX_HORIZON_DAYS)
+
+    coefficients, residuals, monthly = forecast.fit(series, start)
+    baseline = forecast.project(coefficients, start, len(series), horizon, monthly)
+    rng = np.random.default_rng(zlib.crc32(f"{user_id}#{currency}".encode('utf-8')))
+    savings = forecast.simulate_savings(baseline, residuals, paths, rng)
+
+    # Goals due in the future are funded in deadline order, so each one also needs everything
+    # due before it. Undated goals are funded after all of them, by the end of the horizon, and
+    # past-due goals are reported without taking from the savings of the others.
+    dated = sorted((i for i, due in enumerate(goal_dates) if due and due > today), key=lambda i: goal_dates[i])
+    undated = [i for i, due in enumerate(goal_dates) if due is None]
+    overdue = [i for i, due in enumerate(goal_dates) if due and due <= today]
+    order = dated + undated
+
+    def remaining_of(goal):
+        return max((money.minor_of(goal, 'targetAmountMinor') or 0) - (money.minor_of(goal, 'currentAmountMinor') or 0), 0)
+
+    remaining = np.array([remaining_of(goals[i]) for i in order], dtype=np.float64)
+    required = np.cumsum(remaining)
+    offsets = np.array(
+        [(goal_dates[i] - today).days - 1 for i in dated] + [horizon - 1] * len(undated),
+        dtype=np.int64
+    )
+    probabilities = forecast.goal_probabilities(savings, offsets, required)
+    medians = np.median(savings[:, np.clip(offsets, 0, max(horizon - 1, 0))], axis=0) if horizon else np.zeros(len(order))
+
+    goal_results = []
+    for position, i in enumerate(order):
+        goal = goals[i]
+        goal_results.append({
+            'id': goal['id'],
+            'name': goal.get('name'),
+            'targetDate': goal.get('targetDate'),
+            'remaining': money.to_major(int(remaining[position]), currency),
+            'probability': round(1.0 if remaining[position] == 0 else float(probabilities[position]), 4),
+            'expectedSavingsByTargetDate': money.to_major(int(round(medians[position])), currency),
+        })
+    for i in overdue:
+        goal = goals[i]
+        remaining_minor = remaining_of(goal)
+        goal_results.append({
+            'id': goal['id'],
+            'name': goal.get('name'),
+            'targetDate': goal.get('targetDate'),
+            'remaining': money.to_major(remaining_minor, currency),
+            'probability': 1.0 if remaining_minor == 0 else 0.0,
+            'expectedSavingsByTargetDate': None,
+        })
+
+    # Balance percentiles every 30 days keep the response small
+    sample_offsets = np.arange(29, horizon, 30)
+    percentiles = np.percentile(savings[:, sample_offsets], [10, 50, 90], axis=0) if len(sample_offsets) else np.zeros((3, 0))
+    projection = [
+        {
+            'date': str(today_np + int(offset) + 1),
+            'p10': money.to_major(current_balance + int(round(percentiles[0][j])), currency),
+            'p50': money.to_major(current_balance + int(round(percentiles[1][j])), currency),
+            'p90': money.to_major(current_balance + int(round(percentiles[2][j])), currency),
+        }
+        for j, offset in enumerate(sample_offsets)
+    ]
+
+    return {
+        'historyDays': len(series),
+        'currentBalance': money.to_major(current_balance, currency),
+        'projection': projection,
+        'goals': goal_results,
+    }
+
+def build_forecast(user_id, goals, paths):
+    """Forecast per currency: amounts in different currencies are never added together"""
+    today = date.today()
+    flows = load_cash_flows(user_id, today)
+    goals_by_currency = {}
+    for goal in goals:
+        goals_by_currency.setdefault(money.currency_of(goal), []).append(goal)
+
+    no_flows = (np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64))
+    return {
+        'asOf': today.isoformat(),
+        'paths': paths,
+        'currencies': {
+            currency: _forecast_currency(
+                user_id, currency, *flows.get(currency, no_flows), goals_by_currency.get(currency, []), paths, today
+            )
+            for currency in sorted(set(flows) | set(goals_by_currency))
+        },
+    }
+
+def data_version(user_id):
+    """The user's latest income, expense and goal write and latest delete.
+
+    Writes bump updatedAt whichever container handles them, so a cached forecast
+    is reused only while this is unchanged. Each part is one single-item Query.
+    """
+    version = []
+    for table in (income_table, expenses_table, goals_table):
+        response = table.query(
+            IndexName='UserIdUpdatedAtIndex',
+            KeyConditionExpression='userId = :uid',
+            ExpressionAttributeValues={':uid': user_id},
+            ScanIndexForward=False,
+            Limit=1
+        )
+        version.append(next((item.get('updatedAt') for item in response.get('Items', [])), None))
+    if tombstones.table is not None:
+        response = tombstones.table.query(
+            KeyConditionExpression='userId = :uid',
+            ExpressionAttributeValues={':uid': user_id},
+            ScanIndexForward=False,
+            Limit=1
+        )
+        version.append(next((item.get('deletedAtKey') for item in response.get('Items', [])), None))
+    return version
+
+def get_forecast(event, context):
+    try:
+        user_id = event['pathParameters']['userid']
+        params = event.get('queryStringParameters') or {}
+        paths = min(max(int(params.get('paths', DEFAULT_PATHS)), 100), MAX_PATHS)
+
+        # Reused while no income, expense or goal of the user has changed on any container
+        version = data_version(user_id)
+        cached = result_cache.get('forecast', user_id)
+        if cached is not None:
+            cached_version, cached_result = cached
+            if cached_version == version and cached_result['paths'] == paths and cached_result['asOf'] == date.today().isoformat():
+                return respond(200, cached_result)
+
+        goals = pagination.query_all(
+            goals_table,
+            IndexName='UserIdIndex',
+            KeyConditionExpression='userId = :uid',
+            ExpressionAttributeValues={':uid': user_id}
+        )
+        result = build_forecast(user_id, goals, paths)
+        result_cache.put('forecast', user_id, (version, result))
+        return respond(200, result)
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
+    except Exception as e:
+        print(f"Error building forecast: {e}")
+        return respond(500, {'error': 'Could not build forecast'})
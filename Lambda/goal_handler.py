@@ -2,13 +2,17 @@
 import json
 import os
 import uuid
-import boto3
 from datetime import datetime
-from decimal import Decimal
-
-dynamodb = boto3.resource('dynamodb')
+import batch_get
+import capacity
+import money
+import result_cache
+import storage
+import tombstones
+
+dynamodb = storage.resource()
 table_name = os.environ.get('GOALS_TABLE_NAME')  # Default to 'Goals' if not set
-table = dynamodb.Table(table_name)
+table = capacity.Table(dynamodb, table_name)
 
 def respond(status_code, body=None):
     """Helper function for responses with CORS headers"""
@@ -30,13 +34,15 @@ def create_goal(event, context):
 
         goal_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
+        currency = money.parse_currency(body.get('currency'))
 
         item = {
             'id': goal_id,
             'userId': user_id,
             'name': body.get('name'),
-            'targetAmount': Decimal(str(body.get('targetAmount'))),
-            'currentAmount': Decimal(str(body.get('currentAmount', 0))),  # Default to 0 if not provided
+            'targetAmountMinor': money.parse_amount(body.get('targetAmount'), currency, required=True),
+            'currentAmountMinor': money.parse_amount(body.get('currentAmount', 0), currency) or 0,  # Default to 0 if not provided
+            'currency': currency,
             'category': body.get('category'),
             'targetDate': body.get('targetDate'),
             'description': body.get('description'),
@@ -45,8 +51,11 @@ def create_goal(event, context):
         }
 
         table.put_item(Item=item)
+        result_cache.invalidate(user_id, namespaces=('forecast',))
 
-        return respond(201, item)
+        return respond(201, money.present(item))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error creating goal: {e}")
         return respond(500, {'error': 'Could not create goal'})
@@ -56,12 +65,22 @@ def get_goals(event, context):
         user_id = event['pathParameters']['userid']
         goal_id = event['pathParameters'].get('goalid')
 
+        # ?ids=a,b,c fetches a known set of goals (e.g. those on the dashboard) in one round
+        ids = batch_get.parse_ids(event)
+        if ids is not None:
+            items = batch_get.fetch(
+                dynamodb, table_name,
+                [{'id': item_id, 'userId': user_id} for item_id in ids],
+                **batch_get.projection_args(event, ('id', 'targetAmount', 'currentAmount', 'targetAmountMinor', 'currentAmountMinor', 'currency'))
+            )
+            return respond(200, batch_get.ordered_result(ids, items, money.present))
+
         if goal_id:
             response = table.get_item(
                 Key={'id': goal_id, 'userId': user_id}
             )
             if 'Item' in response:
-                return respond(200, response['Item'])
+                return respond(200, money.present(response['Item']))
             else:
                 return respond(200, [])  # Return empty array instead of 404
         else:
@@ -72,7 +91,7 @@ def get_goals(event, context):
                     KeyConditionExpression='userId = :uid',
                     ExpressionAttributeValues={':uid': user_id}
                 )
-                return respond(200, response.get('Items', []))
+                return respond(200, money.present_all(response.get('Items', [])))
             except Exception as inner_e:
                 print(f"GSI query failed, falling back to scan: {inner_e}")
                 # Fall back to scan if GSI doesn't exist
@@ -80,7 +99,9 @@ def get_goals(event, context):
                     FilterExpression='userId = :uid',
                     ExpressionAttributeValues={':uid': user_id}
                 )
-                return respond(200, response.get('Items', []))
+                return respond(200, money.present_all(response.get('Items', [])))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error getting goals: {e}")
         # Return empty array instead of error when no goals found
@@ -93,15 +114,17 @@ def update_goal(event, context):
         body = json.loads(event['body'])
         timestamp = datetime.now().isoformat()
 
-        update_expression = "SET #n = :n, targetAmount = :ta, currentAmount = :ca, category = :c, targetDate = :td, #d = :d, updatedAt = :ua"
+        currency = money.parse_currency(body.get('currency'))
+        update_expression = "SET #n = :n, targetAmountMinor = :ta, currentAmountMinor = :ca, currency = :cur, category = :c, targetDate = :td, #d = :d, updatedAt = :ua REMOVE targetAmount, currentAmount"
         expression_attribute_names = {
             '#n': 'name',
             '#d': 'description'
         }
         expression_attribute_values = {
             ':n': body.get('name'),
-            ':ta': Decimal(str(body.get('targetAmount'))),
-            ':ca': Decimal(str(body.get('currentAmount'))),
+            ':ta': money.parse_amount(body.get('targetAmount'), currency, required=True),
+            ':ca': money.parse_amount(body.get('currentAmount'), currency, required=True),
+            ':cur': currency,
             ':c': body.get('category'),
             ':td': body.get('targetDate'),
             ':d': body.get('description'),
@@ -116,7 +139,10 @@ def update_goal(event, context):
             ReturnValues="ALL_NEW"
         )
 
-        return respond(200, response['Attributes'])
+        result_cache.invalidate(user_id, namespaces=('forecast',))
+        return respond(200, money.present(response['Attributes']))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error updating goal: {e}")
         return respond(500, {'error': 'Could not update goal'})
@@ -130,6 +156,8 @@ def delete_goal(event, context):
             Key={'id': goal_id, 'userId': user_id}
         )
 
+        result_cache.invalidate(user_id, namespaces=('forecast',))
+        tombstones.record(user_id, 'goal', goal_id)
         return respond(204, None)
     except Exception as e:
         print(f"Error deleting goal: {e}")
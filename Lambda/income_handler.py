@@ -2,13 +2,19 @@
 import json
 import os
 import uuid
-import boto3
 from datetime import datetime
-from decimal import Decimal
-
-dynamodb = boto3.resource('dynamodb')
+import batch_get
+import capacity
+import money
+import recurrence
+import result_cache
+import search_index
+import storage
+import tombstones
+
+dynamodb = storage.resource()
 table_name = os.environ.get('INCOME_TABLE_NAME')  # Default to 'Income' if not set
-table = dynamodb.Table(table_name)
+table = capacity.Table(dynamodb, table_name)
 
 def respond(status_code, body=None):
     """Helper function for responses with CORS headers"""
@@ -30,12 +36,14 @@ def create_income(event, context):
 
         income_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
+        currency = money.parse_currency(body.get('currency'))
 
         item = {
             'id': income_id,  # Partition key
             'userId': user_id, # Sort key
             'name': body.get('name'),
-            'amount': Decimal(str(body.get('amount'))),
+            'amountMinor': money.parse_amount(body.get('amount'), currency, required=True),
+            'currency': currency,
             'category': body.get('category'),
             'date': body.get('date'),
             'paymentMethod': body.get('paymentMethod'),
@@ -45,9 +53,18 @@ def create_income(event, context):
             'updatedAt': timestamp
         }
 
+        # A recurring income (e.g. salary) is stored once as a series and expanded on read
+        if body.get('recurrence'):
+            item['recurrence'] = recurrence.parse_rule(body['recurrence'])
+            item['overrides'] = {}
+
         table.put_item(Item=item)
+        search_index.upsert(user_id, 'income', item)
+        result_cache.invalidate(user_id, namespaces=('forecast',))
 
-        return respond(201, item)
+        return respond(201, money.present(item))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error creating income: {e}")
         return respond(500, {'error': 'Could not create income'})
@@ -57,12 +74,22 @@ def get_income(event, context):
         user_id = event['pathParameters']['userid']
         income_id = event['pathParameters'].get('incomeid')
 
+        # ?ids=a,b,c fetches a known set of income items in one BatchGetItem round
+        ids = batch_get.parse_ids(event)
+        if ids is not None:
+            items = batch_get.fetch(
+                dynamodb, table_name,
+                [{'id': item_id, 'userId': user_id} for item_id in ids],
+                **batch_get.projection_args(event, ('id', 'amount', 'amountMinor', 'currency'))
+            )
+            return respond(200, batch_get.ordered_result(ids, items, money.present))
+
         if income_id:
             response = table.get_item(
                 Key={'id': income_id, 'userId': user_id}  # Correct key order
             )
             if 'Item' in response:
-                return respond(200, response['Item'])
+                return respond(200, money.present(response['Item']))
             else:
                 return respond(404, {'error': 'Income item not found'})
         else:
@@ -72,7 +99,15 @@ def get_income(event, context):
                 KeyConditionExpression='userId = :uid',
                 ExpressionAttributeValues={':uid': user_id}
             )
-            return respond(200, response['Items'])
+            items = response['Items']
+
+            # Expand recurring series only for the requested window
+            window_start, window_end, keep_one_offs = recurrence.parse_list_window(event)
+            if window_start:
+                items = recurrence.expand_items(items, window_start, window_end, keep_one_offs=keep_one_offs)
+            return respond(200, money.present_all(items))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error getting income: {e}")
         return respond(500, {'error': 'Could not retrieve income'})
@@ -84,14 +119,39 @@ def update_income(event, context):
         body = json.loads(event['body'])
         timestamp = datetime.now().isoformat()
 
-        update_expression = "SET #n = :n, amount = :a, category = :c, #d = :d, paymentMethod = :pm, notes = :nt, receiptUrl = :ru, updatedAt = :ua"
+        # Editing a single occurrence stores an override on the series
+        occurrence_date, scope = recurrence.parse_scope(event)
+        if scope == 'following':
+            raise ValueError('Only one occurrence or the whole series can be edited')
+        if occurrence_date:
+            recurrence.check_occurrence_date(body, occurrence_date)
+        if scope == 'occurrence':
+            fields = {k: body[k] for k in ('name', 'category', 'paymentMethod', 'notes', 'receiptUrl') if k in body}
+            if 'amount' in body:
+                # The override amount is in the series' currency, whatever the request's default would be
+                series = recurrence.get_series(table, {'id': income_id, 'userId': user_id})
+                fields['amountMinor'] = money.parse_item_amount(body['amount'], series, body.get('currency'), required=True)
+            attributes = recurrence.override_occurrence(table, {'id': income_id, 'userId': user_id}, occurrence_date, fields)
+            search_index.upsert(user_id, 'income', attributes)
+            result_cache.invalidate(user_id, namespaces=('forecast',))
+            return respond(200, money.present(attributes))
+
+        # A whole-series edit made from one of its occurrences keeps the series start date and currency
+        if occurrence_date:
+            series = recurrence.get_series(table, {'id': income_id, 'userId': user_id})
+            body['date'] = series['date']
+            body['currency'] = body.get('currency') or money.currency_of(series)
+
+        currency = money.parse_currency(body.get('currency'))
+        update_expression = "SET #n = :n, amountMinor = :a, currency = :cur, category = :c, #d = :d, paymentMethod = :pm, notes = :nt, receiptUrl = :ru, updatedAt = :ua"
         expression_attribute_names = {
             '#n': 'name',
             '#d': 'date'
         }
         expression_attribute_values = {
             ':n': body.get('name'),
-            ':a': Decimal(str(body.get('amount'))),
+            ':a': money.parse_amount(body.get('amount'), currency, required=True),
+            ':cur': currency,
             ':c': body.get('category'),
             ':d': body.get('date'),
             ':pm': body.get('paymentMethod'),
@@ -99,6 +159,16 @@ def update_income(event, context):
             ':ru': body.get('receiptUrl'),
             ':ua': timestamp
         }
+        remove_attributes = ['amount']  # Legacy Decimal amount, superseded by amountMinor
+
+        if 'recurrence' in body:
+            if body['recurrence']:
+                update_expression += ", recurrence = :r, overrides = :o"
+                expression_attribute_values[':r'] = recurrence.parse_rule(body['recurrence'])
+                expression_attribute_values[':o'] = {}
+            else:
+                remove_attributes += ['recurrence', 'overrides']
+        update_expression += " REMOVE " + ", ".join(remove_attributes)
 
         response = table.update_item(
             Key={'id': income_id, 'userId': user_id},  # Correct key order
@@ -108,7 +178,11 @@ def update_income(event, context):
             ReturnValues="ALL_NEW"
         )
 
-        return respond(200, response['Attributes'])
+        search_index.upsert(user_id, 'income', response['Attributes'])
+        result_cache.invalidate(user_id, namespaces=('forecast',))
+        return respond(200, money.present(response['Attributes']))
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error updating income: {e}")
         return respond(500, {'error': 'Could not update income'})
@@ -118,11 +192,28 @@ def delete_income(event, context):
         user_id = event['pathParameters']['userid']
         income_id = event['pathParameters']['incomeid']
 
+        # Deleting a single occurrence records it as an exception on the series
+        occurrence_date, scope = recurrence.parse_scope(event)
+        if scope == 'following':
+            attributes = recurrence.end_series(table, {'id': income_id, 'userId': user_id}, occurrence_date)
+            search_index.upsert(user_id, 'income', attributes)
+            result_cache.invalidate(user_id, namespaces=('forecast',))
+            return respond(204, None)
+        if scope == 'occurrence':
+            recurrence.skip_occurrence(table, {'id': income_id, 'userId': user_id}, occurrence_date)
+            result_cache.invalidate(user_id, namespaces=('forecast',))
+            return respond(204, None)
+
         table.delete_item(
             Key={'id': income_id, 'userId': user_id}  # Correct key order
         )
 
+        search_index.remove(user_id, 'income', income_id)
+        tombstones.record(user_id, 'income', income_id)
+        result_cache.invalidate(user_id, namespaces=('forecast',))
         return respond(204, None)
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
     except Exception as e:
         print(f"Error deleting income: {e}")
         return respond(500, {'error': 'Could not delete income'})
\ No newline at end of file
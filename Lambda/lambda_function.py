@@ -5,6 +5,10 @@ import os
 import boto3
 from datetime import datetime
 from decimal import Decimal
+import capacity
+import rate_limit
+import session_tokens
+import traffic_capture
 
 # Initialize DynamoDB resource outside handler
 dynamodb = boto3.resource('dynamodb')
@@ -43,6 +47,10 @@ expense_handler_module = load_handler_module("./expense_handler.py", "expense_ha
 income_handler_module = load_handler_module("./income_handler.py", "income_handler")
 goal_handler_module = load_handler_module("./goal_handler.py", "goal_handler")
 event_handler_module = load_handler_module("./event_handler.py", "event_handler")
+search_handler_module = load_handler_module("./search_handler.py", "search_handler")
+forecast_handler_module = load_handler_module("./forecast_handler.py", "forecast_handler")
+sync_handler_module = load_handler_module("./sync_handler.py", "sync_handler")
+summary_handler_module = load_handler_module("./summary_handler.py", "summary_handler")
 
 # Get handler functions from modules
 def get_handler_function(module, function_name):
@@ -57,6 +65,7 @@ update_user = get_handler_function(user_handler_module, 'update_user')
 delete_user = get_handler_function(user_handler_module, 'delete_user')
 login = get_handler_function(user_handler_module, 'login')
 change_password = get_handler_function(user_handler_module, 'change_password')
+logout = get_handler_function(user_handler_module, 'logout')
 
 # Expense handlers
 create_expense = get_handler_function(expense_handler_module, 'create_expense')
@@ -81,11 +90,73 @@ create_event = get_handler_function(event_handler_module, 'create_event')
 get_event = get_handler_function(event_handler_module, 'get_event')
 update_event = get_handler_function(event_handler_module, 'update_event')
 delete_event = get_handler_function(event_handler_module, 'delete_event')
+get_calendar = get_handler_function(event_handler_module, 'get_calendar')
+
+# Search handlers
+search = get_handler_function(search_handler_module, 'search')
+
+# Forecast handlers (needs numpy; the route is unavailable if the module fails to load)
+get_forecast = get_handler_function(forecast_handler_module, 'get_forecast')
+
+# Sync handlers
+sync = get_handler_function(sync_handler_module, 'sync')
+
+# Summary handlers
+get_summary = get_handler_function(summary_handler_module, 'get_summary')
+
+# Routes that can be called without a session token
+PUBLIC_ROUTES = {('POST', '/users'), ('POST', '/login')}
+
+# Verify the session token in-process; returns an error response or None when the request may proceed
+def authorize(event, http_method, path):
+    if not session_tokens.enabled() or (http_method, path) in PUBLIC_ROUTES:
+        return None
+
+    token = session_tokens.bearer_token(event)
+    if not token:
+        return respond(401, {'message': 'Missing session token'})
+    try:
+        claims = session_tokens.verify(token)
+    except session_tokens.TokenError as e:
+        return respond(401, {'message': str(e)})
+
+    required_scope = 'read' if http_method == 'GET' else 'write'
+    if required_scope not in claims.get('scopes', []):
+        return respond(403, {'message': f"Token lacks the '{required_scope}' scope"})
+
+    # The user in the path (or body for password changes) must be the token's user
+    if path == '/pass_change':
+        try:
+            body = json.loads(event.get('body') or '{}')
+        except (TypeError, ValueError):
+            body = None
+        if not isinstance(body, dict):
+            return respond(400, {'message': 'Request body must be a JSON object'})
+        path_user_id = body.get('userId')
+    elif path == '/logout':
+        path_user_id = claims['sub']
+    else:
+        path_parts = path.split('/')
+        path_user_id = path_parts[2] if len(path_parts) > 2 else None
+    if path_user_id != claims['sub']:
+        return respond(403, {'message': 'Token does not grant access to this user'})
+
+    event.setdefault('requestContext', {})
+    if event['requestContext'] is None:
+        event['requestContext'] = {}
+    event['requestContext']['authorizer'] = {'claims': claims}
+    return None
 
 def lambda_handler(event, context):
-    # Debug the incoming event
-    print(f"Incoming event: {json.dumps(event, default=str)}")
-    
+    # Account DynamoDB capacity consumed while handling this request
+    capacity.start()
+    capture = traffic_capture.begin(event)
+    response = handle_request(event, context)
+    traffic_capture.record(capture, response)
+    return capacity.finish(event, response)
+
+def handle_request(event, context):
+    # Never log the raw event: it carries the bearer token and, on /login, the password
     # Extract HTTP method and path
     http_method = event.get('httpMethod')
     path = event.get('path')
@@ -98,7 +169,7 @@ def lambda_handler(event, context):
             return respond(200, {'message': 'Lambda function is working correctly'})
         
         # Otherwise, it's probably a malformed request
-        print(f"Error: Missing required parameters. Event structure: {event}")
+        print(f"Error: Missing required parameters. Event keys: {sorted(event)}")
         return respond(400, {'message': 'Missing required API Gateway parameters'})
     
     print(f"Processing request: Method: {http_method}, Path: {path}")
@@ -106,6 +177,18 @@ def lambda_handler(event, context):
     # Handle OPTIONS requests for CORS
     if http_method == 'OPTIONS':
         return respond(200, {'message': 'CORS preflight successful'})
+
+    auth_error = authorize(event, http_method, path)
+    if auth_error:
+        return auth_error
+
+    # Throttle one client before it can hot-spot its partition for everyone else
+    retry_after = rate_limit.check(rate_limit.client_key(event, path), rate_limit.route_class(http_method, path))
+    if retry_after:
+        response = respond(429, {'message': 'Too many requests'})
+        response['headers']['Retry-After'] = str(retry_after)
+        response['headers']['Access-Control-Expose-Headers'] = 'Retry-After'  # Readable by the browser client
+        return response
     
     # User routes
     if path == '/users' and http_method == 'POST' and signup:
@@ -123,6 +206,8 @@ def lambda_handler(event, context):
         return login(event)
     elif path == '/pass_change' and http_method == 'POST' and change_password:
         return change_password(event)
+    elif path == '/logout' and http_method == 'POST' and logout:
+        return logout(event)
     
     # Expense routes
     elif path.startswith('/expenses/'):
@@ -262,6 +347,91 @@ def lambda_handler(event, context):
             else:
                 return respond(400, {'message': 'Invalid HTTP method for this resource'})
     
+    # Calendar routes
+    elif path.startswith('/calendar/'):
+        path_parts = path.split('/')
+        user_id = path_parts[2] if len(path_parts) > 2 else None
+
+        if not user_id:
+            return respond(400, {'message': 'User ID is required in the path'})
+
+        if 'pathParameters' not in event or event['pathParameters'] is None:
+            event['pathParameters'] = {}
+        event['pathParameters']['userid'] = user_id
+
+        if http_method == 'GET' and get_calendar:
+            return get_calendar(event, context)
+        else:
+            return respond(400, {'message': 'Invalid HTTP method for this resource'})
+
+    # Search routes
+    elif path.startswith('/search/'):
+        path_parts = path.split('/')
+        user_id = path_parts[2] if len(path_parts) > 2 else None
+
+        if not user_id:
+            return respond(400, {'message': 'User ID is required in the path'})
+
+        if 'pathParameters' not in event or event['pathParameters'] is None:
+            event['pathParameters'] = {}
+        event['pathParameters']['userid'] = user_id
+
+        if http_method == 'GET' and search:
+            return search(event, context)
+        else:
+            return respond(400, {'message': 'Invalid HTTP method for this resource'})
+
+    # Forecast routes
+    elif path.startswith('/forecast/'):
+        path_parts = path.split('/')
+        user_id = path_parts[2] if len(path_parts) > 2 else None
+
+        if not user_id:
+            return respond(400, {'message': 'User ID is required in the path'})
+
+        if 'pathParameters' not in event or event['pathParameters'] is None:
+            event['pathParameters'] = {}
+        event['pathParameters']['userid'] = user_id
+
+        if http_method == 'GET' and get_forecast:
+            return get_forecast(event, context)
+        else:
+            return respond(400, {'message': 'Invalid HTTP method for this resource'})
+
+    # Sync routes
+    elif path.startswith('/sync/'):
+        path_parts = path.split('/')
+        user_id = path_parts[2] if len(path_parts) > 2 else None
+
+        if not user_id:
+            return respond(400, {'message': 'User ID is required in the path'})
+
+        if 'pathParameters' not in event or event['pathParameters'] is None:
+            event['pathParameters'] = {}
+        event['pathParameters']['userid'] = user_id
+
+        if http_method == 'GET' and sync:
+            return sync(event, context)
+        else:
+            return respond(400, {'message': 'Invalid HTTP method for this resource'})
+
+    # Summary routes
+    elif path.startswith('/summary/'):
+        path_parts = path.split('/')
+        user_id = path_parts[2] if len(path_parts) > 2 else None
+
+        if not user_id:
+            return respond(400, {'message': 'User ID is required in the path'})
+
+        if 'pathParameters' not in event or event['pathParameters'] is None:
+            event['pathParameters'] = {}
+        event['pathParameters']['userid'] = user_id
+
+        if http_method == 'GET' and get_summary:
+            return get_summary(event, context)
+        else:
+            return respond(400, {'message': 'Invalid HTTP method for this resource'})
+
     # Route not found
     else:
         return respond(404, {'message': 'Route not found'})
\ No newline at end of file
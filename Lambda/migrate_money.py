@@ -0,0 +1,75 @@
+# migrate_money.py
+"""Rewrite legacy Decimal amounts as integer minor units plus a currency code.
+
+Usage: python migrate_money.py [--dry-run] [--currency USD]
+
+Safe to re-run: items that already have their minor-unit attributes are skipped,
+and every update is conditional on the minor-unit attribute still being absent.
+"""
+import argparse
+import os
+import boto3
+import money
+
+# Table env var -> legacy attribute -> minor-unit attribute
+MIGRATIONS = {
+    'EXPENSES_TABLE_NAME': {'amount': 'amountMinor'},
+    'INCOME_TABLE_NAME': {'amount': 'amountMinor'},
+    'EVENT_TABLE_NAME': {'amount': 'amountMinor'},
+    'GOALS_TABLE_NAME': {'targetAmount': 'targetAmountMinor', 'currentAmount': 'currentAmountMinor'},
+}
+
+def migrate_table(table, fields, currency, dry_run=False):
+    key_names = [key['AttributeName'] for key in table.key_schema]
+    migrated = skipped = 0
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            pending = {legacy: minor for legacy, minor in fields.items() if legacy in item and minor not in item}
+            if not pending:
+                skipped += 1
+                continue
+
+            item_currency = item.get('currency') or currency
+            set_parts = ['currency = :cur']
+            values = {':cur': item_currency}
+            names = {}
+            for i, (legacy, minor) in enumerate(pending.items()):
+                names[f'#m{i}'] = minor
+                names[f'#l{i}'] = legacy
+                set_parts.append(f'#m{i} = :m{i}')
+                values[f':m{i}'] = money.minor_of({legacy: item[legacy], 'currency': item_currency}, minor)
+
+            if not dry_run:
+                table.update_item(
+                    Key={name: item[name] for name in key_names},
+                    UpdateExpression='SET ' + ', '.join(set_parts) + ' REMOVE ' + ', '.join(f'#l{i}' for i in range(len(pending))),
+                    ConditionExpression=' AND '.join(f'attribute_not_exists(#m{i})' for i in range(len(pending))),
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values
+                )
+            migrated += 1
+
+        if 'LastEvaluatedKey' not in response:
+            return migrated, skipped
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='Count items without writing')
+    parser.add_argument('--currency', default=money.DEFAULT_CURRENCY, help='Currency for items without one')
+    args = parser.parse_args()
+
+    currency = money.parse_currency(args.currency)
+    dynamodb = boto3.resource('dynamodb')
+    for env_name, fields in MIGRATIONS.items():
+        table_name = os.environ.get(env_name)
+        if not table_name:
+            print(f"Skipping {env_name}: not set")
+            continue
+        migrated, skipped = migrate_table(dynamodb.Table(table_name), fields, currency, args.dry_run)
+        print(f"{table_name}: {migrated} migrated, {skipped} already current")
+
+if __name__ == '__main__':
+    main()
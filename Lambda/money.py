@@ -0,0 +1,117 @@
+# money.py
+import os
+from decimal import Decimal, InvalidOperation
+
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'INR')
+
+# Digits after the decimal point for each ISO 4217 currency we accept
+CURRENCY_EXPONENTS = {
+    'USD': 2, 'EUR': 2, 'GBP': 2, 'INR': 2, 'CAD': 2, 'AUD': 2, 'CHF': 2,
+    'CNY': 2, 'SGD': 2, 'NZD': 2, 'JPY': 0, 'KRW': 0, 'BHD': 3, 'KWD': 3,
+}
+
+# Stored amount attributes and the field name they are presented as
+MONEY_FIELDS = {
+    'amountMinor': 'amount',
+    'targetAmountMinor': 'targetAmount',
+    'currentAmountMinor': 'currentAmount',
+}
+
+def parse_currency(value):
+    currency = (value or DEFAULT_CURRENCY).upper()
+    if currency not in CURRENCY_EXPONENTS:
+        raise ValueError(f"Unsupported currency: {currency}")
+    return currency
+
+def parse_amount(value, currency=None, required=False):
+    """Parse a request amount into integer minor units (paise for INR, cents for USD).
+
+    Returns None for a missing optional amount; raises ValueError for a missing
+    required amount, anything that is not a finite number, or more precision
+    than the currency allows.
+    """
+    if value is None or value == '':
+        if required:
+            raise ValueError('amount is required')
+        return None
+    currency = parse_currency(currency)
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value}")
+
+    minor = amount.scaleb(CURRENCY_EXPONENTS[currency])
+    if minor != minor.to_integral_value():
+        raise ValueError(f"Amount {value} has too many decimal places for {currency}")
+    return int(minor)
+
+def parse_item_amount(value, item, currency=None, required=False):
+    """Parse an amount for an existing item, in the item's own currency.
+
+    A request currency that differs from the item's raises ValueError rather
+    than silently rescaling the amount.
+    """
+    item_currency = currency_of(item)
+    if currency and parse_currency(currency) != item_currency:
+        raise ValueError(f"Amount must be in the item's currency ({item_currency})")
+    return parse_amount(value, item_currency, required=required)
+
+def to_major(minor, currency=None):
+    """Minor units -> a plain JSON number in major units, for responses only"""
+    if minor is None:
+        return None
+    exponent = CURRENCY_EXPONENTS.get((currency or DEFAULT_CURRENCY).upper(), 2)
+    return int(minor) / 10 ** exponent if exponent else int(minor)
+
+def minor_of(item, field='amountMinor'):
+    """Read an amount in minor units, falling back to the legacy Decimal attribute"""
+    value = item.get(field)
+    if value is not None:
+        return int(value)
+    legacy = item.get(MONEY_FIELDS[field])
+    if legacy is None:
+        return None
+    exponent = CURRENCY_EXPONENTS.get(item.get('currency') or DEFAULT_CURRENCY, 2)
+    return int(Decimal(str(legacy)).scaleb(exponent).to_integral_value())
+
+def currency_of(item):
+    """An item's currency; items stored before currencies existed are in the default one"""
+    return (item.get('currency') or DEFAULT_CURRENCY).upper()
+
+def present(item):
+    """Copy of a stored item with major-unit amounts added next to the minor-unit fields"""
+    if not isinstance(item, dict):
+        return item
+    presented = dict(item)
+    for field, major_field in MONEY_FIELDS.items():
+        minor = minor_of(item, field) if (field in item or major_field in item) else None
+        if minor is not None:
+            presented[field] = minor
+            presented[major_field] = to_major(minor, item.get('currency'))
+    if 'amountMinor' in presented or 'targetAmountMinor' in presented:
+        presented['currency'] = item.get('currency') or DEFAULT_CURRENCY
+    return presented
+
+def present_all(items):
+    return [present(item) for item in items]
+
+def sum_minor(items, field='amountMinor'):
+    """Integer total of an amount field; missing amounts count as zero"""
+    total = 0
+    for item in items:
+        value = minor_of(item, field)
+        if value is not None:
+            total += value
+    return total
+
+def totals_by(items, key, field='amountMinor'):
+    """Integer totals of an amount field grouped by key(item)"""
+    totals = {}
+    for item in items:
+        value = minor_of(item, field)
+        if value is not None:
+            group = key(item)
+            totals[group] = totals.get(group, 0) + value
+    return totals
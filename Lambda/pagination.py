@@ -0,0 +1,12 @@
+# pagination.py
+
+def query_all(table, **kwargs):
+    """Every item a Query matches, following LastEvaluatedKey; arguments set to None are left out"""
+    kwargs = {k: v for k, v in kwargs.items() if v is not None}
+    items = []
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
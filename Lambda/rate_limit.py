@@ -0,0 +1,166 @@
+# rate_limit.py
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+import capacity
+import storage
+
+# Token buckets per client and route class. Each container enforces its own bucket
+# (no I/O), and containers share per-window counts through a DynamoDB ADD counter so a
+# client spread over many containers still gets one allowance.
+ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+RATE_LIMIT_TABLE_NAME = os.environ.get('RATE_LIMIT_TABLE_NAME')
+WINDOW_SECONDS = int(os.environ.get('RATE_LIMIT_WINDOW_SECONDS', '10'))
+# Requests counted locally before they are added to the shared counter
+FLUSH_EVERY = int(os.environ.get('RATE_LIMIT_FLUSH_EVERY', '5'))
+MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '10000'))
+
+def _limit(name, default):
+    rate, burst = os.environ.get(f'RATE_LIMIT_{name.upper()}', default).split(',')
+    return float(rate), float(burst)
+
+# Route class -> (requests per second, burst). Bursts cover a page load plus quick
+# navigation (e.g. paging through calendar months); sustained rates sit well above
+# what one person clicking through the app produces.
+LIMITS = {
+    'read': _limit('read', '50,100'),
+    'write': _limit('write', '10,40'),
+    'scan': _limit('scan', '2,20'),
+    'login': _limit('login', '1,10'),
+}
+# Routes that read a user's whole history; calendar and sync are bounded Queries and count as reads
+SCAN_PREFIXES = ('/search/', '/forecast/', '/summary/')
+
+class LocalCounterStore:
+    """In-process stand-in for the shared counter table (single container, tests, replay)"""
+
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, count, expires_at):
+        with self.lock:
+            now = time.time()
+            for stale in [k for k, (_, expiry) in self.counts.items() if expiry < now]:
+                del self.counts[stale]
+            total = self.counts.get(key, (0, expires_at))[0] + count
+            self.counts[key] = (total, expires_at)
+            return total
+
+class DynamoCounterStore:
+    """Shared per-window counters; ADD is atomic across containers and TTL clears old windows"""
+
+    def __init__(self, table_name):
+        self.table = capacity.Table(storage.resource(), table_name)
+
+    def add(self, key, count, expires_at):
+        response = self.table.update_item(
+            Key={'id': key},
+            UpdateExpression='ADD hits :n SET expiresAt = :exp',
+            ExpressionAttributeValues={':n': count, ':exp': expires_at},
+            ReturnValues='UPDATED_NEW'
+        )
+        return int(response['Attributes']['hits'])
+
+store = DynamoCounterStore(RATE_LIMIT_TABLE_NAME) if RATE_LIMIT_TABLE_NAME else LocalCounterStore()
+
+# (client, route class) -> state, least recently used first
+_clients = OrderedDict()
+_lock = threading.Lock()
+
+def route_class(http_method, path):
+    if path == '/login':
+        return 'login'
+    if path.startswith(SCAN_PREFIXES):
+        return 'scan'
+    return 'read' if http_method == 'GET' else 'write'
+
+def client_key(event, path):
+    """The token's user, else the user in the path, else the caller's IP for public routes.
+
+    Logins are keyed by IP and email together, so people sharing a NAT address
+    do not lock each other out while guessing at one account stays limited.
+    """
+    request_context = event.get('requestContext') or {}
+    source_ip = str((request_context.get('identity') or {}).get('sourceIp'))
+    if path == '/login':
+        try:
+            body = json.loads(event.get('body') or '{}')
+        except (TypeError, ValueError):
+            body = {}
+        email = str(body.get('email') or '').lower() if isinstance(body, dict) else ''
+        return 'login:' + hashlib.sha256(f"{source_ip}|{email}".encode('utf-8')).hexdigest()[:16]
+    claims = (request_context.get('authorizer') or {}).get('claims') or {}
+    if claims.get('sub'):
+        return claims['sub']
+    path_parts = path.split('/')
+    if len(path_parts) > 2 and path_parts[2]:
+        return path_parts[2]
+    return 'ip:' + source_ip
+
+def _flush(client, klass, window, pending):
+    try:
+        store.add(f"{client}#{klass}#{window}", pending, (window + 2) * WINDOW_SECONDS)
+    except Exception as e:
+        print(f"Error updating rate limit counter: {e}")
+
+def check(client, klass):
+    """Seconds the client must wait before retrying, or None if the request may proceed"""
+    if not ENABLED:
+        return None
+    rate, burst = LIMITS[klass]
+    now = time.time()
+    window = int(now // WINDOW_SECONDS)
+
+    with _lock:
+        state = _clients.get((client, klass))
+        if state is None:
+            state = {'tokens': burst, 'updated': now, 'window': window, 'pending': 0, 'blocked_until': 0}
+            _clients[(client, klass)] = state
+            while len(_clients) > MAX_CLIENTS:
+                _clients.popitem(last=False)
+        _clients.move_to_end((client, klass))
+
+        # Another container already used up this window's shared allowance
+        if state['blocked_until'] > now:
+            return math.ceil(state['blocked_until'] - now)
+
+        state['tokens'] = min(burst, state['tokens'] + (now - state['updated']) * rate)
+        state['updated'] = now
+        if state['tokens'] < 1:
+            return math.ceil((1 - state['tokens']) / rate)
+        state['tokens'] -= 1
+
+        # Requests still counted locally belong to the window that just ended
+        previous = None
+        if state['window'] != window:
+            if state['pending']:
+                previous = (state['window'], state['pending'])
+            state['window'] = window
+            state['pending'] = 0
+        state['pending'] += 1
+        pending = 0
+        if state['pending'] >= FLUSH_EVERY:
+            pending, state['pending'] = state['pending'], 0
+
+    # Shared counter writes happen outside the lock: a slow write must not stall other clients
+    if previous:
+        _flush(client, klass, *previous)
+    if not pending:
+        return None
+    window_end = (window + 1) * WINDOW_SECONDS
+    try:
+        total = store.add(f"{client}#{klass}#{window}", pending, window_end + WINDOW_SECONDS)
+    except Exception as e:
+        # Fail open; the in-container bucket still applies
+        print(f"Error updating rate limit counter: {e}")
+        return None
+    if total > rate * WINDOW_SECONDS + burst:
+        with _lock:
+            state['blocked_until'] = window_end
+        return math.ceil(window_end - now)
+    return None
@@ -0,0 +1,275 @@
+# recurrence.py
+import calendar
+from datetime import date, datetime, timedelta
+
+# Supported RRULE-style frequencies
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+# Widest ?from=&to= window the list routes expand series over (the same limit as the summary)
+MAX_WINDOW_DAYS = 5 * 366
+
+def to_date(value):
+    """Parse 'YYYY-MM-DD' or a full ISO timestamp into a date"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def parse_rule(raw):
+    """Validate a recurrence rule from a request body and return the stored form.
+
+    Accepted shape: {'freq': 'MONTHLY', 'interval': 1, 'until': '2025-12-31',
+    'count': 12, 'exdates': ['2025-03-01']}. Raises ValueError on bad input.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError('recurrence must be an object')
+
+    freq = str(raw.get('freq', '')).upper()
+    if freq not in FREQUENCIES:
+        raise ValueError(f"recurrence.freq must be one of {', '.join(FREQUENCIES)}")
+
+    interval = int(raw.get('interval', 1))
+    if interval < 1:
+        raise ValueError('recurrence.interval must be at least 1')
+
+    rule = {'freq': freq, 'interval': interval}
+
+    if raw.get('until'):
+        rule['until'] = to_date(raw['until']).isoformat()
+    if raw.get('count') is not None:
+        count = int(raw['count'])
+        if count < 1:
+            raise ValueError('recurrence.count must be at least 1')
+        rule['count'] = count
+
+    rule['exdates'] = sorted({to_date(d).isoformat() for d in raw.get('exdates') or []})
+    return rule
+
+def is_recurring(item):
+    return bool(item.get('recurrence'))
+
+def _add_months(start, months):
+    # Clamp to the last day of the month so a series on the 31st still fires in short months
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+def _nth_occurrence(start, freq, interval, n):
+    if freq == 'DAILY':
+        return start + timedelta(days=n * interval)
+    if freq == 'WEEKLY':
+        return start + timedelta(weeks=n * interval)
+    if freq == 'MONTHLY':
+        return _add_months(start, n * interval)
+    return _add_months(start, n * interval * 12)
+
+def _first_index_on_or_after(start, freq, interval, target):
+    # Jump straight to the window instead of walking every earlier occurrence
+    if target <= start:
+        return 0
+    if freq in ('DAILY', 'WEEKLY'):
+        step = interval * (7 if freq == 'WEEKLY' else 1)
+        return -(-(target - start).days // step)
+    months = (target.year - start.year) * 12 + (target.month - start.month)
+    step = interval * (12 if freq == 'YEARLY' else 1)
+    n = max(months // step, 0)
+    while _nth_occurrence(start, freq, interval, n) < target:
+        n += 1
+    return n
+
+def iter_occurrences(start, rule, window_start=None, window_end=None):
+    """Yield occurrence dates of a series that fall inside [window_start, window_end].
+
+    Exceptions listed in rule['exdates'] are skipped. Open-ended series need
+    a window_end, otherwise only the first occurrence is produced.
+    """
+    start = to_date(start)
+    freq = rule['freq']
+    interval = int(rule.get('interval', 1))
+    count = int(rule['count']) if rule.get('count') is not None else None
+    until = to_date(rule.get('until'))
+    exdates = set(rule.get('exdates') or [])
+
+    end = window_end
+    if until and (end is None or until < end):
+        end = until
+    if end is None:
+        end = start
+
+    try:
+        n = _first_index_on_or_after(start, freq, interval, window_start) if window_start else 0
+        while count is None or n < count:
+            current = _nth_occurrence(start, freq, interval, n)
+            if current > end:
+                break
+            if current.isoformat() not in exdates:
+                yield current
+            n += 1
+    except (OverflowError, ValueError):
+        # The next occurrence would fall after date.max
+        return
+
+def expand_items(items, window_start=None, window_end=None, date_field='date', keep_one_offs=False):
+    """Replace series items with their occurrences inside the window.
+
+    One-off items are kept when they fall in the window, or always with
+    keep_one_offs (the window then only bounds the series). Each occurrence is a
+    copy of its series with the occurrence date, a composite id, a 'seriesId'
+    and any per-occurrence override from the series 'overrides' map applied.
+    """
+    expanded = []
+    for item in items:
+        if not is_recurring(item):
+            item_date = to_date(item.get(date_field))
+            if keep_one_offs or item_date is None or _in_window(item_date, window_start, window_end):
+                expanded.append(item)
+            continue
+
+        overrides = item.get('overrides') or {}
+        base = {k: v for k, v in item.items() if k not in ('recurrence', 'overrides')}
+        for occurrence in iter_occurrences(item.get(date_field), item['recurrence'], window_start, window_end):
+            occurrence_date = occurrence.isoformat()
+            occurrence_item = dict(base)
+            occurrence_item.update({
+                'id': f"{item['id']}@{occurrence_date}",
+                'seriesId': item['id'],
+                date_field: occurrence_date,
+            })
+            occurrence_item.update(overrides.get(occurrence_date) or {})
+            expanded.append(occurrence_item)
+    return expanded
+
+def _in_window(value, window_start, window_end):
+    if window_start and value < window_start:
+        return False
+    if window_end and value > window_end:
+        return False
+    return True
+
+def parse_window(event):
+    """Read the optional ?from=YYYY-MM-DD&to=YYYY-MM-DD window from an API Gateway event"""
+    params = event.get('queryStringParameters') or {}
+    window_start = to_date(params.get('from'))
+    window_end = to_date(params.get('to'))
+    if window_start and window_end and window_start > window_end:
+        raise ValueError("'from' must not be after 'to'")
+    return window_start, window_end
+
+def parse_list_window(event):
+    """The ?from=&to= window of a list route, and whether ?oneOffs=all keeps one-off items outside it.
+
+    Both bounds are required together and may be at most MAX_WINDOW_DAYS apart,
+    since every day in the window can produce an occurrence of a daily series.
+    """
+    window_start, window_end = parse_window(event)
+    if bool(window_start) != bool(window_end):
+        raise ValueError("'from' and 'to' must be given together")
+    if window_start and (window_end - window_start).days > MAX_WINDOW_DAYS:
+        raise ValueError(f"Window is limited to {MAX_WINDOW_DAYS} days")
+    params = event.get('queryStringParameters') or {}
+    return window_start, window_end, params.get('oneOffs') == 'all'
+
+NOT_A_SERIES = 'Occurrences can only be changed on a recurring item'
+# What an edit or delete made from an occurrence applies to
+SCOPES = ('occurrence', 'following', 'series')
+
+def parse_scope(event):
+    """The ?occurrence= date and ?scope= of an edit or delete.
+
+    'occurrence' (the default when a date is given) changes that occurrence only,
+    'following' ends the series before it and 'series' changes the whole series.
+    """
+    params = event.get('queryStringParameters') or {}
+    occurrence_date = to_date(params.get('occurrence'))
+    scope = params.get('scope') or ('occurrence' if occurrence_date else 'series')
+    if scope not in SCOPES:
+        raise ValueError(f"scope must be one of {', '.join(SCOPES)}")
+    if scope != 'series' and occurrence_date is None:
+        raise ValueError(f"scope={scope} needs an ?occurrence= date")
+    return occurrence_date, scope
+
+def check_occurrence_date(body, occurrence_date, date_field='date'):
+    """Reject an occurrence edit that moves it: overrides and series edits keep their dates"""
+    moved = to_date(body.get(date_field))
+    if moved is not None and moved != occurrence_date:
+        raise ValueError('An occurrence cannot be moved to another date; skip it and add a one-off item instead')
+
+def get_series(table, key):
+    """The stored series item; ValueError if it is missing or not recurring"""
+    item = table.get_item(Key=key).get('Item')
+    if not item or not is_recurring(item):
+        raise ValueError(NOT_A_SERIES)
+    return item
+
+def override_update(occurrence_date, fields):
+    """Build update_item arguments that store an override for one occurrence of a series"""
+    return {
+        'UpdateExpression': 'SET overrides.#od = :ov, updatedAt = :ua',
+        'ConditionExpression': 'attribute_exists(recurrence)',
+        'ExpressionAttributeNames': {'#od': to_date(occurrence_date).isoformat()},
+        'ExpressionAttributeValues': {
+            ':ov': fields,
+            ':ua': datetime.now().isoformat(),
+        },
+    }
+
+def skip_update(occurrence_date):
+    """Build update_item arguments that add one occurrence of a series to its exceptions.
+
+    The condition keeps the exceptions list free of duplicates when the same
+    occurrence is skipped twice.
+    """
+    occurrence = to_date(occurrence_date).isoformat()
+    return {
+        'UpdateExpression': 'SET recurrence.exdates = list_append(if_not_exists(recurrence.exdates, :empty), :ex), updatedAt = :ua REMOVE overrides.#od',
+        'ConditionExpression': 'attribute_exists(recurrence) AND NOT contains(recurrence.exdates, :exd)',
+        'ExpressionAttributeNames': {'#od': occurrence},
+        'ExpressionAttributeValues': {
+            ':ex': [occurrence],
+            ':exd': occurrence,
+            ':empty': [],
+            ':ua': datetime.now().isoformat(),
+        },
+    }
+
+def _condition_failed(error):
+    return (getattr(error, 'response', None) or {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+def override_occurrence(table, key, occurrence_date, fields):
+    """Store an override and return the updated series; ValueError if the item is not a series"""
+    try:
+        response = table.update_item(Key=key, ReturnValues='ALL_NEW', **override_update(occurrence_date, fields))
+    except Exception as e:
+        if _condition_failed(e):
+            raise ValueError(NOT_A_SERIES)
+        raise
+    return response['Attributes']
+
+def skip_occurrence(table, key, occurrence_date):
+    """Skip one occurrence (a no-op if it is already skipped); ValueError if the item is not a series"""
+    try:
+        table.update_item(Key=key, **skip_update(occurrence_date))
+    except Exception as e:
+        if not _condition_failed(e):
+            raise
+        get_series(table, key)
+
+def end_series(table, key, occurrence_date):
+    """End a series the day before occurrence_date and return it; a series that already ends earlier is unchanged"""
+    until = (to_date(occurrence_date) - timedelta(days=1)).isoformat()
+    try:
+        response = table.update_item(
+            Key=key,
+            UpdateExpression='SET recurrence.#u = :until, updatedAt = :ua',
+            ConditionExpression='attribute_exists(recurrence) AND (attribute_not_exists(recurrence.#u) OR recurrence.#u > :until)',
+            ExpressionAttributeNames={'#u': 'until'},
+            ExpressionAttributeValues={':until': until, ':ua': datetime.now().isoformat()},
+            ReturnValues='ALL_NEW'
+        )
+    except Exception as e:
+        if not _condition_failed(e):
+            raise
+        return get_series(table, key)
+    return response['Attributes']
@@ -0,0 +1,293 @@
+# replay.py
+"""Replay captured traffic through lambda_handler in-process against a seeded SQLite stand-in.
+
+Captures are the TRAFFIC_CAPTURE lines written when TRAFFIC_CAPTURE_RATE > 0
+(raw log exports work; other lines are skipped).
+
+Usage: python replay.py capture.log [more.log ...] [options]
+
+Options:
+  --workers N        concurrent in-process workers (default 8)
+  --speed X          1 replays at the captured rate, 2 at twice the rate, 0 as fast as possible
+  --db PATH          SQLite file to run against (default: a fresh temporary file)
+  --seed-items N     filler items per user and collection seeded before replay (default 50, 0 = none);
+                     the users, logins and items the captures reference are always seeded
+  --no-auth          skip session tokens instead of minting one per request
+  --no-rate-limit    disable per-user rate limiting
+  --json             print the report as JSON
+"""
+import argparse
+import copy
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+def configure_environment(args):
+    # Must run before any handler module is imported: they read their settings at import time
+    os.environ['STORAGE_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = args.db
+    os.environ['TRAFFIC_CAPTURE_RATE'] = '0'
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    for env_name, default in (
+        ('EXPENSES_TABLE_NAME', 'Expenses'),
+        ('INCOME_TABLE_NAME', 'Income'),
+        ('GOALS_TABLE_NAME', 'Goals'),
+        ('TOMBSTONES_TABLE_NAME', 'Tombstones'),
+    ):
+        os.environ.setdefault(env_name, default)
+    if args.no_auth:
+        os.environ.pop('SESSION_SIGNING_KEYS', None)
+    else:
+        os.environ['SESSION_SIGNING_KEYS'] = 'replay:replay-signing-key'
+        os.environ['SESSION_ACTIVE_KEY_ID'] = 'replay'
+        os.environ.pop('REVOKED_TOKENS_TABLE_NAME', None)
+    if args.no_rate_limit:
+        os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+# Seeding
+
+COLLECTIONS = {
+    'expenses': ('EXPENSES_TABLE_NAME', ['Food', 'Transport', 'Shopping', 'Bills', 'Entertainment']),
+    'income': ('INCOME_TABLE_NAME', ['Salary', 'Freelance', 'Investments']),
+    'goals': ('GOALS_TABLE_NAME', ['Savings', 'Travel', 'Education']),
+    'events': ('EVENT_TABLE_NAME', ['Bills', 'Personal', 'Work']),
+}
+
+def referenced_ids(records):
+    """User ids, login emails and (collection, userId, itemId) keys that the captured requests touch"""
+    users, emails, items = set(), set(), set()
+    for record in records:
+        event = record['event']
+        parts = event['path'].split('/')
+        if len(parts) > 2 and parts[2]:
+            users.add(parts[2])
+            if parts[1] in COLLECTIONS:
+                if len(parts) > 3 and parts[3]:
+                    items.add((parts[1], parts[2], parts[3]))
+                for item_id in ((event.get('queryStringParameters') or {}).get('ids') or '').split(','):
+                    if item_id.strip():
+                        items.add((parts[1], parts[2], item_id.strip()))
+        try:
+            body = json.loads(event.get('body') or '{}')
+        except ValueError:
+            body = {}
+        if isinstance(body, dict):
+            if body.get('email'):
+                emails.add(body['email'])
+            if body.get('userId'):
+                users.add(body['userId'])
+    return users, emails, items
+
+def build_item(collection, user_id, item_id, rng, categories):
+    day = (date.today() - timedelta(days=rng.randint(0, 730))).isoformat()
+    now = datetime.now().isoformat()
+    item = {
+        'id': item_id,
+        'userId': user_id,
+        'currency': 'INR',
+        'category': rng.choice(categories),
+        'createdAt': now,
+        'updatedAt': now,
+    }
+    if collection == 'goals':
+        item.update({
+            'name': f"Goal {item_id[:6]}",
+            'targetAmountMinor': rng.randint(10000, 500000) * 100,
+            'currentAmountMinor': rng.randint(0, 10000) * 100,
+            'targetDate': (date.today() + timedelta(days=rng.randint(30, 1500))).isoformat(),
+        })
+    elif collection == 'events':
+        item.update({'title': f"Event {item_id[:6]}", 'date': day, 'type': 'reminder',
+                     'amountMinor': rng.randint(100, 50000) * 100})
+    else:
+        item.update({'name': f"{item['category']} {item_id[:6]}", 'date': day,
+                     'amountMinor': rng.randint(50, 20000) * 100})
+    return item
+
+def seed(records, items_per_user, rng):
+    import storage
+    import traffic_capture
+
+    resource = storage.resource()
+    users_table = resource.Table('Users')
+    user_ids, emails, item_keys = referenced_ids(records)
+    # Captured logins carry pseudonymized emails and the replay password, so each email gets a matching user
+    accounts = {user_id: f"{user_id}@example.invalid" for user_id in user_ids}
+    for n, email in enumerate(sorted(emails)):
+        accounts[f"replay_login_{n}"] = email
+    user_ids = set(accounts)
+
+    for user_id, email in accounts.items():
+        users_table.put_item(Item={
+            'id': user_id,
+            'email': email,
+            'password': traffic_capture.REPLAY_PASSWORD,
+            'name': user_id,
+            'createdAt': datetime.now().isoformat(),
+        })
+
+    counts = {}
+    for collection, (env_name, categories) in COLLECTIONS.items():
+        table = resource.Table(os.environ.get(env_name, 'Events'))
+        keys = {(user_id, item_id) for kind, user_id, item_id in item_keys if kind == collection}
+        for user_id in user_ids:
+            keys.update((user_id, f"seed-{collection}-{n}") for n in range(items_per_user))
+        for user_id, item_id in keys:
+            table.put_item(Item=build_item(collection, user_id, item_id, rng, categories))
+        counts[collection] = len(keys)
+    counts['users'] = len(user_ids)
+    return counts
+
+# Replay
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+def token_user(event):
+    """The user a session token has to be minted for, or None for public routes"""
+    path = event['path']
+    if (event['httpMethod'], path) in (('POST', '/users'), ('POST', '/login')):
+        return None
+    if path == '/pass_change':
+        try:
+            return json.loads(event.get('body') or '{}').get('userId')
+        except ValueError:
+            return None
+    parts = path.split('/')
+    return parts[2] if len(parts) > 2 and parts[2] else 'replay-user'
+
+def replay(records, args):
+    import capacity
+    import lambda_function
+    import session_tokens
+
+    results = []
+    results_lock = threading.Lock()
+
+    def run_one(record, scheduled_at):
+        event = copy.deepcopy(record['event'])
+        user_id = token_user(event) if session_tokens.enabled() else None
+        if user_id:
+            token, _ = session_tokens.issue(user_id)
+            event.setdefault('headers', {})['Authorization'] = f"Bearer {token}"
+
+        started = time.perf_counter()
+        try:
+            status = lambda_function.lambda_handler(event, None).get('statusCode')
+        except Exception as e:
+            status = f"exception: {type(e).__name__}"
+        finished = time.perf_counter()
+        with results_lock:
+            results.append({
+                'route': capacity.route_of(event['httpMethod'], event['path']),
+                'status': status,
+                'latencyMs': (finished - started) * 1000,
+                'lagMs': (started - scheduled_at) * 1000,  # Time queued behind busy workers
+                'capturedMs': record.get('durationMs'),
+            })
+
+    first_ts = records[0]['ts']
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for record in records:
+            due = started + (record['ts'] - first_ts) / args.speed if args.speed > 0 else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run_one, record, max(due, started))
+    return results, time.perf_counter() - started
+
+def summarize(results, elapsed):
+    routes = {}
+    for result in results:
+        routes.setdefault(result['route'], []).append(result)
+    routes['ALL'] = results
+
+    report = {'requests': len(results), 'seconds': round(elapsed, 3), 'routes': {}}
+    for route, rows in routes.items():
+        latencies = [row['latencyMs'] for row in rows]
+        captured = [row['capturedMs'] for row in rows if row['capturedMs'] is not None]
+        statuses = [row['status'] for row in rows]
+        report['routes'][route] = {
+            'count': len(rows),
+            'rps': round(len(rows) / elapsed, 1) if elapsed else None,
+            'errorRate': round(sum(1 for s in statuses if not isinstance(s, int) or s >= 500) / len(rows), 4),
+            'clientErrorRate': round(sum(1 for s in statuses if isinstance(s, int) and 400 <= s < 500) / len(rows), 4),
+            'throttled': sum(1 for s in statuses if s == 429),
+            'p50Ms': round(percentile(latencies, 50), 2),
+            'p90Ms': round(percentile(latencies, 90), 2),
+            'p99Ms': round(percentile(latencies, 99), 2),
+            'maxMs': round(max(latencies), 2),
+            'maxLagMs': round(max(row['lagMs'] for row in rows), 2),
+            'capturedP50Ms': percentile(captured, 50),
+            'capturedP99Ms': percentile(captured, 99),
+        }
+    return report
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['seconds']} s")
+    print(f"{'route':<34} {'count':>6} {'rps':>7} {'err%':>6} {'4xx%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'cap p99':>8}")
+    ordered = sorted(report['routes'].items(), key=lambda entry: (entry[0] == 'ALL', -entry[1]['count']))
+    for route, stats in ordered:
+        captured = stats['capturedP99Ms']
+        print(f"{route:<34} {stats['count']:>6} {stats['rps']:>7} {stats['errorRate']:>6.1%} {stats['clientErrorRate']:>6.1%} "
+              f"{stats['p50Ms']:>8} {stats['p90Ms']:>8} {stats['p99Ms']:>8} {stats['maxMs']:>8} "
+              f"{captured if captured is not None else '-':>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured traffic through lambda_handler')
+    parser.add_argument('captures', nargs='+')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--db')
+    parser.add_argument('--seed-items', type=int, default=50)
+    parser.add_argument('--random-seed', type=int, default=0)
+    parser.add_argument('--no-auth', action='store_true')
+    parser.add_argument('--no-rate-limit', action='store_true')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+    args.db = args.db or os.path.join(tempfile.mkdtemp(), 'replay.db')
+    configure_environment(args)
+
+    import traffic_capture
+
+    records = []
+    for path in args.captures:
+        with open(path) as f:
+            records.extend(traffic_capture.read(f))
+    records.sort(key=lambda record: record['ts'])
+    if not records:
+        print('No capture records found')
+        return 1
+
+    # Handlers log every request; keep that out of the report
+    real_stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            seeded = seed(records, args.seed_items, random.Random(args.random_seed))
+            results, elapsed = replay(records, args)
+        finally:
+            sys.stdout = real_stdout
+
+    report = summarize(results, elapsed)
+    report['seeded'] = seeded
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Seeded {seeded or 'nothing'} into {args.db}")
+        print_report(report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# result_cache.py
+import os
+import time
+from collections import OrderedDict
+
+# Derived per-user results (forecasts, category statistics) kept in the warm container
+MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', '256'))
+TTL_SECONDS = int(os.environ.get('RESULT_CACHE_TTL_SECONDS', '900'))
+
+# (namespace, userId) -> (stored_at, value), least recently used first
+_cache = OrderedDict()
+
+def get(namespace, user_id):
+    entry = _cache.get((namespace, user_id))
+    if entry is None:
+        return None
+    stored_at, value = entry
+    if time.time() - stored_at > TTL_SECONDS:
+        # Writes handled by other containers are only seen after expiry
+        del _cache[(namespace, user_id)]
+        return None
+    _cache.move_to_end((namespace, user_id))
+    return value
+
+def put(namespace, user_id, value):
+    _cache[(namespace, user_id)] = (time.time(), value)
+    _cache.move_to_end((namespace, user_id))
+    while len(_cache) > MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+def invalidate(user_id, namespaces=None):
+    """Drop a user's cached results after a write, optionally only some namespaces"""
+    for key in [key for key in _cache if key[1] == user_id]:
+        if namespaces is None or key[0] in namespaces:
+            del _cache[key]
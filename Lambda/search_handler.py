@@ -0,0 +1,92 @@
+# search_handler.py
+import json
+import os
+import capacity
+import money
+import pagination
+import search_index
+import storage
+
+dynamodb = storage.resource()
+expenses_table = capacity.Table(dynamodb, os.environ.get('EXPENSES_TABLE_NAME'))
+income_table = capacity.Table(dynamodb, os.environ.get('INCOME_TABLE_NAME'))
+events_table = capacity.Table(dynamodb, os.environ.get('EVENT_TABLE_NAME', 'Events'))
+
+def respond(status_code, body=None):
+    """Helper function for responses with CORS headers"""
+    return {
+        'statusCode': status_code,
+        'body': json.dumps(body, default=str) if body else None,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',  # Allow all origins
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,Chrome',
+        },
+    }
+
+def build_index(user_id):
+    """Read only the searchable attributes of a user's records and index them"""
+    index = search_index.InvertedIndex()
+
+    for item in pagination.query_all(
+        expenses_table,
+        KeyConditionExpression='userId = :uid',
+        ProjectionExpression='id, #n, category, amount, amountMinor, currency, #d, recurrence',
+        ExpressionAttributeNames={'#n': 'name', '#d': 'date'},
+        ExpressionAttributeValues={':uid': user_id}
+    ):
+        index.add('expense', item)
+
+    for item in pagination.query_all(
+        income_table,
+        IndexName='UserIdIndex',
+        KeyConditionExpression='userId = :uid',
+        ProjectionExpression='id, #n, notes, category, amount, amountMinor, currency, #d, recurrence',
+        ExpressionAttributeNames={'#n': 'name', '#d': 'date'},
+        ExpressionAttributeValues={':uid': user_id}
+    ):
+        index.add('income', item)
+
+    for item in pagination.query_all(
+        events_table,
+        IndexName='UserIdIndex',
+        KeyConditionExpression='userId = :uid',
+        ProjectionExpression='id, title, notes, category, amount, amountMinor, currency, #d, recurrence',
+        ExpressionAttributeNames={'#d': 'date'},
+        ExpressionAttributeValues={':uid': user_id}
+    ):
+        index.add('event', item)
+
+    return index
+
+def search(event, context):
+    try:
+        user_id = event['pathParameters']['userid']
+        params = event.get('queryStringParameters') or {}
+
+        kinds = set(params['type'].split(',')) if params.get('type') else None
+        limit = min(max(int(params.get('limit', 50)), 1), 200)
+        min_minor = money.parse_amount(params.get('minAmount'))
+        max_minor = money.parse_amount(params.get('maxAmount'))
+
+        index = search_index.get(user_id)
+        if index is None:
+            index = build_index(user_id)
+            search_index.put(user_id, index)
+
+        results = index.search(
+            params.get('q', ''),
+            kinds=kinds,
+            min_minor=min_minor,
+            max_minor=max_minor,
+            date_from=params.get('from'),
+            date_to=params.get('to'),
+            limit=limit
+        )
+        return respond(200, money.present_all(results))
+    except ValueError as e:
+        return respond(400, {'error': f"Invalid search parameters: {e}"})
+    except Exception as e:
+        print(f"Error searching: {e}")
+        return respond(500, {'error': 'Could not search transactions'})
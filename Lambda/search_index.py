@@ -0,0 +1,153 @@
+# search_index.py
+import bisect
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import date
+import money
+import recurrence
+
+# Warm containers keep a bounded number of per-user indexes around
+MAX_USERS = int(os.environ.get('SEARCH_CACHE_MAX_USERS', '64'))
+TTL_SECONDS = int(os.environ.get('SEARCH_CACHE_TTL_SECONDS', '300'))
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Fields that are tokenized for every kind of record
+INDEXED_FIELDS = ('name', 'title', 'notes', 'category')
+
+def tokenize(text):
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+class InvertedIndex:
+    """Token -> document postings for one user's expenses, income and events"""
+
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []  # Sorted so prefix lookups are a bisect plus a short scan
+        self.docs = {}
+        self.doc_tokens = {}  # Tokens each document was indexed under, so removal is exact
+        self.built_at = time.time()
+
+    def add(self, kind, item):
+        key = (kind, item['id'])
+        self.remove(kind, item['id'])
+        self.docs[key] = {
+            'type': kind,
+            'id': item['id'],
+            'name': item.get('name') or item.get('title'),
+            'category': item.get('category'),
+            'notes': item.get('notes'),
+            'amountMinor': money.minor_of(item),
+            'currency': item.get('currency'),
+            'date': item.get('date'),
+            'recurrence': item.get('recurrence'),
+        }
+        tokens = {token for field in INDEXED_FIELDS for token in tokenize(item.get(field))}
+        self.doc_tokens[key] = tokens
+        for token in tokens:
+            if token not in self.postings:
+                self.postings[token] = set()
+                bisect.insort(self.tokens, token)
+            self.postings[token].add(key)
+
+    def remove(self, kind, item_id):
+        key = (kind, item_id)
+        if self.docs.pop(key, None) is None:
+            return
+        for token in self.doc_tokens.pop(key, ()):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(key)
+            # Drop tokens nothing refers to any more so a warm index does not only grow
+            if not posting:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def _match_prefix(self, prefix):
+        matches = set()
+        start = bisect.bisect_left(self.tokens, prefix)
+        for token in self.tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches |= self.postings[token]
+        return matches
+
+    def search(self, query, kinds=None, min_minor=None, max_minor=None, date_from=None, date_to=None, limit=50):
+        """Every query term must prefix-match a token; results are newest first"""
+        terms = tokenize(query)
+        if terms:
+            keys = None
+            for term in terms:
+                matched = self._match_prefix(term)
+                keys = matched if keys is None else keys & matched
+                if not keys:
+                    return []
+        else:
+            keys = set(self.docs)
+
+        results = []
+        for key in keys:
+            doc = self.docs[key]
+            if kinds and doc['type'] not in kinds:
+                continue
+            amount = doc.get('amountMinor')
+            if min_minor is not None and (amount is None or amount < min_minor):
+                continue
+            if max_minor is not None and (amount is None or amount > max_minor):
+                continue
+            if (date_from or date_to) and not _in_window(doc, date_from, date_to):
+                continue
+            results.append(doc)
+
+        results.sort(key=lambda doc: str(doc.get('date') or ''), reverse=True)
+        return results[:limit]
+
+def _in_window(doc, date_from, date_to):
+    """A one-off record by its date; a series if any of its occurrences falls in the window, as in the list routes"""
+    if not doc.get('recurrence'):
+        doc_date = str(doc.get('date') or '')[:10]
+        return not ((date_from and doc_date < date_from) or (date_to and doc_date > date_to))
+    try:
+        occurrences = recurrence.iter_occurrences(
+            doc.get('date'), doc['recurrence'],
+            recurrence.to_date(date_from), recurrence.to_date(date_to) or date.max
+        )
+        return next(occurrences, None) is not None
+    except (TypeError, ValueError, KeyError):
+        return False
+
+# userId -> InvertedIndex, least recently used first
+_cache = OrderedDict()
+
+def get(user_id):
+    index = _cache.get(user_id)
+    if index is None:
+        return None
+    if time.time() - index.built_at > TTL_SECONDS:
+        # Writes in other containers are only picked up after a rebuild
+        del _cache[user_id]
+        return None
+    _cache.move_to_end(user_id)
+    return index
+
+def put(user_id, index):
+    _cache[user_id] = index
+    _cache.move_to_end(user_id)
+    while len(_cache) > MAX_USERS:
+        _cache.popitem(last=False)
+
+def upsert(user_id, kind, item):
+    """Keep a cached index current after a write; no-op when the user is not cached"""
+    index = _cache.get(user_id)
+    if index is not None:
+        index.add(kind, item)
+
+def remove(user_id, kind, item_id):
+    index = _cache.get(user_id)
+    if index is not None:
+        index.remove(kind, item_id)
@@ -0,0 +1,154 @@
+# session_tokens.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+import capacity
+import storage
+
+# Signing keys as "kid:secret" pairs. New tokens are signed with the active kid;
+# older kids stay listed until their tokens have expired so rotation never logs anyone out.
+SIGNING_KEYS = dict(
+    pair.split(':', 1) for pair in os.environ.get('SESSION_SIGNING_KEYS', '').split(',') if ':' in pair
+)
+ACTIVE_KEY_ID = os.environ.get('SESSION_ACTIVE_KEY_ID') or next(iter(SIGNING_KEYS), None)
+TOKEN_TTL_SECONDS = int(os.environ.get('SESSION_TOKEN_TTL_SECONDS', '86400'))
+DEFAULT_SCOPES = ['read', 'write']
+
+# The revocation list is small (TTL removes rows once their tokens expire), so each
+# container loads all of it at most once per interval and checks tokens against memory
+REVOKED_TOKENS_TABLE_NAME = os.environ.get('REVOKED_TOKENS_TABLE_NAME')
+REVOCATION_REFRESH_SECONDS = int(os.environ.get('REVOCATION_REFRESH_SECONDS', '60'))
+
+# jti -> expiresAt of every revoked token this container knows about
+_revoked = {}
+_revoked_loaded_at = 0
+_revoked_lock = threading.Lock()
+
+class TokenError(Exception):
+    pass
+
+def enabled():
+    return bool(SIGNING_KEYS)
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _sign(key_id, payload_part):
+    secret = SIGNING_KEYS[key_id].encode('utf-8')
+    return _b64encode(hmac.new(secret, payload_part.encode('ascii'), hashlib.sha256).digest())
+
+def issue(user_id, scopes=None, ttl_seconds=None):
+    """Return (token, claims) for a user, signed with the active key"""
+    if not enabled():
+        raise TokenError('No session signing keys configured')
+    now = int(time.time())
+    claims = {
+        'sub': user_id,
+        'scopes': scopes or DEFAULT_SCOPES,
+        'iat': now,
+        'exp': now + (ttl_seconds or TOKEN_TTL_SECONDS),
+        'kid': ACTIVE_KEY_ID,
+        'jti': uuid.uuid4().hex,
+    }
+    payload_part = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload_part}.{_sign(ACTIVE_KEY_ID, payload_part)}", claims
+
+def verify(token):
+    """Check signature, expiry and revocation in-process and return the claims"""
+    try:
+        payload_part, signature = token.split('.')
+        claims = json.loads(_b64decode(payload_part))
+    except (ValueError, TypeError, AttributeError):
+        raise TokenError('Malformed token')
+    if not isinstance(claims, dict):
+        raise TokenError('Malformed token')
+
+    key_id = claims.get('kid')
+    if not isinstance(key_id, str) or key_id not in SIGNING_KEYS:
+        raise TokenError('Unknown signing key')
+    # Compared as bytes: compare_digest rejects non-ASCII str input with a TypeError
+    if not hmac.compare_digest(signature.encode('utf-8'), _sign(key_id, payload_part).encode('ascii')):
+        raise TokenError('Invalid signature')
+    if not _valid_claims(claims):
+        raise TokenError('Malformed token')
+    if claims['exp'] < time.time():
+        raise TokenError('Token expired')
+    if _is_revoked(claims):
+        raise TokenError('Token revoked')
+    return claims
+
+def _valid_claims(claims):
+    scopes = claims.get('scopes')
+    return (
+        isinstance(claims.get('sub'), str)
+        and isinstance(claims.get('jti'), str)
+        and isinstance(claims.get('exp'), (int, float)) and not isinstance(claims['exp'], bool)
+        and isinstance(scopes, list) and all(isinstance(scope, str) for scope in scopes)
+    )
+
+def bearer_token(event):
+    headers = event.get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == 'authorization' and value and value.startswith('Bearer '):
+            return value[len('Bearer '):].strip()
+    return None
+
+def _load_revoked(now):
+    """Every unexpired revoked jti in the table; TTL deletes lag, so expired rows are skipped here"""
+    table = capacity.Table(storage.resource(), REVOKED_TOKENS_TABLE_NAME)
+    kwargs = {'ProjectionExpression': 'jti, expiresAt'}
+    revoked = {}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            if int(item.get('expiresAt') or 0) >= now:
+                revoked[item['jti']] = int(item['expiresAt'])
+        if 'LastEvaluatedKey' not in response:
+            return revoked
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def _is_revoked(claims):
+    """Check the jti against the container's copy of the revocation list, reloading it once per interval"""
+    global _revoked_loaded_at
+    now = time.time()
+    if REVOKED_TOKENS_TABLE_NAME:
+        with _revoked_lock:
+            refresh = now - _revoked_loaded_at >= REVOCATION_REFRESH_SECONDS
+            if refresh:
+                # Claimed under the lock so one request reloads while the rest use the current copy
+                _revoked_loaded_at = now
+        if refresh:
+            try:
+                loaded = _load_revoked(now)
+            except Exception as e:
+                # Keep serving from the last loaded list rather than failing every request
+                print(f"Error loading revoked tokens: {e}")
+            else:
+                with _revoked_lock:
+                    # Revocations made in this container since the scan started are kept
+                    for jti, expires_at in _revoked.items():
+                        if expires_at >= now:
+                            loaded.setdefault(jti, expires_at)
+                    _revoked.clear()
+                    _revoked.update(loaded)
+    with _revoked_lock:
+        return claims['jti'] in _revoked
+
+def revoke(claims):
+    """Revoke a token until it would have expired anyway (TTL removes the row afterwards)"""
+    now = time.time()
+    with _revoked_lock:
+        for jti in [jti for jti, expires_at in _revoked.items() if expires_at < now]:
+            del _revoked[jti]
+        _revoked[claims['jti']] = int(claims['exp'])
+    if REVOKED_TOKENS_TABLE_NAME:
+        table = capacity.Table(storage.resource(), REVOKED_TOKENS_TABLE_NAME)
+        table.put_item(Item={'jti': claims['jti'], 'userId': claims['sub'], 'expiresAt': int(claims['exp'])})
@@ -0,0 +1,323 @@
+# sqlite_store.py
+"""SQLite backend that serves the subset of the boto3 DynamoDB Table API the handlers use.
+
+Each table is one SQLite table: the item as a JSON document, its key, and a few
+extracted columns (userId, date, email, updatedAt, ...) with real indexes, so
+key conditions and the GSIs the handlers query become indexed SQL lookups.
+Aggregates that DynamoDB cannot do (sums by month and category) run in SQL.
+"""
+import copy
+import json
+import os
+import sqlite3
+import threading
+from decimal import Decimal
+import expressions
+import money
+
+# Table name -> (partition key, sort key), matching the DynamoDB tables
+KEY_SCHEMAS = {
+    'Users': ('id', None),
+    os.environ.get('EXPENSES_TABLE_NAME'): ('userId', 'id'),
+    os.environ.get('INCOME_TABLE_NAME'): ('id', 'userId'),
+    os.environ.get('GOALS_TABLE_NAME'): ('id', 'userId'),
+    os.environ.get('EVENT_TABLE_NAME', 'Events'): ('id', 'userId'),
+    os.environ.get('TOMBSTONES_TABLE_NAME'): ('userId', 'deletedAtKey'),
+    os.environ.get('REVOKED_TOKENS_TABLE_NAME'): ('jti', None),
+    os.environ.get('ANOMALY_STATS_TABLE_NAME'): ('userId', None),
+    os.environ.get('STATEMENTS_TABLE_NAME'): ('userId', 'month'),
+}
+DEFAULT_KEY_SCHEMA = ('id', None)
+
+# GSI name -> (partition key, sort key)
+INDEXES = {
+    'UserIdIndex': ('userId', None),
+    'UserIdDateIndex': ('userId', 'date'),
+    'UserIdUpdatedAtIndex': ('userId', 'updatedAt'),
+    'SeriesUserIdIndex': ('seriesUserId', None),
+    'EmailIndex': ('email', None),
+}
+
+# Attributes copied into their own columns so they can be indexed
+COLUMNS = ('userId', 'date', 'email', 'updatedAt', 'seriesUserId', 'category')
+
+class ConditionalCheckFailedException(Exception):
+    def __init__(self):
+        super().__init__('The conditional request failed')
+        self.response = {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': str(self)}}
+
+def _encode(value):
+    if isinstance(value, float):
+        # boto3 refuses floats too; keeping the same rule keeps both backends interchangeable
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else str(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Unsupported type {type(value).__name__}")
+
+def _dumps(item):
+    return json.dumps(item, default=_encode, separators=(',', ':'))
+
+def _loads(doc):
+    # DynamoDB hands every number back as a Decimal
+    return json.loads(doc, parse_int=Decimal, parse_float=Decimal)
+
+def _param(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+class SqliteResource:
+    """Stand-in for boto3.resource('dynamodb') over one SQLite database file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def connection(self):
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def Table(self, table_name):
+        with self.lock:
+            if table_name not in self.tables:
+                self.tables[table_name] = SqliteTable(self, table_name)
+            return self.tables[table_name]
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self.Table(table_name)
+            items = responses.setdefault(table_name, [])
+            for key in request['Keys']:
+                item = table.get_item(
+                    Key=key,
+                    ProjectionExpression=request.get('ProjectionExpression'),
+                    ExpressionAttributeNames=request.get('ExpressionAttributeNames')
+                ).get('Item')
+                if item is not None:
+                    items.append(item)
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+class SqliteTable:
+    def __init__(self, resource, table_name):
+        if not table_name:
+            raise ValueError('No table name given: set the *_TABLE_NAME environment variable for this table')
+        self.resource = resource
+        self.name = table_name
+        self.hash_key, self.range_key = KEY_SCHEMAS.get(table_name, DEFAULT_KEY_SCHEMA)
+        self.key_schema = [{'AttributeName': self.hash_key, 'KeyType': 'HASH'}]
+        if self.range_key:
+            self.key_schema.append({'AttributeName': self.range_key, 'KeyType': 'RANGE'})
+        self.sql_name = '"' + table_name.replace('"', '""') + '"'
+        self._create()
+
+    def _create(self):
+        conn = self.resource.connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.sql_name} ("
+            "pk TEXT NOT NULL, sk TEXT NOT NULL DEFAULT '', "
+            + ''.join(f'"{column}" TEXT, ' for column in COLUMNS)
+            + "amountMinor INTEGER, recurring INTEGER NOT NULL DEFAULT 0, doc TEXT NOT NULL, "
+            "PRIMARY KEY (pk, sk))"
+        )
+        index_prefix = self.name.replace('"', '')
+        for suffix, columns in (
+            ('user_date', 'userId, date'),
+            ('user_updated', 'userId, updatedAt'),
+            ('email', 'email'),
+            ('series', 'seriesUserId'),
+        ):
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{index_prefix}_{suffix}" ON {self.sql_name} ({columns})')
+
+    # Keys and rows
+
+    def _key_values(self, key):
+        expected = {self.hash_key} | ({self.range_key} if self.range_key else set())
+        if set(key) != expected or any(key[name] is None for name in expected):
+            raise expressions.ValidationError('The provided key element does not match the schema')
+        return str(key[self.hash_key]), str(key[self.range_key]) if self.range_key else ''
+
+    def _column(self, attribute, index_name=None):
+        if attribute in COLUMNS:
+            return f'"{attribute}"'
+        if index_name is None and attribute == self.hash_key:
+            return 'pk'
+        if index_name is None and attribute == self.range_key:
+            return 'sk'
+        raise expressions.ValidationError(f"Query key condition not supported on {attribute}")
+
+    def _row(self, item):
+        pk, sk = self._key_values({name: item.get(name) for name in (self.hash_key, self.range_key) if name})
+        columns = [item.get(column) if isinstance(item.get(column), str) else None for column in COLUMNS]
+        amount = money.minor_of(item) if ('amountMinor' in item or 'amount' in item) else None
+        return [pk, sk] + columns + [amount, 1 if item.get('recurrence') else 0, _dumps(item)]
+
+    def _write(self, conn, item):
+        placeholders = ', '.join('?' * (len(COLUMNS) + 5))
+        conn.execute(f'INSERT OR REPLACE INTO {self.sql_name} VALUES ({placeholders})', self._row(item))
+
+    def _fetch(self, conn, pk, sk):
+        row = conn.execute(f'SELECT doc FROM {self.sql_name} WHERE pk = ? AND sk = ?', (pk, sk)).fetchone()
+        return _loads(row[0]) if row else None
+
+    def _check(self, condition, item, names, values):
+        if condition and not expressions.matches(condition, item or {}, names, values):
+            raise ConditionalCheckFailedException()
+
+    # Table API
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        item = self._fetch(self.resource.connection(), *self._key_values(Key))
+        if item is None:
+            return {}
+        if ProjectionExpression:
+            item = expressions.project(item, ProjectionExpression, ExpressionAttributeNames)
+        return {'Item': item}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValues='NONE', **kwargs):
+        item = _loads(_dumps(Item))
+        conn = self.resource.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            old = self._fetch(conn, *self._key_values({k: Item.get(k) for k in (self.hash_key, self.range_key) if k}))
+            self._check(ConditionExpression, old, ExpressionAttributeNames, ExpressionAttributeValues)
+            self._write(conn, item)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return {'Attributes': old} if ReturnValues == 'ALL_OLD' and old else {}
+
+    def update_item(self, Key, UpdateExpression=None, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE', **kwargs):
+        values = _loads(_dumps(ExpressionAttributeValues or {}))
+        conn = self.resource.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            old = self._fetch(conn, *self._key_values(Key))
+            self._check(ConditionExpression, old, ExpressionAttributeNames, values)
+            # Like DynamoDB, updating a missing item creates it
+            item = copy.deepcopy(old) if old else _loads(_dumps(Key))
+            changed = expressions.apply_update(item, UpdateExpression, ExpressionAttributeNames, values) if UpdateExpression else set()
+            self._write(conn, item)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if ReturnValues == 'ALL_NEW':
+            return {'Attributes': item}
+        if ReturnValues == 'ALL_OLD':
+            return {'Attributes': old} if old else {}
+        if ReturnValues == 'UPDATED_NEW':
+            return {'Attributes': {name: item[name] for name in changed if name in item}}
+        if ReturnValues == 'UPDATED_OLD':
+            return {'Attributes': {name: old[name] for name in changed if old and name in old}}
+        return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE', **kwargs):
+        pk, sk = self._key_values(Key)
+        conn = self.resource.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            old = self._fetch(conn, pk, sk)
+            self._check(ConditionExpression, old, ExpressionAttributeNames, ExpressionAttributeValues)
+            conn.execute(f'DELETE FROM {self.sql_name} WHERE pk = ? AND sk = ?', (pk, sk))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return {'Attributes': old} if ReturnValues == 'ALL_OLD' and old else {}
+
+    def query(self, KeyConditionExpression, IndexName=None, **kwargs):
+        hash_key, range_key = INDEXES[IndexName] if IndexName else (self.hash_key, self.range_key)
+        condition = expressions.parse_condition(
+            KeyConditionExpression, kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues'))
+
+        where, params = [], []
+        for part in expressions.conjuncts(condition):
+            if part[0] == 'fn' and part[1] == 'begins_with':
+                path, value = part[2][0], part[2][1]
+                where.append(f"substr({self._column(path[1][0], IndexName)}, 1, ?) = ?")
+                params += [len(value[1]), value[1]]
+            elif part[0] == 'between':
+                where.append(f"{self._column(part[1][1][0], IndexName)} BETWEEN ? AND ?")
+                params += [_param(part[2][1]), _param(part[3][1])]
+            elif part[0] == 'cmp' and part[1] != '<>':
+                where.append(f"{self._column(part[2][1][0], IndexName)} {part[1]} ?")
+                params.append(_param(part[3][1]))
+            else:
+                raise expressions.ValidationError('Unsupported key condition')
+        if range_key:
+            # A GSI only holds items that have its sort key
+            where.append(f"{self._column(range_key, IndexName)} IS NOT NULL")
+        order = self._column(range_key, IndexName) if range_key else 'pk'
+        direction = 'ASC' if kwargs.get('ScanIndexForward', True) else 'DESC'
+        return self._select(' AND '.join(where), params, f"{order} {direction}, pk, sk", kwargs)
+
+    def scan(self, Segment=None, TotalSegments=None, **kwargs):
+        where, params = '1 = 1', []
+        if TotalSegments:
+            where, params = 'rowid % ? = ?', [TotalSegments, Segment]
+        return self._select(where, params, 'rowid', kwargs)
+
+    def _select(self, where, params, order, kwargs):
+        offset = int((kwargs.get('ExclusiveStartKey') or {}).get('_offset', 0))
+        limit = kwargs.get('Limit')
+        sql = f'SELECT doc FROM {self.sql_name} WHERE {where} ORDER BY {order}'
+        if limit:
+            sql += f' LIMIT {int(limit)} OFFSET {offset}'
+        elif offset:
+            sql += f' LIMIT -1 OFFSET {offset}'
+        rows = self.resource.connection().execute(sql, params).fetchall()
+
+        names = kwargs.get('ExpressionAttributeNames')
+        items = [_loads(row[0]) for row in rows]
+        # As in DynamoDB, Limit counts items read before the filter is applied
+        if kwargs.get('FilterExpression'):
+            values = _loads(_dumps(kwargs.get('ExpressionAttributeValues') or {}))
+            condition = expressions.parse_condition(kwargs['FilterExpression'], names, values)
+            items = [item for item in items if expressions.evaluate(condition, item)]
+        if kwargs.get('ProjectionExpression'):
+            items = [expressions.project(item, kwargs['ProjectionExpression'], names) for item in items]
+
+        response = {'Count': len(items), 'ScannedCount': len(rows)}
+        if kwargs.get('Select') != 'COUNT':
+            response['Items'] = items
+        if limit and len(rows) == int(limit):
+            response['LastEvaluatedKey'] = {'_offset': offset + len(rows)}
+        return response
+
+    # Aggregates pushed down to SQL
+
+    def monthly_totals(self, user_id, start, end, field='amountMinor'):
+        """One-off totals by (month, currency, category) in minor units plus the user's recurring series.
+
+        Series are returned as items because their occurrences have to be expanded in Python.
+        """
+        if field != 'amountMinor':
+            raise ValueError(f"SQL totals only cover amountMinor, not {field}")
+        conn = self.resource.connection()
+        rows = conn.execute(
+            f'SELECT substr("date", 1, 7), UPPER(COALESCE(NULLIF(json_extract(doc, \'$.currency\'), \'\'), ?)), '
+            f'COALESCE(category, \'\'), SUM(amountMinor) FROM {self.sql_name} '
+            'WHERE userId = ? AND "date" BETWEEN ? AND ? AND recurring = 0 AND amountMinor IS NOT NULL '
+            'GROUP BY 1, 2, 3',
+            (money.DEFAULT_CURRENCY, user_id, start, end + '~')
+        ).fetchall()
+        series = conn.execute(
+            f'SELECT doc FROM {self.sql_name} WHERE userId = ? AND recurring = 1', (user_id,)
+        ).fetchall()
+        return {(month, currency, category): total for month, currency, category, total in rows}, [_loads(row[0]) for row in series]
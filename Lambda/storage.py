@@ -0,0 +1,60 @@
+# storage.py
+import os
+import money
+import pagination
+import recurrence
+
+# 'dynamodb' (default) or 'sqlite' for on-prem/edge deployments and local load tests
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dynamodb')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'finance.db')
+
+_resource = None
+
+def resource():
+    """The DynamoDB resource, or an SQLite stand-in exposing the same Table API"""
+    global _resource
+    if _resource is None:
+        if STORAGE_BACKEND == 'sqlite':
+            import sqlite_store
+            _resource = sqlite_store.SqliteResource(SQLITE_PATH)
+        elif STORAGE_BACKEND == 'dynamodb':
+            import boto3
+            _resource = boto3.resource('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL'))
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _resource
+
+def monthly_totals(table, user_id, start, end, index_name=None):
+    """Minor-unit totals as {month: {currency: {category: amount}}} for dates in [start, end].
+
+    Recurring series count every occurrence in the window. A backend with a
+    native monthly_totals (SQLite) sums one-off rows in the database; on
+    DynamoDB the user's items are queried and summed here.
+    """
+    native = getattr(table, 'monthly_totals', None)
+    if native is not None:
+        totals, series = native(user_id, start.isoformat(), end.isoformat())
+    else:
+        kwargs = {
+            'KeyConditionExpression': 'userId = :uid',
+            'ProjectionExpression': 'id, category, amount, amountMinor, currency, #d, recurrence, overrides',
+            'ExpressionAttributeNames': {'#d': 'date'},
+            'ExpressionAttributeValues': {':uid': user_id},
+        }
+        if index_name:
+            kwargs['IndexName'] = index_name
+        items = pagination.query_all(table, **kwargs)
+        one_off = [item for item in items if not recurrence.is_recurring(item) and item.get('date')]
+        totals = money.totals_by(recurrence.expand_items(one_off, start, end), _month_category)
+        series = [item for item in items if recurrence.is_recurring(item)]
+
+    for key, amount in money.totals_by(recurrence.expand_items(series, start, end), _month_category).items():
+        totals[key] = totals.get(key, 0) + amount
+
+    by_month = {}
+    for (month, currency, category), amount in sorted(totals.items()):
+        by_month.setdefault(month, {}).setdefault(currency, {})[category] = amount
+    return by_month
+
+def _month_category(item):
+    return str(item['date'])[:7], money.currency_of(item), item.get('category') or ''
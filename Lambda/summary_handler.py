@@ -0,0 +1,63 @@
+# summary_handler.py
+import json
+import os
+from datetime import date
+import capacity
+import money
+import recurrence
+import storage
+
+dynamodb = storage.resource()
+expenses_table = capacity.Table(dynamodb, os.environ.get('EXPENSES_TABLE_NAME'))
+income_table = capacity.Table(dynamodb, os.environ.get('INCOME_TABLE_NAME'))
+
+MAX_WINDOW_DAYS = 5 * 366
+
+def respond(status_code, body=None):
+    """Helper function for responses with CORS headers"""
+    return {
+        'statusCode': status_code,
+        'body': json.dumps(body, default=str) if body else None,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',  # Allow all origins
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,Chrome',
+        },
+    }
+
+def _present(by_month):
+    # Totals stay per currency: minor units of different currencies cannot be added
+    return {
+        month: {
+            currency: {
+                category: {'amountMinor': amount, 'amount': money.to_major(amount, currency)}
+                for category, amount in categories.items()
+            }
+            for currency, categories in currencies.items()
+        }
+        for month, currencies in by_month.items()
+    }
+
+def get_summary(event, context):
+    """Income and expense totals by month, currency and category for ?from=&to= (default: this year so far)"""
+    try:
+        user_id = event['pathParameters']['userid']
+        window_start, window_end = recurrence.parse_window(event)
+        today = date.today()
+        window_end = window_end or today
+        window_start = window_start or date(window_end.year, 1, 1)
+        if (window_end - window_start).days > MAX_WINDOW_DAYS:
+            raise ValueError(f"Summary window is limited to {MAX_WINDOW_DAYS} days")
+
+        return respond(200, {
+            'from': window_start.isoformat(),
+            'to': window_end.isoformat(),
+            'expenses': _present(storage.monthly_totals(expenses_table, user_id, window_start, window_end)),
+            'income': _present(storage.monthly_totals(income_table, user_id, window_start, window_end, index_name='UserIdIndex')),
+        })
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
+    except Exception as e:
+        print(f"Error building summary: {e}")
+        return respond(500, {'error': 'Could not build summary'})
@@ -0,0 +1,153 @@
+# sync_handler.py
+import base64
+import binascii
+import json
+import os
+from datetime import datetime, timedelta
+import capacity
+import money
+import storage
+import tombstones
+
+dynamodb = storage.resource()
+
+# Collection name -> table; each table needs a UserIdUpdatedAtIndex GSI (userId, updatedAt)
+TABLES = {
+    'expenses': capacity.Table(dynamodb, os.environ.get('EXPENSES_TABLE_NAME')),
+    'income': capacity.Table(dynamodb, os.environ.get('INCOME_TABLE_NAME')),
+    'goals': capacity.Table(dynamodb, os.environ.get('GOALS_TABLE_NAME')),
+    'events': capacity.Table(dynamodb, os.environ.get('EVENT_TABLE_NAME', 'Events')),
+}
+
+PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '500'))
+# Writes and GSI propagation younger than this are re-sent on the next sync rather than risked being skipped
+SKEW_SECONDS = 5
+
+def respond(status_code, body=None):
+    """Helper function for responses with CORS headers"""
+    return {
+        'statusCode': status_code,
+        'body': json.dumps(body, default=str) if body else None,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',  # Allow all origins
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,Chrome',
+        },
+    }
+
+def encode_token(watermarks):
+    return base64.urlsafe_b64encode(json.dumps(watermarks, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def _valid_timestamp(value):
+    if not isinstance(value, str):
+        return False
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+def _valid_watermark(value, user_id):
+    """An ISO timestamp, or {'since': timestamp, 'after': key} part-way through a page sequence"""
+    if isinstance(value, dict):
+        after = value.get('after')
+        return (
+            set(value) == {'since', 'after'}
+            and _valid_timestamp(value['since'])
+            and isinstance(after, dict) and after
+            and all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in after.values())
+            and after.get('userId', user_id) == user_id
+        )
+    return _valid_timestamp(value)
+
+def decode_token(token, user_id):
+    try:
+        watermarks = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, binascii.Error):
+        raise ValueError('Invalid sync token')
+    if not isinstance(watermarks, dict) or set(watermarks) != set(TABLES) | {'deleted'}:
+        raise ValueError('Invalid sync token')
+    if not all(_valid_watermark(value, user_id) for value in watermarks.values()):
+        raise ValueError('Invalid sync token')
+    return watermarks
+
+def _since(watermark):
+    return watermark['since'] if isinstance(watermark, dict) else watermark
+
+def _page(table, watermark, **kwargs):
+    """One page of a query, resuming from the key the previous page stopped at.
+
+    Resuming from LastEvaluatedKey rather than from the last row's timestamp
+    keeps rows that share the page-boundary timestamp.
+    """
+    if isinstance(watermark, dict):
+        kwargs['ExclusiveStartKey'] = watermark['after']
+    response = table.query(Limit=PAGE_SIZE, **kwargs)
+    return response.get('Items', []), response.get('LastEvaluatedKey')
+
+def _changed_since(table, user_id, watermark):
+    return _page(
+        table, watermark,
+        IndexName='UserIdUpdatedAtIndex',
+        KeyConditionExpression='userId = :uid AND updatedAt > :since',
+        ExpressionAttributeValues={':uid': user_id, ':since': _since(watermark)}
+    )
+
+def _deleted_since(user_id, watermark):
+    if tombstones.table is None:
+        return [], None
+    return _page(
+        tombstones.table, watermark,
+        KeyConditionExpression='userId = :uid AND deletedAtKey > :since',
+        ExpressionAttributeValues={':uid': user_id, ':since': _since(watermark)}
+    )
+
+def _next_watermark(watermark, last_key, safe_watermark):
+    # A partial page resumes after its last key; a drained query only advances to the skew-safe point
+    if last_key:
+        return {'since': _since(watermark), 'after': last_key}
+    return max(_since(watermark), safe_watermark)
+
+def sync(event, context):
+    try:
+        user_id = event['pathParameters']['userid']
+        params = event.get('queryStringParameters') or {}
+        now = datetime.now()
+        safe_watermark = (now - timedelta(seconds=SKEW_SECONDS)).isoformat()
+        fresh_token = encode_token({name: safe_watermark for name in list(TABLES) + ['deleted']})
+
+        # No token, or one older than the tombstones we keep: the client must reload everything
+        since_token = params.get('since')
+        if not since_token:
+            return respond(200, {'reset': True, 'token': fresh_token})
+        watermarks = decode_token(since_token, user_id)
+        oldest_tombstone = (now - timedelta(days=tombstones.TTL_DAYS)).isoformat()
+        if min(_since(value) for value in watermarks.values()) < oldest_tombstone:
+            return respond(200, {'reset': True, 'token': fresh_token})
+
+        changes = {}
+        has_more = False
+        next_watermarks = {}
+        for name, table in TABLES.items():
+            items, last_key = _changed_since(table, user_id, watermarks[name])
+            changes[name] = money.present_all(items)
+            has_more = has_more or bool(last_key)
+            next_watermarks[name] = _next_watermark(watermarks[name], last_key, safe_watermark)
+
+        deleted, last_key = _deleted_since(user_id, watermarks['deleted'])
+        has_more = has_more or bool(last_key)
+        next_watermarks['deleted'] = _next_watermark(watermarks['deleted'], last_key, safe_watermark)
+
+        return respond(200, {
+            'reset': False,
+            'token': encode_token(next_watermarks),
+            'hasMore': has_more,
+            'changes': changes,
+            'deleted': [{'type': item['type'], 'id': item['id'], 'deletedAt': item['deletedAt']} for item in deleted],
+        })
+    except ValueError as e:
+        return respond(400, {'error': str(e)})
+    except Exception as e:
+        print(f"Error syncing: {e}")
+        return respond(500, {'error': 'Could not sync changes'})
@@ -0,0 +1,98 @@
+# test_session_tokens.py
+import base64
+import json
+import time
+import unittest
+from unittest import mock
+import session_tokens
+
+KEYS = {'k1': 'test-signing-key'}
+
+def _encode(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).rstrip(b'=').decode('ascii')
+
+class VerifyTest(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(session_tokens, 'SIGNING_KEYS', KEYS),
+            mock.patch.object(session_tokens, 'ACTIVE_KEY_ID', 'k1'),
+            mock.patch.object(session_tokens, 'REVOKED_TOKENS_TABLE_NAME', None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        session_tokens._revoked.clear()
+        session_tokens._revoked_loaded_at = 0
+
+    def signed(self, claims):
+        payload_part = _encode(claims)
+        return f"{payload_part}.{session_tokens._sign('k1', payload_part)}"
+
+    def assertRejected(self, token):
+        with self.assertRaises(session_tokens.TokenError):
+            session_tokens.verify(token)
+
+    def test_valid_token(self):
+        token, claims = session_tokens.issue('user-1')
+        self.assertEqual(session_tokens.verify(token), claims)
+
+    def test_garbage(self):
+        for token in ('', 'garbage', '...', 'a.b.c', '!!!.???', 'é.é', '\x00.\x00', None, 42):
+            with self.subTest(token=token):
+                self.assertRejected(token)
+
+    def test_truncated(self):
+        token, _ = session_tokens.issue('user-1')
+        payload_part, signature = token.split('.')
+        for truncated in (payload_part, f"{payload_part}.", f"{payload_part[:-3]}.{signature}", token[:-5]):
+            with self.subTest(token=truncated):
+                self.assertRejected(truncated)
+
+    def test_non_ascii_signature(self):
+        token, _ = session_tokens.issue('user-1')
+        payload_part, _ = token.split('.')
+        self.assertRejected(f"{payload_part}.sïgnätüre")
+
+    def test_non_object_payload(self):
+        for payload in (1, [1, 2], 'text', None, True):
+            with self.subTest(payload=payload):
+                self.assertRejected(f"{_encode(payload)}.signature")
+
+    def test_wrong_claim_types(self):
+        now = int(time.time())
+        valid = {'sub': 'user-1', 'scopes': ['read'], 'iat': now, 'exp': now + 60, 'kid': 'k1', 'jti': 'j1'}
+        for name, value in (('kid', ['k1']), ('exp', 'tomorrow'), ('jti', ['j1']), ('scopes', 'read'), ('sub', 7)):
+            with self.subTest(claim=name):
+                self.assertRejected(self.signed(dict(valid, **{name: value})))
+
+    def test_tampered_and_expired(self):
+        token, claims = session_tokens.issue('user-1')
+        forged = _encode(dict(claims, sub='user-2'))
+        self.assertRejected(f"{forged}.{token.split('.')[1]}")
+        self.assertRejected(self.signed(dict(claims, exp=int(time.time()) - 1)))
+
+    def test_revoked(self):
+        token, claims = session_tokens.issue('user-1')
+        session_tokens.revoke(claims)
+        self.assertRejected(token)
+
+    def test_revocation_list_is_loaded_once_per_interval(self):
+        token, claims = session_tokens.issue('user-1')
+        other_token, _ = session_tokens.issue('user-1')
+        table = mock.Mock()
+        table.scan.return_value = {'Items': [
+            {'jti': claims['jti'], 'expiresAt': claims['exp']},
+            {'jti': 'long-gone', 'expiresAt': int(time.time()) - 10},
+        ]}
+        with mock.patch.object(session_tokens, 'REVOKED_TOKENS_TABLE_NAME', 'RevokedTokens'), \
+                mock.patch.object(session_tokens.capacity, 'Table', return_value=table), \
+                mock.patch.object(session_tokens.storage, 'resource'):
+            self.assertRejected(token)
+            for _ in range(3):
+                session_tokens.verify(other_token)
+        table.scan.assert_called_once()
+        table.get_item.assert_not_called()
+        self.assertNotIn('long-gone', session_tokens._revoked)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+# test_storage_parity.py
+"""The same Table-API workload against SQLite and DynamoDB, compared step by step.
+
+The DynamoDB side runs against DynamoDB Local when PARITY_DYNAMODB_ENDPOINT_URL
+is set (e.g. http://localhost:8000), else against moto if it is installed, and
+is skipped otherwise. Tables are created with a 'Parity' prefix and deleted
+afterwards. The SQLite side always runs and is also checked against the
+DynamoDB behaviour the handlers rely on.
+"""
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+import recurrence
+import sqlite_store
+import storage
+
+KEY_SCHEMAS = {
+    'ParityUsers': ('id', None),
+    'ParityExpenses': ('userId', 'id'),
+    'ParityIncome': ('id', 'userId'),
+    'ParityEvents': ('id', 'userId'),
+}
+
+def _index(name, *keys):
+    return {
+        'IndexName': name,
+        'KeySchema': [{'AttributeName': key, 'KeyType': kind} for key, kind in zip(keys, ('HASH', 'RANGE'))],
+        'Projection': {'ProjectionType': 'ALL'},
+    }
+
+DYNAMODB_INDEXES = {
+    'ParityUsers': [_index('EmailIndex', 'email')],
+    'ParityExpenses': [],
+    'ParityIncome': [_index('UserIdIndex', 'userId')],
+    'ParityEvents': [_index('UserIdIndex', 'userId'), _index('UserIdDateIndex', 'userId', 'date')],
+}
+
+def create_dynamodb_tables(dynamodb):
+    for table_name, (hash_key, range_key) in KEY_SCHEMAS.items():
+        keys = [(hash_key, 'HASH')] + ([(range_key, 'RANGE')] if range_key else [])
+        indexes = DYNAMODB_INDEXES[table_name]
+        attributes = {name for name, _ in keys} | {
+            key['AttributeName'] for index in indexes for key in index['KeySchema']}
+        kwargs = {
+            'TableName': table_name,
+            'KeySchema': [{'AttributeName': name, 'KeyType': kind} for name, kind in keys],
+            'AttributeDefinitions': [{'AttributeName': name, 'AttributeType': 'S'} for name in sorted(attributes)],
+            'BillingMode': 'PAY_PER_REQUEST',
+        }
+        if indexes:
+            kwargs['GlobalSecondaryIndexes'] = indexes
+        dynamodb.create_table(**kwargs).wait_until_exists()
+
+def _error_code(call):
+    try:
+        call()
+    except Exception as e:
+        return getattr(e, 'response', {}).get('Error', {}).get('Code') or type(e).__name__
+    return 'succeeded'
+
+def workload(resource):
+    """Handler-shaped calls; returns (step, comparable result) pairs"""
+    users = resource.Table('ParityUsers')
+    expenses = resource.Table('ParityExpenses')
+    income = resource.Table('ParityIncome')
+    events = resource.Table('ParityEvents')
+    results = []
+
+    def step(name, response):
+        response = {k: v for k, v in response.items() if k not in ('LastEvaluatedKey', 'ConsumedCapacity', 'ResponseMetadata')}
+        # Write timestamps come from the clock, not the backend
+        if 'Attributes' in response:
+            response['Attributes'] = {k: v for k, v in response['Attributes'].items() if k != 'updatedAt'}
+        # GSI queries without a sort key have no defined order
+        if 'Items' in response:
+            response['Items'] = sorted(response['Items'], key=lambda item: json.dumps(item, sort_keys=True, default=str))
+        results.append((name, json.loads(json.dumps(response, sort_keys=True, default=str))))
+
+    for i in range(12):
+        expenses.put_item(Item={
+            'userId': 'u1', 'id': f'e{i:02d}', 'name': f'Coffee {i % 3}', 'category': ['Food', 'Travel'][i % 2],
+            'amountMinor': 1000 + i * 250, 'currency': 'INR', 'date': f'2024-0{1 + i % 6}-1{i % 9}',
+        })
+    expenses.put_item(Item={
+        'userId': 'u1', 'id': 'rent', 'name': 'Rent', 'category': 'Housing', 'amountMinor': 500000, 'currency': 'INR',
+        'date': '2024-01-01', 'recurrence': recurrence.parse_rule({'freq': 'MONTHLY'}), 'overrides': {},
+    })
+    income.put_item(Item={'id': 'i1', 'userId': 'u1', 'source': 'Salary', 'amountMinor': 9000000, 'date': '2024-01-31'})
+    income.put_item(Item={'id': 'i2', 'userId': 'u2', 'source': 'Gift', 'amountMinor': 50000, 'date': '2024-02-14'})
+    for i in range(5):
+        events.put_item(Item={'id': f'ev{i}', 'userId': 'u1', 'title': f'Event {i}', 'date': f'2024-03-0{i + 1}'})
+    users.put_item(Item={'id': 'p1', 'email': 'ada@example.com', 'password': 'pw', 'name': 'Ada'})
+    users.put_item(Item={'id': 'p2', 'email': 'bob@example.com', 'password': 'pw', 'name': 'Bob'})
+
+    step('get', expenses.get_item(Key={'userId': 'u1', 'id': 'e03'}))
+    step('get missing', expenses.get_item(Key={'userId': 'u1', 'id': 'nope'}))
+    step('query table', expenses.query(KeyConditionExpression='userId = :uid', ExpressionAttributeValues={':uid': 'u1'}))
+    step('query projection', expenses.query(
+        KeyConditionExpression='userId = :uid',
+        ProjectionExpression='id, #n, amountMinor',
+        ExpressionAttributeNames={'#n': 'name'},
+        ExpressionAttributeValues={':uid': 'u1'}
+    ))
+    step('query begins_with', expenses.query(
+        KeyConditionExpression='userId = :uid AND begins_with(id, :p)',
+        ExpressionAttributeValues={':uid': 'u1', ':p': 'e1'}
+    ))
+    step('query gsi', income.query(
+        IndexName='UserIdIndex', KeyConditionExpression='userId = :uid', ExpressionAttributeValues={':uid': 'u1'}))
+    step('query date range', events.query(
+        IndexName='UserIdDateIndex',
+        KeyConditionExpression='userId = :uid AND #d BETWEEN :start AND :end',
+        FilterExpression='attribute_not_exists(recurrence)',
+        ExpressionAttributeNames={'#d': 'date'},
+        ExpressionAttributeValues={':uid': 'u1', ':start': '2024-03-02', ':end': '2024-03-04~'}
+    ))
+    step('query limit', expenses.query(
+        KeyConditionExpression='userId = :uid', Limit=5, ExpressionAttributeValues={':uid': 'u1'}))
+    step('query count', expenses.query(
+        KeyConditionExpression='userId = :uid', Select='COUNT', ExpressionAttributeValues={':uid': 'u1'}))
+    step('query email index', users.query(
+        IndexName='EmailIndex',
+        KeyConditionExpression='email = :email_val',
+        FilterExpression='password = :password_val',
+        ExpressionAttributeValues={':email_val': 'ada@example.com', ':password_val': 'pw'}
+    ))
+    step('scan filter', income.scan(FilterExpression='userId = :uid', ExpressionAttributeValues={':uid': 'u2'}))
+
+    step('update', expenses.update_item(
+        Key={'userId': 'u1', 'id': 'e00'},
+        UpdateExpression='SET #n = :n, amountMinor = :a, updatedAt = :ua REMOVE currency',
+        ExpressionAttributeNames={'#n': 'name'},
+        ExpressionAttributeValues={':n': 'Tea', ':a': 777, ':ua': '2024-06-01T00:00:00'},
+        ReturnValues='ALL_NEW'
+    ))
+    step('override', expenses.update_item(
+        Key={'userId': 'u1', 'id': 'rent'}, ReturnValues='ALL_NEW',
+        **recurrence.override_update('2024-03-01', {'amountMinor': 450000})
+    ))
+    step('skip', expenses.update_item(
+        Key={'userId': 'u1', 'id': 'rent'}, ReturnValues='ALL_NEW', **recurrence.skip_update('2024-04-01')))
+    results.append(('skip again', _error_code(lambda: expenses.update_item(
+        Key={'userId': 'u1', 'id': 'rent'}, **recurrence.skip_update('2024-04-01')))))
+    results.append(('override one-off', _error_code(lambda: expenses.update_item(
+        Key={'userId': 'u1', 'id': 'e01'}, **recurrence.override_update('2024-03-01', {'amountMinor': 1})))))
+    step('add counter', income.update_item(
+        Key={'id': 'counter', 'userId': 'u9'}, UpdateExpression='ADD hits :n', ExpressionAttributeValues={':n': 3},
+        ReturnValues='UPDATED_NEW'))
+    step('add counter again', income.update_item(
+        Key={'id': 'counter', 'userId': 'u9'}, UpdateExpression='ADD hits :n', ExpressionAttributeValues={':n': 2},
+        ReturnValues='UPDATED_NEW'))
+    results.append(('conditional put', _error_code(lambda: income.put_item(
+        Item={'id': 'i1', 'userId': 'u1'}, ConditionExpression='attribute_not_exists(id)'))))
+
+    step('delete', expenses.delete_item(Key={'userId': 'u1', 'id': 'e11'}, ReturnValues='ALL_OLD'))
+    step('batch get', resource.batch_get_item(RequestItems={
+        'ParityExpenses': {'Keys': [{'userId': 'u1', 'id': 'e01'}, {'userId': 'u1', 'id': 'e11'}]}}).get('Responses', {}))
+
+    results.append(('monthly totals', storage.monthly_totals(expenses, 'u1', date(2024, 1, 1), date(2024, 6, 30))))
+    results.append(('monthly totals gsi', storage.monthly_totals(
+        income, 'u1', date(2024, 1, 1), date(2024, 12, 31), index_name='UserIdIndex')))
+    return results
+
+def run_sqlite_workload():
+    with mock.patch.dict(sqlite_store.KEY_SCHEMAS, KEY_SCHEMAS):
+        return workload(sqlite_store.SqliteResource(os.path.join(tempfile.mkdtemp(), 'parity.db')))
+
+def _ids(response):
+    return sorted(item['id'] for item in response['Items'])
+
+class SqliteBackendTest(unittest.TestCase):
+    """DynamoDB semantics the handlers depend on, checked on the SQLite backend alone"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.results = dict(run_sqlite_workload())
+
+    def test_reads(self):
+        self.assertEqual(self.results['get missing'], {})
+        self.assertEqual(self.results['get']['Item']['id'], 'e03')
+        self.assertEqual(_ids(self.results['query begins_with']), ['e10', 'e11'])
+        self.assertEqual(len(self.results['query limit']['Items']), 5)
+        self.assertEqual(self.results['query count'], {'Count': 13, 'ScannedCount': 13})
+        self.assertEqual(self.results['scan filter']['Count'], 1)
+        self.assertEqual(self.results['scan filter']['ScannedCount'], 2)
+        self.assertEqual(_ids(self.results['query date range']), ['ev1', 'ev2', 'ev3'])
+        self.assertEqual(_ids(self.results['query email index']), ['p1'])
+        self.assertEqual(sorted(self.results['query projection']['Items'][0]), ['amountMinor', 'id', 'name'])
+
+    def test_writes(self):
+        self.assertNotIn('currency', self.results['update']['Attributes'])
+        self.assertEqual(self.results['skip']['Attributes']['recurrence']['exdates'], ['2024-04-01'])
+        self.assertEqual(self.results['skip again'], 'ConditionalCheckFailedException')
+        self.assertEqual(self.results['override one-off'], 'ConditionalCheckFailedException')
+        self.assertEqual(self.results['add counter again'], {'Attributes': {'hits': '5'}})
+        self.assertEqual(self.results['conditional put'], 'ConditionalCheckFailedException')
+        self.assertEqual([item['id'] for item in self.results['batch get']['ParityExpenses']], ['e01'])
+
+    def test_monthly_totals(self):
+        totals = self.results['monthly totals']
+        self.assertEqual(totals['2024-03'], {'INR': {'Food': 4500, 'Housing': 450000}})
+        self.assertNotIn('Housing', totals['2024-04']['INR'])  # The skipped occurrence
+        self.assertEqual(self.results['monthly totals gsi'], {'2024-01': {'INR': {'': 9000000}}})
+
+    def test_missing_table_name(self):
+        resource = sqlite_store.SqliteResource(os.path.join(tempfile.mkdtemp(), 'unset.db'))
+        with self.assertRaisesRegex(ValueError, 'TABLE_NAME'):
+            resource.Table(None)
+
+class ParityTest(unittest.TestCase):
+    """Every workload step must give the same result on DynamoDB and on SQLite"""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import boto3
+        except ImportError:
+            raise unittest.SkipTest('boto3 is not installed')
+        cls.moto = None
+        endpoint_url = os.environ.get('PARITY_DYNAMODB_ENDPOINT_URL')
+        if not endpoint_url:
+            try:
+                import moto
+            except ImportError:
+                raise unittest.SkipTest('Set PARITY_DYNAMODB_ENDPOINT_URL or install moto to compare with DynamoDB')
+            cls.moto = moto.mock_aws()
+            cls.moto.start()
+        cls.dynamodb = boto3.resource(
+            'dynamodb', endpoint_url=endpoint_url, region_name=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+        create_dynamodb_tables(cls.dynamodb)
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            for table_name in KEY_SCHEMAS:
+                cls.dynamodb.Table(table_name).delete()
+        finally:
+            if cls.moto is not None:
+                cls.moto.stop()
+
+    def test_same_results(self):
+        dynamo_results = workload(self.dynamodb)
+        sqlite_results = run_sqlite_workload()
+        self.assertEqual([name for name, _ in dynamo_results], [name for name, _ in sqlite_results])
+        for (name, expected), (_, actual) in zip(dynamo_results, sqlite_results):
+            with self.subTest(step=name):
+                self.assertEqual(actual, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# test_traffic_capture.py
+import base64
+import json
+import unittest
+from unittest import mock
+import traffic_capture
+
+USER_ID = 'user-8f3a'
+ITEM_ID = 'expense-41c2'
+
+def _token(watermarks):
+    return base64.urlsafe_b64encode(json.dumps(watermarks).encode('utf-8')).decode('ascii')
+
+class SanitizeTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.object(traffic_capture, 'CAPTURE_SALT', 'test-salt')
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def captured(self, **event):
+        event.setdefault('httpMethod', 'GET')
+        event.setdefault('requestContext', {'identity': {'sourceIp': '203.0.113.7'}})
+        return traffic_capture.sanitize(event)
+
+    def test_free_text_and_secrets_are_removed(self):
+        body = {
+            'name': 'Rent to Jane Doe', 'notes': 'flat 4B', 'category': 'Housing',
+            'password': 'hunter2', 'email': 'Jane@Example.com', 'amount': 1200,
+        }
+        captured = self.captured(httpMethod='POST', path=f'/expenses/{USER_ID}', body=json.dumps(body))
+        text = json.dumps(captured)
+        for private in ('Jane', 'flat 4B', 'Housing', 'hunter2', USER_ID, '203.0.113.7'):
+            self.assertNotIn(private, text)
+        sanitized = json.loads(captured['body'])
+        self.assertEqual(sanitized['amount'], 1200)
+        self.assertEqual(sanitized['password'], traffic_capture.REPLAY_PASSWORD)
+
+    def test_ids_map_to_the_same_pseudonym_everywhere(self):
+        by_path = self.captured(path=f'/expenses/{USER_ID}/{ITEM_ID}')
+        by_ids = self.captured(path=f'/goals/{USER_ID}', queryStringParameters={'ids': f'{ITEM_ID}, other'})
+        by_body = self.captured(httpMethod='POST', path='/pass_change', body=json.dumps({'userId': USER_ID}))
+
+        _, route, user_pseudonym, item_pseudonym = by_path['path'].split('/')
+        self.assertEqual(route, 'expenses')
+        self.assertEqual(by_ids['path'], f'/goals/{user_pseudonym}')
+        self.assertEqual(by_ids['queryStringParameters']['ids'].split(',')[0], item_pseudonym)
+        self.assertEqual(json.loads(by_body['body'])['userId'], user_pseudonym)
+        self.assertEqual(by_body['path'], '/pass_change')
+
+    def test_search_terms_are_hashed(self):
+        captured = self.captured(path=f'/search/{USER_ID}', queryStringParameters={'q': 'Jane Doe', 'type': 'expense'})
+        self.assertNotIn('Jane', json.dumps(captured))
+        self.assertEqual(captured['queryStringParameters']['type'], 'expense')
+        again = self.captured(path=f'/search/{USER_ID}', queryStringParameters={'q': 'jane doe '})
+        self.assertEqual(captured['queryStringParameters']['q'], again['queryStringParameters']['q'])
+
+    def test_sync_tokens_keep_timestamps_but_not_page_keys(self):
+        since = '2024-05-01T10:00:00'
+        token = _token({'expenses': {'since': since, 'after': {'id': ITEM_ID, 'userId': USER_ID}}, 'deleted': since})
+        captured = self.captured(path=f'/sync/{USER_ID}', queryStringParameters={'since': token})
+        watermarks = json.loads(base64.urlsafe_b64decode(captured['queryStringParameters']['since']))
+        self.assertEqual(watermarks, {'expenses': since, 'deleted': since})
+
+        garbage = self.captured(path=f'/sync/{USER_ID}', queryStringParameters={'since': 'not a token'})
+        self.assertIsNone(garbage['queryStringParameters']['since'])
+
+    def test_capture_needs_a_salt(self):
+        event = {'httpMethod': 'GET', 'path': f'/expenses/{USER_ID}'}
+        with mock.patch.object(traffic_capture, 'CAPTURE_RATE', 1.0):
+            self.assertIsNotNone(traffic_capture.begin(event))
+            with mock.patch.object(traffic_capture, 'CAPTURE_SALT', ''):
+                self.assertIsNone(traffic_capture.begin(event))
+
+if __name__ == '__main__':
+    unittest.main()
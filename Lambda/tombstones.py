@@ -0,0 +1,27 @@
+# tombstones.py
+import os
+import time
+from datetime import datetime
+import capacity
+import storage
+
+# Deleted ids are kept long enough for any client that syncs at least this often
+TOMBSTONES_TABLE_NAME = os.environ.get('TOMBSTONES_TABLE_NAME')
+TTL_DAYS = int(os.environ.get('TOMBSTONE_TTL_DAYS', '30'))
+
+dynamodb = storage.resource()
+table = capacity.Table(dynamodb, TOMBSTONES_TABLE_NAME) if TOMBSTONES_TABLE_NAME else None
+
+def record(user_id, kind, item_id):
+    """Remember a delete so /sync can tell other clients to drop the item"""
+    if table is None:
+        return
+    deleted_at = datetime.now().isoformat()
+    table.put_item(Item={
+        'userId': user_id,
+        'deletedAtKey': f"{deleted_at}#{kind}#{item_id}",  # Sort key: ordered by delete time
+        'type': kind,
+        'id': item_id,
+        'deletedAt': deleted_at,
+        'expiresAt': int(time.time()) + TTL_DAYS * 86400,  # DynamoDB TTL attribute
+    })
@@ -0,0 +1,135 @@
+# traffic_capture.py
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+
+# Share of requests written to the log as sanitized, replayable capture lines (0 disables)
+CAPTURE_RATE = float(os.environ.get('TRAFFIC_CAPTURE_RATE', '0'))
+# Secret HMAC key for pseudonyms; without one they could be reversed by hashing guesses
+CAPTURE_SALT = os.environ.get('TRAFFIC_CAPTURE_SALT', '')
+if CAPTURE_RATE > 0 and not CAPTURE_SALT:
+    print('Traffic capture disabled: set TRAFFIC_CAPTURE_SALT to a secret value to enable it')
+    CAPTURE_RATE = 0.0
+MARKER = 'TRAFFIC_CAPTURE '
+FORMAT_VERSION = 1
+
+# Replaced so captures never carry credentials; replay seeds users with the same password
+REPLAY_PASSWORD = 'replay-password'
+SECRET_FIELDS = ('password', 'oldPassword', 'newPassword', 'token')
+FREE_TEXT_FIELDS = ('notes', 'receiptUrl', 'description', 'name', 'title')
+# Replaced by consistent pseudonyms, so per-category and per-user behaviour still replays
+PSEUDONYM_FIELDS = ('category', 'userId')
+# Only headers that change handler behaviour are kept; Authorization and cookies never are
+KEPT_HEADERS = ('Content-Type', 'content-type')
+
+def _pseudonym(value):
+    """Keyed hash: the same value always maps to the same pseudonym, which cannot be reversed without the salt"""
+    return hmac.new(CAPTURE_SALT.encode('utf-8'), str(value).encode('utf-8'), hashlib.sha256).hexdigest()[:12]
+
+def pseudonymize_email(email):
+    return f"user-{_pseudonym(str(email).lower())}@example.invalid"
+
+def _sanitize_body(body):
+    if not body:
+        return body
+    try:
+        data = json.loads(body)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(data, dict):
+        for field in SECRET_FIELDS:
+            if field in data:
+                data[field] = REPLAY_PASSWORD
+        for field in FREE_TEXT_FIELDS:
+            if data.get(field):
+                data[field] = 'redacted'
+        for field in PSEUDONYM_FIELDS:
+            if data.get(field):
+                data[field] = _pseudonym(data[field])
+        if data.get('email'):
+            data['email'] = pseudonymize_email(data['email'])
+    return json.dumps(data)
+
+def _sanitize_path(path):
+    """/<route>/<userId>/<itemId> with every id replaced by its pseudonym"""
+    parts = path.split('/')
+    return '/'.join(parts[:2] + [_pseudonym(part) if part else part for part in parts[2:]])
+
+def _sanitize_sync_token(token):
+    """Sync token with the page keys dropped: they hold real ids, and each watermark's timestamp is enough to replay"""
+    try:
+        watermarks = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(watermarks, dict):
+        return None
+    watermarks = {
+        name: value.get('since') if isinstance(value, dict) else value
+        for name, value in watermarks.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(watermarks, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def _sanitize_params(params):
+    if not params:
+        return params
+    params = dict(params)
+    if params.get('q'):
+        params['q'] = _pseudonym(params['q'].strip().lower())
+    if params.get('ids'):
+        params['ids'] = ','.join(_pseudonym(item_id.strip()) for item_id in params['ids'].split(',') if item_id.strip())
+    if params.get('since'):
+        params['since'] = _sanitize_sync_token(params['since'])
+    return params
+
+def sanitize(event):
+    """The parts of an API Gateway event needed to replay it, with secrets and PII removed.
+
+    Ids in the path, ?ids= and body are replaced by keyed pseudonyms, so one user's
+    requests still hit one (seeded) user on replay; search terms are hashed the same way.
+    """
+    identity = ((event.get('requestContext') or {}).get('identity') or {})
+    return {
+        'httpMethod': event.get('httpMethod'),
+        'path': _sanitize_path(event.get('path')),
+        'queryStringParameters': _sanitize_params(event.get('queryStringParameters')),
+        'headers': {name: value for name, value in (event.get('headers') or {}).items() if name in KEPT_HEADERS},
+        'body': _sanitize_body(event.get('body')),
+        'requestContext': {'identity': {'sourceIp': _pseudonym(identity.get('sourceIp'))}},
+    }
+
+def begin(event):
+    """Sanitized copy of the event if this request is sampled, taken before handlers modify it"""
+    if CAPTURE_RATE <= 0 or not CAPTURE_SALT or random.random() >= CAPTURE_RATE:
+        return None
+    if not event.get('httpMethod') or not event.get('path'):
+        return None
+    return {'ts': time.time(), 'event': sanitize(event)}
+
+def record(capture, response):
+    if capture is None:
+        return
+    capture.update({
+        'v': FORMAT_VERSION,
+        'durationMs': round((time.time() - capture['ts']) * 1000, 2),
+        'status': (response or {}).get('statusCode'),
+    })
+    print(MARKER + json.dumps(capture, separators=(',', ':'), default=str))
+
+def read(lines):
+    """Capture records from log lines (CloudWatch exports may prefix each line), oldest first"""
+    records = []
+    for line in lines:
+        start = line.find(MARKER)
+        if start < 0:
+            continue
+        try:
+            records.append(json.loads(line[start + len(MARKER):]))
+        except json.JSONDecodeError:
+            continue
+    records.sort(key=lambda record: record['ts'])
+    return records
@@ -1,13 +1,15 @@
 #user_handler.py
 
 import json
-import boto3
 import uuid
 from datetime import datetime
+import capacity
+import session_tokens
+import storage
 
 # Database resources
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table('Users')
+dynamodb = storage.resource()
+users_table = capacity.Table(dynamodb, 'Users')
 
 def respond(status_code, body=None):
     return {
@@ -31,6 +33,8 @@ def signup(event):
             body = json.loads(event['body'])
         except json.JSONDecodeError:
             return respond(400, {'message': 'Invalid JSON in request body'})
+        if not isinstance(body, dict):
+            return respond(400, {'message': 'Request body must be a JSON object'})
         
         email = body.get('email')
         password = body.get('password')
@@ -54,6 +58,10 @@ def signup(event):
 
         users_table.put_item(Item=user_data)
 
+        if session_tokens.enabled():
+            token, claims = session_tokens.issue(user_id)
+            user_data = dict(user_data, token=token, tokenExpiresAt=claims['exp'])
+
         return respond(201, user_data)
     except Exception as e:
         print(f"Error during signup: {e}")
@@ -80,6 +88,8 @@ def update_user(event, user_id):
             body = json.loads(event['body'])
         except json.JSONDecodeError:
             return respond(400, {'message': 'Invalid JSON in request body'})
+        if not isinstance(body, dict):
+            return respond(400, {'message': 'Request body must be a JSON object'})
             
         name = body.get('name')
         email = body.get('email')
@@ -139,6 +149,22 @@ def delete_user(user_id):
         print(f"Error deleting user {user_id}: {e}")
         return respond(500, {'message': 'Could not delete user'})
 
+def _missing_index(error):
+    # DynamoDB answers a query on an index the table does not have with a ValidationException
+    error_info = (getattr(error, 'response', None) or {}).get('Error', {})
+    return error_info.get('Code') == 'ValidationException' and 'index' in error_info.get('Message', '').lower()
+
+def _scan_for_login(email, password):
+    kwargs = {
+        'FilterExpression': 'email = :email_val AND password = :password_val', # In a real app, compare hashed passwords
+        'ExpressionAttributeValues': {':email_val': email, ':password_val': password},
+    }
+    while True:
+        response = users_table.scan(**kwargs)
+        if response['Items'] or 'LastEvaluatedKey' not in response:
+            return response['Items']
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
 def login(event):
     try:
         # Handle the case where event might not have a body
@@ -149,6 +175,8 @@ def login(event):
             body = json.loads(event['body'])
         except json.JSONDecodeError:
             return respond(400, {'message': 'Invalid JSON in request body'})
+        if not isinstance(body, dict):
+            return respond(400, {'message': 'Request body must be a JSON object'})
             
         email = body.get('email')
         password = body.get('password')
@@ -156,16 +184,26 @@ def login(event):
         if not all([email, password]):
             return respond(400, {'message': 'Missing email or password'})
 
-        response = users_table.scan(
-            FilterExpression='email = :email_val AND password = :password_val', # In a real app, compare hashed passwords
-            ExpressionAttributeValues={
-                ':email_val': email,
-                ':password_val': password
-            }
-        )
+        # Users needs an EmailIndex GSI (partition key email, all attributes projected);
+        # tables created before it existed fall back to a scan until the index is added
+        try:
+            items = users_table.query(
+                IndexName='EmailIndex',
+                KeyConditionExpression='email = :email_val',
+                FilterExpression='password = :password_val', # In a real app, compare hashed passwords
+                ExpressionAttributeValues={
+                    ':email_val': email,
+                    ':password_val': password
+                }
+            )['Items']
+        except Exception as e:
+            if not _missing_index(e):
+                raise
+            print("EmailIndex not found on the Users table, falling back to a scan; add the index (see README)")
+            items = _scan_for_login(email, password)
 
-        if response['Items']:
-            user = response['Items'][0]
+        if items:
+            user = items[0]
             current_time = datetime.utcnow().isoformat() + "Z"
             users_table.update_item(
                 Key={'id': user['id']},
@@ -173,6 +211,12 @@ def login(event):
                 ExpressionAttributeValues={':last_login': current_time}
             )
             user['lastLogin'] = current_time
+
+            # Later requests carry this signed token instead of being looked up again
+            if session_tokens.enabled():
+                token, claims = session_tokens.issue(user['id'])
+                user['token'] = token
+                user['tokenExpiresAt'] = claims['exp']
             return respond(200, user)
         else:
             return respond(401, {'message': 'Invalid credentials'})
@@ -190,6 +234,8 @@ def change_password(event):
             body = json.loads(event['body'])
         except json.JSONDecodeError:
             return respond(400, {'message': 'Invalid JSON in request body'})
+        if not isinstance(body, dict):
+            return respond(400, {'message': 'Request body must be a JSON object'})
             
         user_id = body.get('userId')
         old_password = body.get('oldPassword')
@@ -215,4 +261,19 @@ def change_password(event):
             return respond(404, {'message': 'User not found'})
     except Exception as e:
         print(f"Error changing password: {e}")
-        return respond(500, {'message': 'Could not change password'})
\ No newline at end of file
+        return respond(500, {'message': 'Could not change password'})
+
+def logout(event):
+    try:
+        token = session_tokens.bearer_token(event)
+        if not token:
+            return respond(400, {'message': 'Missing session token'})
+
+        claims = session_tokens.verify(token)
+        session_tokens.revoke(claims)
+        return respond(204)
+    except session_tokens.TokenError as e:
+        return respond(401, {'message': str(e)})
+    except Exception as e:
+        print(f"Error during logout: {e}")
+        return respond(500, {'message': 'Could not log out'})
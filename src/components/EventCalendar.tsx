@@ -1,18 +1,28 @@
 import { useState } from "react";
+import { useQuery } from "@tanstack/react-query";
 import { format, startOfMonth, endOfMonth, eachDayOfInterval, isSameMonth, isSameDay, addMonths, subMonths, getDay, isToday } from "date-fns";
 import { ChevronLeft, ChevronRight } from "lucide-react";
 import { Button } from "@/components/ui/button";
-import { Event } from "@/lib/types";
+import { CalendarWindow, Event } from "@/lib/types";
+import { getCalendar } from "@/lib/api";
+import { useAuth } from "@/contexts/AuthContext";
 import { cn } from "@/lib/utils";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from "@/components/ui/tooltip";
 
-interface EventCalendarProps {
-  events: Event[];
-}
-
-export function EventCalendar({ events }: EventCalendarProps) {
+export function EventCalendar() {
   const [currentDate, setCurrentDate] = useState(new Date());
+  const { user } = useAuth();
+  const monthKey = format(currentDate, "yyyy-MM");
+
+  // Only the visible month is fetched; the server groups events into per-day buckets
+  const { data: calendar } = useQuery<CalendarWindow>({
+    queryKey: ["calendar", user?.id, monthKey],
+    queryFn: () => getCalendar(user?.id || "", monthKey),
+    enabled: !!user?.id,
+    staleTime: 5 * 60 * 1000, // 5 minutes
+  });
+  const events = calendar?.events || [];
   
   // Get the first and last day of the current month
   const monthStart = startOfMonth(currentDate);
@@ -43,11 +53,12 @@ export function EventCalendar({ events }: EventCalendarProps) {
   };
   
   // Calculate the color intensity based on the total amount of events for a day
-  const getColorIntensity = (dayEvents: Event[]) => {
+  const getColorIntensity = (date: Date, dayEvents: Event[]) => {
     if (dayEvents.length === 0) return 0;
     
-    // Calculate total amount for the day
-    const totalAmount = dayEvents.reduce((sum, event) => sum + Number(event.amount), 0);
+    // Use the server-side bucket totals for the day (the largest currency total drives the shade)
+    const totals = calendar?.days[format(date, "yyyy-MM-dd")]?.totals ?? {};
+    const totalAmount = Math.max(0, ...Object.values(totals).map(t => Number(t.income) + Number(t.expense)));
     
     // Normalize the amount to a value between 0 and 1
     // Assuming a maximum amount of 10000 for full intensity
@@ -58,14 +69,14 @@ export function EventCalendar({ events }: EventCalendarProps) {
   };
   
   // Get the color for a day based on the events
-  const getDayColor = (dayEvents: Event[]) => {
+  const getDayColor = (date: Date, dayEvents: Event[]) => {
     if (dayEvents.length === 0) return "bg-transparent";
     
     // Check if all events are of the same type
     const allIncome = dayEvents.every(event => event.type === "income");
     const allExpense = dayEvents.every(event => event.type === "expense");
     
-    const intensity = getColorIntensity(dayEvents);
+    const intensity = getColorIntensity(date, dayEvents);
     
     if (allIncome) {
       return `bg-green-${Math.round(intensity * 500)}`;
@@ -114,7 +125,7 @@ export function EventCalendar({ events }: EventCalendarProps) {
           {/* Days of the month */}
           {daysInMonth.map(day => {
             const dayEvents = getEventsForDay(day);
-            const dayColor = getDayColor(dayEvents);
+            const dayColor = getDayColor(day, dayEvents);
             const isCurrentDay = isToday(day);
             
             return (
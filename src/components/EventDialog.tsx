@@ -7,6 +7,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@
 import { Textarea } from "@/components/ui/textarea";
 import { useEvents } from "@/hooks/useEvents";
 import { Event } from "@/lib/types";
+import { EditScope } from "@/lib/api";
 import { Trash2 } from "lucide-react";
 import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent, AlertDialogDescription, AlertDialogFooter, AlertDialogHeader, AlertDialogTitle, AlertDialogTrigger } from "@/components/ui/alert-dialog";
 
@@ -36,10 +37,13 @@ export function EventDialog({
   const [category, setCategory] = useState("");
   const [amount, setAmount] = useState("");
   const [notes, setNotes] = useState("");
+  // Occurrences of a recurring series are edited one at a time unless the whole series is chosen
+  const [scope, setScope] = useState<EditScope>("occurrence");
   
   const { createEvent, updateEvent, deleteEvent } = useEvents();
   
   const isEditMode = mode === "edit";
+  const isOccurrence = isEditMode && !!event?.seriesId;
   
   // Reset form when dialog opens/closes or event changes
   useEffect(() => {
@@ -48,12 +52,14 @@ export function EventDialog({
         setTitle(event.title);
         // Split date and time from the ISO string
         const eventDate = new Date(event.date);
-        setDate(eventDate.toISOString().split("T")[0]);
+        // Keep the stored date: converting it through UTC can shift it by a day
+        setDate(event.date.split("T")[0]);
         setTime(eventDate.toTimeString().split(" ")[0].substring(0, 5));
         setType(event.type);
         setCategory(event.category);
         setAmount(event.amount.toString());
         setNotes(event.notes || "");
+        setScope("occurrence");
       } else {
         // Reset form for new event
         setTitle("");
@@ -90,7 +96,7 @@ export function EventDialog({
     
     try {
       if (isEditMode && event) {
-        await updateEvent({ id: event.id, data: eventData });
+        await updateEvent({ id: event.id, data: eventData, scope });
       } else {
         await createEvent(eventData);
       }
@@ -102,11 +108,11 @@ export function EventDialog({
     }
   };
   
-  const handleDelete = async () => {
+  const handleDelete = async (deleteScope: EditScope = scope) => {
     if (!event) return;
     
     try {
-      await deleteEvent(event.id);
+      await deleteEvent({ id: event.id, scope: deleteScope });
       // Close dialog
       onOpenChange(false);
     } catch (error) {
@@ -207,6 +213,22 @@ export function EventDialog({
                 required
               />
             </div>
+            {isOccurrence && (
+              <div className="grid grid-cols-4 items-center gap-4">
+                <Label htmlFor="scope" className="text-right">
+                  Apply to
+                </Label>
+                <Select value={scope} onValueChange={(value) => setScope(value as EditScope)}>
+                  <SelectTrigger id="scope" className="col-span-3">
+                    <SelectValue />
+                  </SelectTrigger>
+                  <SelectContent>
+                    <SelectItem value="occurrence">This occurrence</SelectItem>
+                    <SelectItem value="series">Whole series</SelectItem>
+                  </SelectContent>
+                </Select>
+              </div>
+            )}
             <div className="grid grid-cols-4 items-center gap-4">
               <Label htmlFor="notes" className="text-right">
                 Notes
@@ -233,12 +255,15 @@ export function EventDialog({
                   <AlertDialogHeader>
                     <AlertDialogTitle>Are you sure?</AlertDialogTitle>
                     <AlertDialogDescription>
-                      This action cannot be undone. This will permanently delete this event.
+                      This action cannot be undone. This will permanently delete {isOccurrence && scope === "series" ? "every occurrence of this event" : "this event"}.
                     </AlertDialogDescription>
                   </AlertDialogHeader>
                   <AlertDialogFooter>
                     <AlertDialogCancel>Cancel</AlertDialogCancel>
-                    <AlertDialogAction onClick={handleDelete}>Delete</AlertDialogAction>
+                    {isOccurrence && (
+                      <AlertDialogAction onClick={() => handleDelete("following")}>End series here</AlertDialogAction>
+                    )}
+                    <AlertDialogAction onClick={() => handleDelete()}>Delete</AlertDialogAction>
                   </AlertDialogFooter>
                 </AlertDialogContent>
               </AlertDialog>
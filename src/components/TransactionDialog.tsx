@@ -7,6 +7,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@
 import { useTransactions } from "@/hooks/useTransactions";
 import { useToast } from "@/hooks/use-toast";
 import { Expense, Income } from "@/lib/types";
+import { EditScope } from "@/lib/api";
 import { Trash2, Pencil } from "lucide-react";
 import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent, AlertDialogDescription, AlertDialogFooter, AlertDialogHeader, AlertDialogTitle, AlertDialogTrigger } from "@/components/ui/alert-dialog";
 
@@ -43,6 +44,8 @@ export function TransactionDialog({
   const [category, setCategory] = useState("");
   const [date, setDate] = useState(new Date().toISOString().split("T")[0]);
   const [notes, setNotes] = useState("");
+  // Occurrences of a recurring series are edited one at a time unless the whole series is chosen
+  const [scope, setScope] = useState<EditScope>("occurrence");
   
   const { createExpense, createIncome, updateExpense, updateIncome, deleteExpense, deleteIncome } = useTransactions();
   const { toast } = useToast();
@@ -50,6 +53,7 @@ export function TransactionDialog({
   const isExpense = type === "expense";
   const categories = isExpense ? EXPENSE_CATEGORIES : INCOME_CATEGORIES;
   const isEditMode = mode === "edit";
+  const isOccurrence = isEditMode && !!transaction?.seriesId;
   
   // Reset form when dialog opens/closes or transaction changes
   useEffect(() => {
@@ -60,6 +64,7 @@ export function TransactionDialog({
         setCategory(transaction.category);
         setDate(transaction.date.split("T")[0]);
         setNotes(transaction.notes || "");
+        setScope("occurrence");
       } else {
         // Reset form for new transaction
         setName("");
@@ -94,9 +99,9 @@ export function TransactionDialog({
     try {
       if (isEditMode && transaction) {
         if (isExpense) {
-          await updateExpense({ id: transaction.id, data: transactionData });
+          await updateExpense({ id: transaction.id, data: transactionData, scope });
         } else {
-          await updateIncome({ id: transaction.id, data: transactionData });
+          await updateIncome({ id: transaction.id, data: transactionData, scope });
         }
       } else {
         if (isExpense) {
@@ -117,14 +122,14 @@ export function TransactionDialog({
     }
   };
   
-  const handleDelete = async () => {
+  const handleDelete = async (deleteScope: EditScope = scope) => {
     if (!transaction) return;
     
     try {
       if (isExpense) {
-        await deleteExpense(transaction.id);
+        await deleteExpense({ id: transaction.id, scope: deleteScope });
       } else {
-        await deleteIncome(transaction.id);
+        await deleteIncome({ id: transaction.id, scope: deleteScope });
       }
       
       // Close dialog
@@ -205,6 +210,22 @@ export function TransactionDialog({
                 required
               />
             </div>
+            {isOccurrence && (
+              <div className="grid grid-cols-4 items-center gap-4">
+                <Label htmlFor="scope" className="text-right">
+                  Apply to
+                </Label>
+                <Select value={scope} onValueChange={(value) => setScope(value as EditScope)}>
+                  <SelectTrigger id="scope" className="col-span-3">
+                    <SelectValue />
+                  </SelectTrigger>
+                  <SelectContent>
+                    <SelectItem value="occurrence">This occurrence</SelectItem>
+                    <SelectItem value="series">Whole series</SelectItem>
+                  </SelectContent>
+                </Select>
+              </div>
+            )}
             <div className="grid grid-cols-4 items-center gap-4">
               <Label htmlFor="notes" className="text-right">
                 Notes
@@ -231,12 +252,15 @@ export function TransactionDialog({
                   <AlertDialogHeader>
                     <AlertDialogTitle>Are you sure?</AlertDialogTitle>
                     <AlertDialogDescription>
-                      This action cannot be undone. This will permanently delete this {type}.
+                      This action cannot be undone. This will permanently delete {isOccurrence && scope === "series" ? `every occurrence of this ${type}` : `this ${type}`}.
                     </AlertDialogDescription>
                   </AlertDialogHeader>
                   <AlertDialogFooter>
                     <AlertDialogCancel>Cancel</AlertDialogCancel>
-                    <AlertDialogAction onClick={handleDelete}>Delete</AlertDialogAction>
+                    {isOccurrence && (
+                      <AlertDialogAction onClick={() => handleDelete("following")}>End series here</AlertDialogAction>
+                    )}
+                    <AlertDialogAction onClick={() => handleDelete()}>Delete</AlertDialogAction>
                   </AlertDialogFooter>
                 </AlertDialogContent>
               </AlertDialog>
@@ -2,7 +2,7 @@
 import React, { createContext, useContext, useState, useEffect } from "react";
 import { useToast } from "@/hooks/use-toast";
 import { User } from "@/lib/types";
-import { userLogin, userSignup, getUser } from "@/lib/api";
+import { userLogin, userSignup, userLogout, getUser } from "@/lib/api";
 
 interface AuthContextType {
   user: User | null;
@@ -30,6 +30,7 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
         })
         .catch(() => {
           localStorage.removeItem("userId");
+          localStorage.removeItem("sessionToken");
         })
         .finally(() => {
           setIsLoading(false);
@@ -45,6 +46,9 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
       const userData = await userLogin({ email, password });
       setUser(userData);
       localStorage.setItem("userId", userData.id);
+      if (userData.token) {
+        localStorage.setItem("sessionToken", userData.token);
+      }
       toast({
         title: "Login successful",
         description: `Welcome back, ${userData.name}!`,
@@ -68,6 +72,9 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
       const userData = await userSignup({ email, password, name });
       setUser(userData);
       localStorage.setItem("userId", userData.id);
+      if (userData.token) {
+        localStorage.setItem("sessionToken", userData.token);
+      }
       toast({
         title: "Account created",
         description: `Welcome, ${userData.name}!`,
@@ -86,8 +93,12 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
   };
 
   const logout = () => {
+    if (localStorage.getItem("sessionToken")) {
+      userLogout().catch((error) => console.error("Logout failed:", error));
+    }
     setUser(null);
     localStorage.removeItem("userId");
+    localStorage.removeItem("sessionToken");
     toast({
       title: "Logged out",
       description: "You have been successfully logged out.",
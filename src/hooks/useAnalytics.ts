@@ -2,6 +2,7 @@ import { useQuery } from "@tanstack/react-query";
 import { getIncome, getExpenses } from "@/lib/api";
 import { format, startOfMonth, endOfMonth, eachDayOfInterval, isSameDay, getMonth, getYear, subMonths, startOfDay, endOfDay, isWithinInterval } from "date-fns";
 import { useAuth } from "@/contexts/AuthContext";
+import { sumAmounts, DEFAULT_CURRENCY } from "@/lib/utils";
 
 export function useAnalytics(
   timeRange: "month" | "quarter" | "year" | "custom", 
@@ -10,6 +11,35 @@ export function useAnalytics(
   customEndDate?: Date
 ) {
   const { user } = useAuth();
+
+  // The visible range; recurring series are expanded by the API for exactly this window
+  const getDateRange = () => {
+    const now = new Date();
+    let startDate: Date;
+    let endDate: Date;
+    
+    if (timeRange === "custom" && customStartDate && customEndDate) {
+      // Use custom date range
+      startDate = startOfDay(customStartDate);
+      endDate = endOfDay(customEndDate);
+    } else if (timeRange === "month") {
+      // Use current month instead of selected month for up-to-date data
+      startDate = startOfMonth(now);
+      endDate = endOfDay(now);
+    } else if (timeRange === "quarter") {
+      startDate = startOfMonth(subMonths(now, 3));
+      endDate = endOfDay(now);
+    } else {
+      // Year
+      startDate = new Date(getYear(now), 0, 1);
+      endDate = endOfDay(now);
+    }
+    
+    return { startDate, endDate };
+  };
+  const { startDate, endDate } = getDateRange();
+  const from = format(startDate, "yyyy-MM-dd");
+  const to = format(endDate, "yyyy-MM-dd");
   
   // Fetch income data for the authenticated user
   const { 
@@ -17,8 +47,8 @@ export function useAnalytics(
     isLoading: isLoadingIncome, 
     error: incomeError 
   } = useQuery({
-    queryKey: ["income", user?.id],
-    queryFn: () => getIncome(user?.id || ""),
+    queryKey: ["income", user?.id, from, to],
+    queryFn: () => getIncome(user?.id || "", from, to),
     enabled: !!user?.id,
     staleTime: 5 * 60 * 1000, // 5 minutes
     refetchOnWindowFocus: true,
@@ -30,8 +60,8 @@ export function useAnalytics(
     isLoading: isLoadingExpenses, 
     error: expenseError 
   } = useQuery({
-    queryKey: ["expenses", user?.id],
-    queryFn: () => getExpenses(user?.id || ""),
+    queryKey: ["expenses", user?.id, from, to],
+    queryFn: () => getExpenses(user?.id || "", from, to),
     enabled: !!user?.id,
     staleTime: 5 * 60 * 1000, // 5 minutes
     refetchOnWindowFocus: true,
@@ -47,27 +77,6 @@ export function useAnalytics(
   const getFilteredData = () => {
     if (!incomeData || !expenseData) return { income: [], expenses: [] };
     
-    const now = new Date();
-    let startDate: Date;
-    let endDate: Date;
-    
-    if (timeRange === "custom" && customStartDate && customEndDate) {
-      // Use custom date range
-      startDate = startOfDay(customStartDate);
-      endDate = endOfDay(customEndDate);
-    } else if (timeRange === "month") {
-      // Use current month instead of selected month for up-to-date data
-      startDate = startOfMonth(now);
-      endDate = endOfDay(now);
-    } else if (timeRange === "quarter") {
-      startDate = startOfMonth(subMonths(now, 3));
-      endDate = endOfDay(now);
-    } else {
-      // Year
-      startDate = new Date(getYear(now), 0, 1);
-      endDate = endOfDay(now);
-    }
-    
     // Filter income data
     const filteredIncome = incomeData.filter(income => {
       const incomeDate = new Date(income.date);
@@ -82,17 +91,15 @@ export function useAnalytics(
     
     return { 
       income: filteredIncome, 
-      expenses: filteredExpenses,
-      startDate,
-      endDate
+      expenses: filteredExpenses
     };
   };
   
-  const { income, expenses, startDate, endDate } = getFilteredData();
+  const { income, expenses } = getFilteredData();
   
-  // Calculate total income and expenses
-  const totalIncome = income.reduce((sum, item) => sum + Number(item.amount), 0);
-  const totalExpenses = expenses.reduce((sum, item) => sum + Number(item.amount), 0);
+  // Calculate total income and expenses in the displayed currency
+  const totalIncome = sumAmounts(income)[DEFAULT_CURRENCY] ?? 0;
+  const totalExpenses = sumAmounts(expenses)[DEFAULT_CURRENCY] ?? 0;
   const netIncome = totalIncome - totalExpenses;
   
   // Calculate income and expenses by category
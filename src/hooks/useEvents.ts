@@ -1,5 +1,5 @@
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { getEvents, createEvent, updateEvent, deleteEvent } from "@/lib/api";
+import { getEvents, createEvent, updateEvent, deleteEvent, EditScope } from "@/lib/api";
 import { Event } from "@/lib/types";
 import { useToast } from "@/hooks/use-toast";
 import { useAuth } from "@/contexts/AuthContext";
@@ -39,6 +39,7 @@ export const useEvents = () => {
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["events", userId] });
+      queryClient.invalidateQueries({ queryKey: ["calendar", userId] });
       toast({
         title: "Success",
         description: "Event created successfully",
@@ -47,12 +48,13 @@ export const useEvents = () => {
   });
 
   const updateEventMutation = useMutation({
-    mutationFn: ({ id, data }: { id: string; data: EventData }) => {
+    mutationFn: ({ id, data, scope }: { id: string; data: EventData; scope?: EditScope }) => {
       if (!userId) throw new Error("User not authenticated");
-      return updateEvent(userId, id, data);
+      return updateEvent(userId, id, data, scope);
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["events", userId] });
+      queryClient.invalidateQueries({ queryKey: ["calendar", userId] });
       toast({
         title: "Success",
         description: "Event updated successfully",
@@ -61,12 +63,13 @@ export const useEvents = () => {
   });
 
   const deleteEventMutation = useMutation({
-    mutationFn: (id: string) => {
+    mutationFn: ({ id, scope }: { id: string; scope?: EditScope }) => {
       if (!userId) throw new Error("User not authenticated");
-      return deleteEvent(userId, id);
+      return deleteEvent(userId, id, scope);
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["events", userId] });
+      queryClient.invalidateQueries({ queryKey: ["calendar", userId] });
       toast({
         title: "Success",
         description: "Event deleted successfully",
@@ -1,8 +1,9 @@
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { getExpenses, createExpense, updateExpense, deleteExpense, getIncome, createIncome, updateIncome, deleteIncome } from "@/lib/api";
+import { getExpenses, createExpense, updateExpense, deleteExpense, getIncome, createIncome, updateIncome, deleteIncome, EditScope } from "@/lib/api";
 import { Expense, Income } from "@/lib/types";
 import { useToast } from "@/hooks/use-toast";
 import { useAuth } from "@/contexts/AuthContext";
+import { format, addDays, subYears } from "date-fns";
 
 // Define the transaction data type for creating new transactions
 type TransactionData = {
@@ -19,12 +20,17 @@ export const useTransactions = () => {
   const { user } = useAuth();
   
   const userId = user?.id;
+  // Recurring series are listed as their occurrences over the last five years (the widest
+  // window the API expands); one-off items are listed whatever their date, future ones included
+  const now = new Date();
+  const to = format(now, "yyyy-MM-dd");
+  const from = format(addDays(subYears(now, 5), 1), "yyyy-MM-dd");
 
   const expensesQuery = useQuery({
-    queryKey: ["expenses", userId],
+    queryKey: ["expenses", userId, from, to, "allOneOffs"],
     queryFn: async () => {
       if (!userId) return [];
-      const data = await getExpenses(userId);
+      const data = await getExpenses(userId, from, to, true);
       // Ensure we always return an array
       return Array.isArray(data) ? data : [];
     },
@@ -32,10 +38,10 @@ export const useTransactions = () => {
   });
 
   const incomeQuery = useQuery({
-    queryKey: ["income", userId],
+    queryKey: ["income", userId, from, to, "allOneOffs"],
     queryFn: async () => {
       if (!userId) return [];
-      const data = await getIncome(userId);
+      const data = await getIncome(userId, from, to, true);
       // Ensure we always return an array
       return Array.isArray(data) ? data : [];
     },
@@ -71,9 +77,9 @@ export const useTransactions = () => {
   });
 
   const updateExpenseMutation = useMutation({
-    mutationFn: ({ id, data }: { id: string; data: TransactionData }) => {
+    mutationFn: ({ id, data, scope }: { id: string; data: TransactionData; scope?: EditScope }) => {
       if (!userId) throw new Error("User not authenticated");
-      return updateExpense(userId, id, data);
+      return updateExpense(userId, id, data, scope);
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["expenses", userId] });
@@ -85,9 +91,9 @@ export const useTransactions = () => {
   });
 
   const updateIncomeMutation = useMutation({
-    mutationFn: ({ id, data }: { id: string; data: TransactionData }) => {
+    mutationFn: ({ id, data, scope }: { id: string; data: TransactionData; scope?: EditScope }) => {
       if (!userId) throw new Error("User not authenticated");
-      return updateIncome(userId, id, data);
+      return updateIncome(userId, id, data, scope);
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["income", userId] });
@@ -99,9 +105,9 @@ export const useTransactions = () => {
   });
 
   const deleteExpenseMutation = useMutation({
-    mutationFn: (id: string) => {
+    mutationFn: ({ id, scope }: { id: string; scope?: EditScope }) => {
       if (!userId) throw new Error("User not authenticated");
-      return deleteExpense(userId, id);
+      return deleteExpense(userId, id, scope);
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["expenses", userId] });
@@ -113,9 +119,9 @@ export const useTransactions = () => {
   });
 
   const deleteIncomeMutation = useMutation({
-    mutationFn: (id: string) => {
+    mutationFn: ({ id, scope }: { id: string; scope?: EditScope }) => {
       if (!userId) throw new Error("User not authenticated");
-      return deleteIncome(userId, id);
+      return deleteIncome(userId, id, scope);
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["income", userId] });
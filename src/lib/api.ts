@@ -6,19 +6,38 @@ const API_BASE_URL = import.meta.env.DEV
   ? "/api"
   : import.meta.env.VITE_API_BASE_URL; // Access env var
 
-const request = async (endpoint: string, options: RequestInit) => {
+// Throttled (429) requests are retried after the server's Retry-After, within these bounds
+const MAX_RATE_LIMIT_RETRIES = 2;
+const MAX_RETRY_AFTER_SECONDS = 10;
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+const request = async (endpoint: string, options: RequestInit, attempt = 0): Promise<any> => {
   try {
+    // Signed session token issued at login/signup
+    const sessionToken = localStorage.getItem("sessionToken");
     const response = await fetch(`${API_BASE_URL}${endpoint}`, {
       ...options,
       headers: {
         'Content-Type': 'application/json',
         'Accept': 'application/json',
         'Origin': window.location.origin,
+        ...(sessionToken ? { 'Authorization': `Bearer ${sessionToken}` } : {}),
         ...options.headers,
       },
       mode: 'cors',
     });
 
+    // The limiter rejects a request before any handler runs, so retrying is safe for every method
+    if (response.status === 429) {
+      const retryAfter = Math.max(Number(response.headers.get('Retry-After')) || 1, 1);
+      if (attempt < MAX_RATE_LIMIT_RETRIES && retryAfter <= MAX_RETRY_AFTER_SECONDS) {
+        await sleep(retryAfter * 1000);
+        return request(endpoint, options, attempt + 1);
+      }
+      throw new Error(`Too many requests. Please wait ${retryAfter} seconds and try again.`);
+    }
+
     if (!response.ok) {
       let errorMessage = `HTTP error! status: ${response.status}`;
       try {
@@ -46,6 +65,29 @@ const request = async (endpoint: string, options: RequestInit) => {
 };
 
 // User Authentication API calls
+// ?from=&to= window (yyyy-MM-dd, both or neither, at most 5 years); recurring series are
+// expanded into their occurrences inside it. With allOneOffs, one-off items outside the
+// window are still returned, so the window only bounds the series.
+const windowQuery = (from?: string, to?: string, allOneOffs = false) => {
+  const params = new URLSearchParams();
+  if (from) params.set("from", from);
+  if (to) params.set("to", to);
+  if (allOneOffs) params.set("oneOffs", "all");
+  return params.toString() ? `?${params.toString()}` : "";
+};
+};
+
+// What an edit or delete of an expanded occurrence applies to: that occurrence only, the whole
+// series, or (deletes only) this occurrence and every later one, which ends the series
+export type EditScope = "occurrence" | "following" | "series";
+
+// Expanded occurrences have ids of the form "<seriesId>@<yyyy-MM-dd>"; edits go to the series
+const itemPath = (collection: string, userId: string, itemId: string, scope: EditScope = "occurrence") => {
+  const [seriesId, occurrence] = itemId.split("@");
+  const query = occurrence ? `?${new URLSearchParams({ occurrence, scope }).toString()}` : "";
+  return `/${collection}/${userId}/${seriesId}${query}`;
+};
+
 export const userSignup = async (userData: any) => {
   return request("/users", {
     method: "POST",
@@ -66,6 +108,15 @@ export const userLogin = async (userData: any) => {
   });
 };
 
+export const userLogout = async () => {
+  return request("/logout", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+  });
+};
+
 export const getUser = async (userId: string) => {
   return request(`/users/${userId}`, {
     method: "GET",
@@ -115,13 +166,13 @@ export const createExpense = async (userId: string, expenseData: any) => {
   });
 };
 
-export const getExpenses = async (userId: string) => {
+export const getExpenses = async (userId: string, from?: string, to?: string, allOneOffs = false) => {
   if (!userId) {
     return [];
   }
   
   try {
-    const response = await request(`/expenses/${userId}`, {
+    const response = await request(`/expenses/${userId}${windowQuery(from, to, allOneOffs)}`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",
@@ -136,8 +187,8 @@ export const getExpenses = async (userId: string) => {
   }
 };
 
-export const updateExpense = async (userId: string, expenseId: string, expenseData: any) => {
-  return request(`/expenses/${userId}/${expenseId}`, {
+export const updateExpense = async (userId: string, expenseId: string, expenseData: any, scope?: EditScope) => {
+  return request(itemPath("expenses", userId, expenseId, scope), {
     method: "PUT",
     headers: {
       "Content-Type": "application/json",
@@ -146,8 +197,8 @@ export const updateExpense = async (userId: string, expenseId: string, expenseDa
   });
 };
 
-export const deleteExpense = async (userId: string, expenseId: string) => {
-  return request(`/expenses/${userId}/${expenseId}`, {
+export const deleteExpense = async (userId: string, expenseId: string, scope?: EditScope) => {
+  return request(itemPath("expenses", userId, expenseId, scope), {
     method: "DELETE",
     headers: {
       "Content-Type": "application/json",
@@ -166,13 +217,13 @@ export const createIncome = async (userId: string, incomeData: any) => {
   });
 };
 
-export const getIncome = async (userId: string) => {
+export const getIncome = async (userId: string, from?: string, to?: string, allOneOffs = false) => {
   if (!userId) {
     return [];
   }
   
   try {
-    const response = await request(`/income/${userId}`, {
+    const response = await request(`/income/${userId}${windowQuery(from, to, allOneOffs)}`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",
@@ -196,8 +247,8 @@ export const getIncomeById = async (userId: string, incomeId: string) => {
   });
 };
 
-export const updateIncome = async (userId: string, incomeId: string, incomeData: any) => {
-  return request(`/income/${userId}/${incomeId}`, {
+export const updateIncome = async (userId: string, incomeId: string, incomeData: any, scope?: EditScope) => {
+  return request(itemPath("income", userId, incomeId, scope), {
     method: "PUT",
     headers: {
       "Content-Type": "application/json",
@@ -206,8 +257,8 @@ export const updateIncome = async (userId: string, incomeId: string, incomeData:
   });
 };
 
-export const deleteIncome = async (userId: string, incomeId: string) => {
-  return request(`/income/${userId}/${incomeId}`, {
+export const deleteIncome = async (userId: string, incomeId: string, scope?: EditScope) => {
+  return request(itemPath("income", userId, incomeId, scope), {
     method: "DELETE",
     headers: {
       "Content-Type": "application/json",
@@ -244,6 +295,16 @@ export const getGoalById = async (userId: string, goalId: string) => {
   });
 };
 
+export const getGoalsByIds = async (userId: string, goalIds: string[]) => {
+  const params = new URLSearchParams({ ids: goalIds.join(",") });
+  return request(`/goals/${userId}?${params.toString()}`, {
+    method: "GET",
+    headers: {
+      "Content-Type": "application/json",
+    },
+  });
+};
+
 export const updateGoal = async (userId: string, goalId: string, goalData: any) => {
   return request(`/goals/${userId}/${goalId}`, {
     method: "PUT",
@@ -304,8 +365,8 @@ export const getEventById = async (userId: string, eventId: string) => {
   });
 };
 
-export const updateEvent = async (userId: string, eventId: string, eventData: any) => {
-  return request(`/events/${userId}/${eventId}`, {
+export const updateEvent = async (userId: string, eventId: string, eventData: any, scope?: EditScope) => {
+  return request(itemPath("events", userId, eventId, scope), {
     method: "PUT",
     headers: {
       "Content-Type": "application/json",
@@ -314,11 +375,67 @@ export const updateEvent = async (userId: string, eventId: string, eventData: an
   });
 };
 
-export const deleteEvent = async (userId: string, eventId: string) => {
-  return request(`/events/${userId}/${eventId}`, {
+export const deleteEvent = async (userId: string, eventId: string, scope?: EditScope) => {
+  return request(itemPath("events", userId, eventId, scope), {
     method: "DELETE",
     headers: {
       "Content-Type": "application/json",
     },
   });
 };
+
+// Calendar API calls
+export const getCalendar = async (userId: string, month: string, bucketsOnly = false) => {
+  const params = new URLSearchParams({ month });
+  if (bucketsOnly) {
+    params.set("bucketsOnly", "true");
+  }
+  return request(`/calendar/${userId}?${params.toString()}`, {
+    method: "GET",
+    headers: {
+      "Content-Type": "application/json",
+    },
+  });
+};
+
+// Search API calls
+export const searchTransactions = async (userId: string, query: string, filters: Record<string, string> = {}) => {
+  const params = new URLSearchParams({ q: query, ...filters });
+  return request(`/search/${userId}?${params.toString()}`, {
+    method: "GET",
+    headers: {
+      "Content-Type": "application/json",
+    },
+  });
+};
+
+// Forecast API calls
+export const getForecast = async (userId: string) => {
+  return request(`/forecast/${userId}`, {
+    method: "GET",
+    headers: {
+      "Content-Type": "application/json",
+    },
+  });
+};
+
+// Summary API calls
+export const getSummary = async (userId: string, from?: string, to?: string) => {
+  return request(`/summary/${userId}${windowQuery(from, to)}`, {
+    method: "GET",
+    headers: {
+      "Content-Type": "application/json",
+    },
+  });
+};
+
+// Sync API calls
+export const syncChanges = async (userId: string, since?: string) => {
+  const query = since ? `?${new URLSearchParams({ since }).toString()}` : "";
+  return request(`/sync/${userId}${query}`, {
+    method: "GET",
+    headers: {
+      "Content-Type": "application/json",
+    },
+  });
+};
@@ -7,6 +7,14 @@ export interface User {
   lastLogin: string;
 }
 
+export interface RecurrenceRule {
+  freq: "DAILY" | "WEEKLY" | "MONTHLY" | "YEARLY";
+  interval?: number;
+  until?: string;
+  count?: number;
+  exdates?: string[];
+}
+
 export interface Expense {
   id: string;
   userId: string;
@@ -14,8 +22,13 @@ export interface Expense {
   date: string;
   category: string;
   amount: number;
+  amountMinor?: number;
+  currency?: string;
   createdAt: string;
   updatedAt: string;
+  recurrence?: RecurrenceRule;
+  seriesId?: string;
+  anomalyFlags?: { type: "outlier" | "duplicate" | "categorySpike"; score?: number; of?: string; month?: string }[];
 }
 
 export interface Income {
@@ -25,11 +38,15 @@ export interface Income {
   date: string;
   category: string;
   amount: number;
+  amountMinor?: number;
+  currency?: string;
   paymentMethod: string;
   notes: string;
   receiptUrl: string;
   createdAt: string;
   updatedAt: string;
+  recurrence?: RecurrenceRule;
+  seriesId?: string;
 }
 
 export interface Goal {
@@ -38,6 +55,9 @@ export interface Goal {
   name: string;
   targetAmount: number;
   currentAmount: number;
+  targetAmountMinor?: number;
+  currentAmountMinor?: number;
+  currency?: string;
   targetDate: string;
   description: string;
   category: string;
@@ -53,7 +73,40 @@ export interface Event {
   type: "income" | "expense";
   category: string;
   amount: number;
+  amountMinor?: number;
+  currency?: string;
   notes: string;
   createdAt: string;
   updatedAt: string;
+  recurrence?: RecurrenceRule;
+  seriesId?: string;
+}
+
+export interface CalendarDay {
+  count: number;
+  // Keyed by currency code; amounts in different currencies are never added together
+  totals: Record<string, {
+    income: number;
+    expense: number;
+  }>;
+}
+
+export interface CalendarWindow {
+  start: string;
+  end: string;
+  days: Record<string, CalendarDay>;
+  events?: Event[];
+}
+
+export interface SyncResponse {
+  reset: boolean;
+  token: string;
+  hasMore?: boolean;
+  changes?: {
+    expenses: Expense[];
+    income: Income[];
+    goals: Goal[];
+    events: Event[];
+  };
+  deleted?: { type: "expense" | "income" | "goal" | "event"; id: string; deletedAt: string }[];
 }
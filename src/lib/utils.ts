@@ -4,3 +4,29 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+// Currency of items stored without one, and the currency totals are shown in (matches the API)
+export const DEFAULT_CURRENCY = "INR"
+
+// Digits after the decimal point where a currency differs from the usual 2
+const CURRENCY_EXPONENTS: Record<string, number> = { JPY: 0, KRW: 0, BHD: 3, KWD: 3 }
+
+export function currencyExponent(currency?: string) {
+  return CURRENCY_EXPONENTS[(currency || DEFAULT_CURRENCY).toUpperCase()] ?? 2
+}
+
+// Sum amounts in integer minor units so totals match the server exactly. Totals are keyed
+// by currency code in major units; amounts in different currencies are never added together.
+export function sumAmounts(items: { amount?: number | string; amountMinor?: number; currency?: string }[]) {
+  const totalsMinor: Record<string, number> = {}
+  for (const item of items) {
+    const currency = (item.currency || DEFAULT_CURRENCY).toUpperCase()
+    const scale = 10 ** currencyExponent(currency)
+    totalsMinor[currency] = (totalsMinor[currency] ?? 0) + (item.amountMinor ?? Math.round(Number(item.amount || 0) * scale))
+  }
+  const totals: Record<string, number> = {}
+  for (const [currency, minor] of Object.entries(totalsMinor)) {
+    totals[currency] = minor / 10 ** currencyExponent(currency)
+  }
+  return totals
+}
@@ -5,14 +5,14 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Plus, TrendingUp, TrendingDown, Target, Wallet, PiggyBank, PieChart, RefreshCw } from "lucide-react";
 import { Link, useNavigate } from "react-router-dom";
-import { format } from "date-fns";
+import { format, addDays, subYears } from "date-fns";
 import { Progress } from "@/components/ui/progress";
 import { Alert, AlertDescription, AlertTitle } from "@/components/ui/alert";
 import { AlertCircle } from "lucide-react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { PieChart as RechartsPieChart, Pie, Cell, ResponsiveContainer, Tooltip, Legend } from "recharts";
 import { useToast } from "@/hooks/use-toast";
-import { cn } from "@/lib/utils";
+import { cn, sumAmounts, DEFAULT_CURRENCY } from "@/lib/utils";
 
 // Custom card component with hover effect
 const HoverCard = ({ className, children, ...props }: React.ComponentProps<typeof Card>) => {
@@ -57,17 +57,21 @@ export function Dashboard() {
     enabled: !!user?.id,
   });
 
+  // Recurring series count their occurrences over the last five years; one-off items count whatever their date
+  const today = format(new Date(), "yyyy-MM-dd");
+  const historyStart = format(addDays(subYears(new Date(), 5), 1), "yyyy-MM-dd");
+
   // Fetch income data
   const { data: incomeData, isLoading: isLoadingIncome } = useQuery({
-    queryKey: ["income", user?.id],
-    queryFn: () => getIncome(user?.id || ""),
+    queryKey: ["income", user?.id, historyStart, today, "allOneOffs"],
+    queryFn: () => getIncome(user?.id || "", historyStart, today, true),
     enabled: !!user?.id,
   });
 
   // Fetch expense data
   const { data: expenseData, isLoading: isLoadingExpenses } = useQuery({
-    queryKey: ["expenses", user?.id],
-    queryFn: () => getExpenses(user?.id || ""),
+    queryKey: ["expenses", user?.id, historyStart, today, "allOneOffs"],
+    queryFn: () => getExpenses(user?.id || "", historyStart, today, true),
     enabled: !!user?.id,
   });
 
@@ -94,9 +98,9 @@ export function Dashboard() {
 
   useEffect(() => {
     if (incomeData && expenseData) {
-      // Calculate totals from actual income and expense data
-      const income = incomeData.reduce((sum: number, item: any) => sum + Number(item.amount || 0), 0);
-      const expenses = expenseData.reduce((sum: number, item: any) => sum + Number(item.amount || 0), 0);
+      // Calculate totals from actual income and expense data, in the displayed currency
+      const income = sumAmounts(incomeData)[DEFAULT_CURRENCY] ?? 0;
+      const expenses = sumAmounts(expenseData)[DEFAULT_CURRENCY] ?? 0;
 
       // Calculate 50/30/20 distribution
       const recommended50 = income * 0.5;
@@ -145,8 +149,8 @@ export function Dashboard() {
       return;
     }
     
-    // Calculate total income
-    const income = incomeData.reduce((sum: number, item: any) => sum + Number(item.amount || 0), 0);
+    // Calculate total income in the displayed currency
+    const income = sumAmounts(incomeData)[DEFAULT_CURRENCY] ?? 0;
     
     // Calculate 50/30/20 rule amounts
     const recommended50 = income * 0.5; // Expenses
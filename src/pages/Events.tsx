@@ -26,7 +26,7 @@ export function Events() {
   
   const handleDelete = async (event: Event) => {
     try {
-      await deleteEvent(event.id);
+      await deleteEvent({ id: event.id });
     } catch (error) {
       console.error("Failed to delete event:", error);
     }
@@ -82,7 +82,7 @@ export function Events() {
         </TabsList>
         
         <TabsContent value="calendar" className="mt-4">
-          <EventCalendar events={events || []} />
+          <EventCalendar />
         </TabsContent>
         
         <TabsContent value="list" className="mt-4">
@@ -50,13 +50,13 @@ export function Transactions() {
   const handleDelete = async (id: string, type: "expense" | "income") => {
     try {
       if (type === "expense") {
-        await deleteExpense(id);
+        await deleteExpense({ id });
         toast({
           title: "Success",
           description: "Expense deleted successfully",
         });
       } else {
-        await deleteIncome(id);
+        await deleteIncome({ id });
         toast({
           title: "Success",
           description: "Income deleted successfully",